@@ -0,0 +1,143 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.card_history import month_name, month_number
+from src.utils import parse_payment_dates
+
+DIMENSIONS = {"category": "Категория", "card": "Номер карты"}
+BASELINES = {"month": 1, "year": 12}
+
+
+class SpendingAggregates:
+    """
+    Траты по месяцам в разрезе категорий и карт: для каждого разреза матрица (значение × месяц),
+    считается одной группировкой по успешным тратам. Сравнение двух месяцев - выбор двух столбцов,
+    время пропорционально числу категорий или карт, а не операций.
+    """
+
+    def __init__(
+        self, first_month: int, months: int, keys: dict[str, list[str]], spent: dict[str, np.ndarray]
+    ) -> None:
+        self.first_month = first_month
+        self.months = months
+        self.keys = keys
+        self.spent = spent
+
+    @classmethod
+    def from_transactions(cls, transactions: Union[list[dict], pd.DataFrame]) -> "SpendingAggregates":
+        """
+        Строит матрицы по операциям (даты платежа - строки ДД.ММ.ГГГГ или datetime64)
+        """
+        frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+        empty = cls(0, 0, {name: [] for name in DIMENSIONS}, {name: np.zeros((0, 0)) for name in DIMENSIONS})
+        if frame.empty or not {"Дата платежа", "Сумма платежа"} <= set(frame.columns):
+            return empty
+
+        dates = frame["Дата платежа"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = parse_payment_dates(dates)
+        amounts = pd.to_numeric(frame["Сумма платежа"], errors="coerce")
+        mask = dates.notna() & (amounts < 0)
+        if "Статус" in frame.columns:
+            mask &= frame["Статус"].eq("OK")
+        if not mask.any():
+            return empty
+
+        months = (dates[mask].dt.year * 12 + dates[mask].dt.month - 1).to_numpy(dtype=np.int64)
+        spent = -amounts[mask].to_numpy(dtype=float)
+        first_month = int(months.min())
+        width = int(months.max()) - first_month + 1
+
+        keys: dict[str, list[str]] = {}
+        matrices: dict[str, np.ndarray] = {}
+        for name, column in DIMENSIONS.items():
+            if column not in frame.columns:
+                keys[name], matrices[name] = [], np.zeros((0, width))
+                continue
+            values = frame.loc[mask, column]
+            present = values.notna().to_numpy()
+            codes, uniques = pd.factorize(values.astype(str)[present], sort=True)
+            cells = codes * width + months[present] - first_month
+            matrix = np.bincount(cells, weights=spent[present], minlength=len(uniques) * width)
+            keys[name], matrices[name] = [str(value) for value in uniques], matrix.reshape(len(uniques), width)
+        return cls(first_month, width, keys, matrices)
+
+    def update_months(self, window: "SpendingAggregates") -> "SpendingAggregates":
+        """
+        Новые матрицы, в которых месяцы окна window (построенного по всем операциям своих месяцев)
+        заменены его значениями. Текущие матрицы не меняются.
+        """
+        if not window.months:
+            return self
+        first_month, last_month = window.first_month, window.first_month + window.months
+        if self.months:
+            first_month = min(first_month, self.first_month)
+            last_month = max(last_month, self.first_month + self.months)
+        start = window.first_month - first_month
+
+        keys: dict[str, list[str]] = {}
+        matrices: dict[str, np.ndarray] = {}
+        for name in DIMENSIONS:
+            keys[name] = sorted(set(self.keys[name]) | set(window.keys[name]))
+            index = pd.Index(keys[name], dtype=object)
+            matrix = np.zeros((len(keys[name]), last_month - first_month))
+            if self.months:
+                offset = self.first_month - first_month
+                matrix[index.get_indexer(pd.Index(self.keys[name])), offset : offset + self.months] = self.spent[name]
+            matrix[:, start : start + window.months] = 0
+            matrix[index.get_indexer(pd.Index(window.keys[name])), start : start + window.months] = window.spent[name]
+            matrices[name] = matrix
+        return SpendingAggregates(first_month, last_month - first_month, keys, matrices)
+
+    def month_totals(self, by: str, month: str) -> np.ndarray:
+        """
+        Траты по каждому значению разреза by (category или card) за месяц ГГГГ-ММ, нули вне выписки
+        """
+        column = month_number(month) - self.first_month
+        matrix = self.spent[by]
+        if 0 <= column < self.months:
+            return matrix[:, column]
+        return np.zeros(matrix.shape[0])
+
+    def compare(self, by: str, month: str, baseline: str = "month") -> pd.DataFrame:
+        """
+        Сравнивает траты за месяц ГГГГ-ММ с предыдущим месяцем (baseline="month") или тем же месяцем
+        прошлого года (baseline="year"): траты за оба месяца, разница и изменение в процентах
+        (None, если в базовом месяце трат не было). Значения без трат в обоих месяцах не выводятся.
+        """
+        if by not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {by}")
+        if baseline not in BASELINES:
+            raise ValueError(f"Unknown baseline: {baseline}")
+
+        baseline_month = month_name(month_number(month) - BASELINES[baseline])
+        current = self.month_totals(by, month)
+        previous = self.month_totals(by, baseline_month)
+        delta = current - previous
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(previous > 0, np.round(delta / previous * 100, 1), None)
+
+        result = pd.DataFrame(
+            {
+                DIMENSIONS[by]: self.keys[by],
+                "month": month,
+                "baseline_month": baseline_month,
+                "spent": np.round(current, 2),
+                "baseline_spent": np.round(previous, 2),
+                "delta": np.round(delta, 2),
+                "delta_percent": percent,
+            }
+        )
+        result = result[(current > 0) | (previous > 0)]
+        return result.sort_values("delta", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def comparison_month(date: Optional[str] = None) -> str:
+    """
+    Месяц ГГГГ-ММ даты формата ГГГГ-ММ-ДД ЧЧ:ММ:СС (по умолчанию - текущий)
+    """
+    if date is None:
+        return pd.Timestamp.now().strftime("%Y-%m")
+    return pd.to_datetime(date, format="%Y-%m-%d %H:%M:%S").strftime("%Y-%m")
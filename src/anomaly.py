@@ -0,0 +1,185 @@
+import math
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEYS = {"category": "Категория", "card": "Номер карты"}
+
+
+class RunningStats:
+    """
+    Среднее и дисперсия последовательности, обновляемые по одному значению (алгоритм Уэлфорда)
+    или целой группой значений (формула Чана), память O(1)
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0) -> None:
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float) -> None:
+        """
+        Добавляет значение
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, count: int, mean: float, m2: float) -> None:
+        """
+        Добавляет группу значений, заданную количеством, средним и суммой квадратов отклонений
+        """
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        """
+        Выборочное стандартное отклонение (nan, если значений меньше двух)
+        """
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def zscore(self, value: float) -> float:
+        """
+        Отклонение значения от среднего в стандартных отклонениях
+        """
+        std = self.std
+        return (value - self.mean) / std if std > 0 else math.nan
+
+
+class AnomalyDetector:
+    """
+    Потоковый поиск необычно крупных трат. Для каждой категории и карты хранится RunningStats по суммам трат,
+    каждая трата оценивается по статистике предшествующих операций (z-оценка), затем учитывается в ней.
+    Трата считается аномальной, если хотя бы одна z-оценка больше threshold при не менее min_count
+    предшествующих тратах по ключу. Поступления не оцениваются и в статистику не входят.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 3.0,
+        min_count: int = 5,
+        keys: Optional[dict[str, str]] = None,
+        amount_column: str = "Сумма платежа",
+    ) -> None:
+        self.threshold = threshold
+        self.min_count = min_count
+        self.keys = dict(keys or DEFAULT_KEYS)
+        self.amount_column = amount_column
+        self.stats: dict[str, dict[Any, RunningStats]] = {name: {} for name in self.keys}
+
+    def score(self, transaction: dict) -> dict[str, Any]:
+        """
+        Оценивает одну операцию и обновляет статистику. Возвращает z-оценки по ключам и признак anomaly
+        """
+        result: dict[str, Any] = {f"z_{name}": math.nan for name in self.keys}
+        result["anomaly"] = False
+        spent = -_to_float(transaction.get(self.amount_column))
+        if not spent > 0:
+            return result
+
+        for name, column in self.keys.items():
+            key = transaction.get(column)
+            if key is None or (isinstance(key, float) and math.isnan(key)):
+                continue
+            stats = self.stats[name].setdefault(key, RunningStats())
+            if stats.count >= self.min_count:
+                result[f"z_{name}"] = stats.zscore(spent)
+                result["anomaly"] |= bool(result[f"z_{name}"] > self.threshold)
+            stats.update(spent)
+        return result
+
+    def score_frame(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Векторно оценивает пакет операций в порядке строк, результат совпадает с построчным score.
+        Возвращает столбцы z_<ключ> и anomaly с индексом пакета, статистика обновляется всем пакетом.
+        """
+        amounts = pd.to_numeric(transactions[self.amount_column], errors="coerce").to_numpy(dtype=float)
+        spent = np.where(amounts < 0, -amounts, np.nan)
+        is_spend = spent > 0
+
+        result = pd.DataFrame(index=transactions.index)
+        anomaly = np.zeros(len(transactions), dtype=bool)
+        for name, column in self.keys.items():
+            scores = np.full(len(transactions), np.nan)
+            if column in transactions:
+                keys = transactions[column].to_numpy(dtype=object)
+                positions = np.flatnonzero(is_spend & pd.notna(keys))
+                scores[positions] = self._score_key(name, keys[positions], spent[positions])
+            result[f"z_{name}"] = scores
+            anomaly |= scores > self.threshold
+        result["anomaly"] = anomaly
+        return result
+
+    def _score_key(self, name: str, keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(keys)
+        if not len(codes):
+            return np.array([], dtype=float)
+        known = self.stats[name]
+        prior = [known.get(key) or RunningStats() for key in uniques]
+        prior_count = np.array([item.count for item in prior], dtype=float)[codes]
+        prior_mean = np.array([item.mean for item in prior])[codes]
+        prior_m2 = np.array([item.m2 for item in prior])[codes]
+
+        # Статистика предшествующих строк пакета по ключу: количество, сумма и сумма квадратов без текущей строки
+        series = pd.Series(values)
+        before_count = series.groupby(codes).cumcount().to_numpy(dtype=float)
+        before_sum = series.groupby(codes).cumsum().to_numpy() - values
+        before_squares = (series * series).groupby(codes).cumsum().to_numpy() - values * values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            before_mean = np.where(before_count > 0, before_sum / before_count, 0.0)
+            before_m2 = np.maximum(before_squares - before_sum * before_mean, 0.0)
+
+            count = prior_count + before_count
+            delta = before_mean - prior_mean
+            mean = np.where(count > 0, prior_mean + delta * before_count / count, np.nan)
+            m2 = prior_m2 + before_m2 + np.where(count > 0, delta * delta * prior_count * before_count / count, 0.0)
+            std = np.sqrt(m2 / (count - 1))
+            scores = np.where((count >= self.min_count) & (std > 0), (values - mean) / std, np.nan)
+
+        # Итоги пакета по ключам вливаются в статистику
+        group_count = np.bincount(codes, minlength=len(uniques))
+        group_mean = np.bincount(codes, weights=values, minlength=len(uniques)) / group_count
+        group_m2 = np.bincount(codes, weights=(values - group_mean[codes]) ** 2, minlength=len(uniques))
+        for position, key in enumerate(uniques):
+            known.setdefault(key, prior[position]).merge(
+                int(group_count[position]), float(group_mean[position]), float(group_m2[position])
+            )
+        return scores
+
+    def score_stream(self, transactions: Iterable[dict], batch_size: int = 65536) -> Iterator[dict]:
+        """
+        Оценивает поток операций (как из read_transactions_xlsx) за один проход пакетами по batch_size строк
+        и отдаёт операции с добавленными z-оценками и признаком anomaly
+        """
+        iterator = iter(transactions)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            scores = self.score_frame(pd.DataFrame(batch)).to_dict(orient="records")
+            for transaction, score in zip(batch, scores):
+                yield {**transaction, **score}
+
+    def anomalies(self, transactions: Iterable[dict], batch_size: int = 65536) -> list[dict]:
+        """
+        Возвращает только аномальные операции потока
+        """
+        return [item for item in self.score_stream(transactions, batch_size) if item["anomaly"]]
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
@@ -0,0 +1,123 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from src.currency import RATES_PATH, convert_records_to_rub
+from src.dashboard_cache import dataset_version, settings_hash
+from src.logging_setup import setup_logger
+from src.utils import load_json_data, parse_payment_dates, read_transactions_xlsx
+from src.views import get_transactions_summary
+
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("backfill")
+
+BACKFILL_PATH = MODULE_DIR.parent / "data" / "dashboards"
+
+
+def partition_by_month(transactions: list[dict]) -> dict[str, list[dict]]:
+    """
+    Разбивает операции по месяцам "Дата платежа" (ключ ГГГГ-ММ) за один разбор дат.
+    Операции без даты платежа пропускаются, месяцы упорядочены по возрастанию.
+    """
+    if not transactions:
+        return {}
+
+    dates = parse_payment_dates(pd.Series([item.get("Дата платежа") for item in transactions], dtype=object))
+    months = dates.dt.strftime("%Y-%m").to_numpy(dtype=object)
+
+    partitions: dict[str, list[dict]] = {}
+    for month, item in zip(months, transactions):
+        if isinstance(month, str):
+            partitions.setdefault(month, []).append(item)
+    return dict(sorted(partitions.items()))
+
+
+def month_dashboard(month: str, transactions: list[dict], cashback_rules: Optional[list]) -> dict[str, Any]:
+    """
+    Возвращает карты, топ транзакций и кешбэк за месяц, как main_page для последнего дня месяца
+    """
+    last_day = (pd.Timestamp(f"{month}-01") + pd.offsets.MonthEnd(0)).strftime("%d.%m.%Y")
+    return {"month": month, "date": last_day, **get_transactions_summary(transactions, cashback_rules)}
+
+
+def _month_path(output_dir: str, month: str) -> Path:
+    return Path(output_dir) / f"{month}.json"
+
+
+def _is_done(path: Path, version: Optional[str], digest: str) -> bool:
+    if not path.exists():
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            saved = json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return False
+    return bool(saved.get("version") == version and saved.get("settings") == digest)
+
+
+def _write_month(path: Path, result: dict) -> None:
+    temporary = path.with_suffix(".json.tmp")
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    os.replace(temporary, path)
+
+
+def backfill_dashboards(
+    file_path: str,
+    settings_path: str,
+    output_dir: str = str(BACKFILL_PATH),
+    workers: int = 4,
+) -> dict[str, int]:
+    """
+    Считает сводки главной страницы за все месяцы выписки: данные читаются один раз,
+    месяцы распределяются между workers процессами. Каждый месяц сохраняется в отдельный файл
+    ГГГГ-ММ.json сразу после расчёта, поэтому прерванный запуск продолжается с несохранённых месяцев.
+    Месяцы, сохранённые для другой версии данных или настроек, пересчитываются.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    version = dataset_version(file_path, str(RATES_PATH))
+    user_settings = load_json_data(settings_path)
+    digest = settings_hash(user_settings)
+    cashback_rules = user_settings.get("cashback_rules")
+
+    partitions = partition_by_month(convert_records_to_rub(read_transactions_xlsx(file_path, validate=True)))
+    pending = {
+        month: records
+        for month, records in partitions.items()
+        if not _is_done(_month_path(output_dir, month), version, digest)
+    }
+    stats = {"months": len(partitions), "computed": 0, "skipped": len(partitions) - len(pending)}
+    logger.info("Backfill: %s months, %s already done", stats["months"], stats["skipped"])
+
+    def save(result: dict) -> None:
+        _write_month(_month_path(output_dir, result["month"]), {**result, "version": version, "settings": digest})
+        stats["computed"] += 1
+
+    if workers <= 1 or len(pending) <= 1:
+        for month, records in pending.items():
+            save(month_dashboard(month, records, cashback_rules))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = [
+                executor.submit(month_dashboard, month, records, cashback_rules) for month, records in pending.items()
+            ]
+            for future in as_completed(futures):
+                save(future.result())
+
+    logger.info("Backfill done: %s computed", stats["computed"])
+    return stats
+
+
+def load_backfill(output_dir: str = str(BACKFILL_PATH)) -> list[dict]:
+    """
+    Возвращает сохранённые сводки по месяцам в порядке возрастания
+    """
+    result = []
+    for path in sorted(Path(output_dir).glob("*.json")):
+        with open(path, "r", encoding="utf-8") as file:
+            result.append(json.load(file))
+    return result
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Any, Optional
+
+import pandas as pd
+
+from src.loader import to_kopecks
+from src.utils import parse_payment_dates
+
+
+def budget_month(date: str) -> str:
+    """
+    Месяц бюджета (ГГГГ-ММ) для даты формата ДД.ММ.ГГГГ
+    """
+    return datetime.strptime(date, "%d.%m.%Y").strftime("%Y-%m")
+
+
+def _fingerprint(record: dict) -> str:
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class BudgetLedger:
+    """
+    Траты по категориям за каждый месяц, которые обновляются по мере добавления операций.
+    Операции применяются как события в порядке поступления: суммы по месяцу и категории хранятся в копейках
+    и увеличиваются на траты новых операций, уже учтённые операции повторно не читаются.
+    Статус бюджетов на месяц считается за O(число категорий).
+    """
+
+    def __init__(self) -> None:
+        self.totals: dict[str, dict[str, int]] = {}
+        self.applied = 0
+        self._last: Optional[str] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_transactions(cls, transactions: list[dict]) -> "BudgetLedger":
+        """
+        Создаёт журнал по списку операций
+        """
+        ledger = cls()
+        ledger.append(transactions)
+        return ledger
+
+    def copy(self) -> "BudgetLedger":
+        """
+        Независимая копия журнала: операции, добавленные в копию, не меняют исходный журнал
+        """
+        ledger = BudgetLedger()
+        with self._lock:
+            ledger.totals = {month: dict(totals) for month, totals in self.totals.items()}
+            ledger.applied = self.applied
+            ledger._last = self._last
+        return ledger
+
+    def append(self, transactions: list[dict]) -> None:
+        """
+        Учитывает новые операции: успешные траты с датой платежа добавляются к суммам их месяца и категории
+        """
+        if not transactions:
+            return
+
+        frame = pd.DataFrame(transactions)
+        totals: list[tuple[str, str, int]] = []
+        if {"Дата платежа", "Сумма платежа", "Категория"} <= set(frame.columns):
+            months = parse_payment_dates(frame["Дата платежа"]).dt.strftime("%Y-%m")
+            amounts = -to_kopecks(frame["Сумма платежа"]).astype("Int64")
+            mask = (amounts > 0).fillna(False) & months.notna() & frame["Категория"].notna()
+            if "Статус" in frame.columns:
+                mask &= frame["Статус"].eq("OK")
+            spends = pd.DataFrame(
+                {"month": months[mask], "category": frame["Категория"][mask], "amount": amounts[mask].astype("int64")}
+            )
+            grouped = spends.groupby(["month", "category"], sort=False)["amount"].sum().reset_index()
+            totals = list(grouped.itertuples(index=False, name=None))
+
+        with self._lock:
+            for month, category, amount in totals:
+                month_totals = self.totals.setdefault(month, {})
+                month_totals[category] = month_totals.get(category, 0) + int(amount)
+            self.applied += len(transactions)
+            self._last = _fingerprint(transactions[-1])
+
+    def sync(self, transactions: list[dict]) -> "BudgetLedger":
+        """
+        Приводит журнал к полному списку операций: если список - продолжение уже учтённого,
+        применяются только новые операции, иначе журнал пересобирается
+        """
+        with self._lock:
+            applied = self.applied
+            if applied and applied <= len(transactions) and _fingerprint(transactions[applied - 1]) == self._last:
+                self.append(transactions[applied:])
+                return self
+
+            self.totals = {}
+            self.applied = 0
+            self._last = None
+            self.append(transactions)
+        return self
+
+    def spent(self, month: str, category: str) -> float:
+        """
+        Траты по категории за месяц ГГГГ-ММ в рублях
+        """
+        return self.totals.get(month, {}).get(category, 0) / 100
+
+    def status(self, budgets: dict[str, Any], month: str) -> list[dict]:
+        """
+        Возвращает для каждой категории бюджета лимит, траты за месяц ГГГГ-ММ, остаток
+        (отрицательный при перерасходе) и долю использованного лимита в процентах
+        """
+        month_totals = self.totals.get(month, {})
+        result = []
+        for category, limit in budgets.items():
+            spent = month_totals.get(category, 0) / 100
+            limit = float(limit)
+            result.append(
+                {
+                    "category": category,
+                    "budget": limit,
+                    "spent": round(spent, 2),
+                    "remaining": round(limit - spent, 2),
+                    "used_percent": round(spent / limit * 100, 1) if limit else None,
+                }
+            )
+        return result
@@ -0,0 +1,165 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.cashback import CashbackEngine
+from src.utils import get_last_four, parse_payment_dates
+
+METRICS = ("spent", "income", "cashback", "transactions")
+
+
+def month_number(month: str) -> int:
+    """
+    Порядковый номер месяца ГГГГ-ММ (год * 12 + месяц - 1)
+    """
+    year, number = month.split("-")
+    return int(year) * 12 + int(number) - 1
+
+
+def month_name(number: int) -> str:
+    """
+    Месяц ГГГГ-ММ по порядковому номеру
+    """
+    return f"{number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class CardHistory:
+    """
+    Траты, поступления, кешбэк и число операций по каждой карте за каждый месяц выписки.
+    Матрица (карта × месяц) считается одной группировкой по всем успешным операциям и хранится плотными массивами,
+    история карты за любое число месяцев - срез массива.
+    """
+
+    def __init__(self, cards: list[str], first_month: int, values: dict[str, np.ndarray]) -> None:
+        self.cards = cards
+        self.first_month = first_month
+        self.values = values
+        self._rows = {card: row for row, card in enumerate(cards)}
+
+    @classmethod
+    def from_transactions(
+        cls, transactions: Union[list[dict], pd.DataFrame], cashback_rules: Optional[list[dict]] = None
+    ) -> "CardHistory":
+        """
+        Строит матрицу по операциям. Кешбэк считается по правилам (см. CashbackEngine), иначе 1% от трат
+        """
+        frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+        if frame.empty or not {"Дата платежа", "Сумма платежа", "Номер карты"} <= set(frame.columns):
+            return cls([], 0, {name: np.zeros((0, 0)) for name in METRICS})
+
+        dates = frame["Дата платежа"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = parse_payment_dates(dates)
+        mask = dates.notna() & frame["Номер карты"].notna()
+        if "Статус" in frame.columns:
+            mask &= frame["Статус"].eq("OK")
+        frame, dates = frame[mask], dates[mask]
+        if frame.empty:
+            return cls([], 0, {name: np.zeros((0, 0)) for name in METRICS})
+
+        amounts = pd.to_numeric(frame["Сумма платежа"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        spent = np.where(amounts < 0, -amounts, 0.0)
+        if cashback_rules is not None:
+            cashback = CashbackEngine(cashback_rules).calculate(frame).to_numpy()
+        else:
+            cashback = spent / 100
+
+        months = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+        grouped = (
+            pd.DataFrame(
+                {
+                    "card": frame["Номер карты"].astype(str).to_numpy(),
+                    "month": months,
+                    "spent": spent,
+                    "income": np.where(amounts > 0, amounts, 0.0),
+                    "cashback": cashback,
+                    "transactions": 1,
+                }
+            )
+            .groupby(["card", "month"], sort=True)
+            .sum()
+        )
+
+        cards = grouped.index.get_level_values("card")
+        card_names = list(dict.fromkeys(cards))
+        first_month = int(months.min())
+        shape = (len(card_names), int(months.max()) - first_month + 1)
+        rows = pd.Index(card_names).get_indexer(cards)
+        columns = grouped.index.get_level_values("month").to_numpy() - first_month
+
+        values = {}
+        for name in METRICS:
+            matrix = np.zeros(shape, dtype=np.int64 if name == "transactions" else float)
+            matrix[rows, columns] = grouped[name].to_numpy()
+            values[name] = matrix
+        return cls(card_names, first_month, values)
+
+    def update_months(self, window: "CardHistory") -> "CardHistory":
+        """
+        Новая история, в которой месяцы окна window заменены его значениями. Окно строится по всем операциям
+        своих месяцев, поэтому при добавлении операций пересчитываются только затронутые месяцы
+        (кешбэк с месячными лимитами не складывается из частей). Текущая история не меняется.
+        """
+        if not window.cards:
+            return self
+        cards = sorted(set(self.cards) | set(window.cards))
+        width = window.values["spent"].shape[1]
+        first_month, last_month = window.first_month, window.first_month + width
+        if self.cards:
+            first_month = min(first_month, self.first_month)
+            last_month = max(last_month, self.first_month + self.values["spent"].shape[1])
+        index = pd.Index(cards)
+        rows, window_rows = index.get_indexer(pd.Index(self.cards)), index.get_indexer(pd.Index(window.cards))
+        start = window.first_month - first_month
+
+        values = {}
+        for name in METRICS:
+            dtype = np.int64 if name == "transactions" else float
+            matrix = np.zeros((len(cards), last_month - first_month), dtype=dtype)
+            if self.cards:
+                offset = self.first_month - first_month
+                matrix[rows, offset : offset + self.values[name].shape[1]] = self.values[name]
+            matrix[:, start : start + width] = 0
+            matrix[window_rows, start : start + width] = window.values[name]
+            values[name] = matrix
+        return CardHistory(cards, first_month, values)
+
+    def _window(self, end_month: str, months: int) -> tuple[list[int], slice, int]:
+        end = month_number(end_month) + 1
+        numbers = list(range(end - months, end))
+        start = min(max(end - months - self.first_month, 0), self.values["spent"].shape[1])
+        stop = min(max(end - self.first_month, 0), self.values["spent"].shape[1])
+        offset = max(self.first_month - (end - months), 0)
+        return numbers, slice(start, stop), offset
+
+    def card(self, card: str, end_month: str, months: int = 12) -> list[dict]:
+        """
+        История карты за months месяцев по месяц ГГГГ-ММ включительно, месяцы без операций - нули
+        """
+        numbers, columns, offset = self._window(end_month, months)
+        window = {name: np.zeros(months, dtype=self.values[name].dtype) for name in METRICS}
+        row = self._rows.get(card)
+        if row is not None:
+            for name in METRICS:
+                part = self.values[name][row, columns]
+                window[name][offset : offset + len(part)] = part
+
+        return [
+            {
+                "month": month_name(number),
+                "spent": round(float(window["spent"][index]), 2),
+                "income": round(float(window["income"][index]), 2),
+                "cashback": round(float(window["cashback"][index]), 2),
+                "transactions": int(window["transactions"][index]),
+            }
+            for index, number in enumerate(numbers)
+        ]
+
+    def history(self, end_month: str, months: int = 12) -> list[dict]:
+        """
+        История всех карт за months месяцев по месяц ГГГГ-ММ включительно
+        """
+        return [
+            {"last_digits": get_last_four(card), "months": self.card(card, end_month, months)} for card in self.cards
+        ]
@@ -0,0 +1,128 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class CashbackEngine:
+    """
+    Движок правил кешбэка. Правило - словарь из настроек пользователя:
+    {"percent": 5, "categories": ["Супермаркеты"], "mcc": [5411, [5811, 5814]], "monthly_cap": 3000}.
+    Условия categories и mcc необязательны, mcc задаётся кодами или диапазонами [от, до].
+    Для операции применяется первое подходящее правило, иначе default_percent.
+    monthly_cap ограничивает кешбэк по правилу для каждой карты за календарный месяц.
+    Правила компилируются в векторные операции над столбцами и считаются за один проход.
+    """
+
+    def __init__(self, rules: list[dict], default_percent: float = 1.0) -> None:
+        self.rules = rules
+        self.default_percent = default_percent
+        self._percents = np.array([float(rule.get("percent", 0)) for rule in rules] + [default_percent])
+        self._caps = np.array(
+            [float(rule["monthly_cap"]) if rule.get("monthly_cap") is not None else np.inf for rule in rules]
+            + [np.inf]
+        )
+        self._conditions = [self._compile(rule) for rule in rules]
+
+    @staticmethod
+    def _compile(rule: dict) -> tuple[Optional[list], list[tuple[float, float]]]:
+        categories = rule.get("categories")
+        ranges = []
+        for item in rule.get("mcc") or []:
+            if isinstance(item, (list, tuple)):
+                ranges.append((float(item[0]), float(item[1])))
+            else:
+                ranges.append((float(item), float(item)))
+        return (list(categories) if categories else None), ranges
+
+    def match_rules(self, transactions: pd.DataFrame) -> np.ndarray:
+        """
+        Возвращает номер применённого правила для каждой операции (len(rules) - ставка по умолчанию)
+        """
+        size = len(transactions)
+        categories = transactions["Категория"] if "Категория" in transactions else pd.Series([None] * size)
+        mcc = (
+            pd.to_numeric(transactions["MCC"], errors="coerce").to_numpy(dtype=float)
+            if "MCC" in transactions
+            else np.full(size, np.nan)
+        )
+
+        masks = []
+        for rule_categories, ranges in self._conditions:
+            mask = np.ones(size, dtype=bool)
+            if rule_categories is not None:
+                mask &= categories.isin(rule_categories).to_numpy()
+            if ranges:
+                in_ranges = np.zeros(size, dtype=bool)
+                for low, high in ranges:
+                    in_ranges |= (mcc >= low) & (mcc <= high)
+                mask &= in_ranges
+            masks.append(mask)
+
+        return np.select(masks, np.arange(len(masks)), default=len(masks)) if masks else np.zeros(size, dtype=int)
+
+    def calculate(self, transactions: pd.DataFrame) -> pd.Series:
+        """
+        Возвращает кешбэк по каждой операции (для поступлений - 0) с учётом месячных лимитов
+        """
+        if transactions.empty:
+            return pd.Series([], index=transactions.index, dtype=float)
+
+        amounts = transactions["Сумма платежа"].to_numpy(dtype=float)
+        spent = np.where(amounts < 0, -amounts, 0.0)
+        rule_index = self.match_rules(transactions)
+        raw = spent * self._percents[rule_index] / 100
+        caps = self._caps[rule_index]
+
+        capped = np.isfinite(caps) & (raw > 0)
+        if capped.any():
+            raw = self._apply_caps(transactions, raw, rule_index, caps, capped)
+
+        return pd.Series(raw, index=transactions.index, dtype=float)
+
+    @staticmethod
+    def _apply_caps(
+        transactions: pd.DataFrame, raw: np.ndarray, rule_index: np.ndarray, caps: np.ndarray, capped: np.ndarray
+    ) -> np.ndarray:
+        if "Дата платежа" in transactions:
+            dates = pd.to_datetime(transactions["Дата платежа"], format="%d.%m.%Y", errors="coerce")
+            months = (dates.dt.year * 12 + dates.dt.month).fillna(-1).to_numpy(dtype=np.int64)
+            order_key = dates.to_numpy(dtype="datetime64[ns]")
+        else:
+            months = np.zeros(len(transactions), dtype=np.int64)
+            order_key = np.zeros(len(transactions), dtype="datetime64[ns]")
+        cards = transactions["Номер карты"].astype(str).to_numpy() if "Номер карты" in transactions else None
+
+        positions = np.flatnonzero(capped)
+        frame = pd.DataFrame(
+            {
+                "card": cards[positions] if cards is not None else "",
+                "month": months[positions],
+                "rule": rule_index[positions],
+                "date": order_key[positions],
+                "raw": raw[positions],
+                "cap": caps[positions],
+            }
+        ).sort_values("date", kind="stable")
+
+        cumulative = frame.groupby(["card", "month", "rule"], sort=False)["raw"].cumsum().to_numpy()
+        cap = frame["cap"].to_numpy()
+        previous = cumulative - frame["raw"].to_numpy()
+
+        result = raw.copy()
+        result[positions[frame.index.to_numpy()]] = np.minimum(cumulative, cap) - np.minimum(previous, cap)
+        return result
+
+    def by_card(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Возвращает траты и кешбэк по картам: столбцы total_spent и cashback
+        """
+        amounts = transactions["Сумма платежа"].astype(float)
+        frame = pd.DataFrame(
+            {
+                "card": transactions["Номер карты"],
+                "total_spent": np.where(amounts < 0, -amounts, 0.0),
+                "cashback": self.calculate(transactions),
+            }
+        )
+        return frame.groupby("card", sort=True)[["total_spent", "cashback"]].sum()
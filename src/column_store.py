@@ -0,0 +1,148 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+INTEGER_DTYPES = (pd.Int8Dtype, pd.Int16Dtype, pd.Int32Dtype, pd.Int64Dtype)
+FORMAT_VERSION = 1
+VERSION_PATTERN = re.compile(r"v(\d+)")
+# Сколько последних версий хранится всегда и сколько секунд живут более старые версии
+KEEP_VERSIONS = 2
+GRACE_SECONDS = 60.0
+
+
+def write_column_store(transactions: pd.DataFrame, directory: str) -> str:
+    """
+    Записывает операции в колоночное хранилище: по одному файлу .npy фиксированной ширины на столбец,
+    строки и категории - коды в .npy и словарь значений в .json, пропуски в целых - отдельная маска.
+    Каждая запись создаёт новую версию в подкаталоге, указатель CURRENT заменяется атомарно,
+    поэтому читатели видят либо старую, либо новую версию целиком. Прежние версии удаляются с задержкой
+    (см. _remove_old_versions). Возвращает номер версии.
+    """
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".staging.", dir=root))
+
+    columns = []
+    for number, name in enumerate(transactions.columns):
+        stem = f"col_{number:03d}"
+        columns.append(dict(name=str(name), **_write_column(transactions[name], staging, stem)))
+
+    manifest = dict(format=FORMAT_VERSION, rows=len(transactions), columns=columns)
+    with open(staging / MANIFEST, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+    version = f"v{time.time_ns()}"
+    os.replace(staging, root / version)
+    with open(root / f"{CURRENT}.tmp", "w", encoding="utf-8") as file:
+        file.write(version)
+    os.replace(root / f"{CURRENT}.tmp", root / CURRENT)
+
+    _remove_old_versions(root)
+    return version
+
+
+def _remove_old_versions(root: Path) -> None:
+    """
+    Удаляет каталоги версий хранилища, кроме KEEP_VERSIONS последних и созданных менее GRACE_SECONDS назад:
+    читатель, который уже прочитал прежний CURRENT, успевает открыть свою версию.
+    Каталоги с другими именами не трогаются.
+    """
+    versions = sorted(
+        (int(match.group(1)), path)
+        for path in root.iterdir()
+        if path.is_dir() and (match := VERSION_PATTERN.fullmatch(path.name))
+    )
+    deadline = time.time_ns() - int(GRACE_SECONDS * 1e9)
+    for created, path in versions[:-KEEP_VERSIONS]:
+        if created < deadline:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _write_column(values: pd.Series, directory: Path, stem: str) -> dict:
+    dtype = values.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        return _write_dictionary(values.cat.codes.to_numpy(), list(dtype.categories), directory, stem)
+
+    if isinstance(dtype, INTEGER_DTYPES):
+        mask = values.isna().to_numpy()
+        data = values.to_numpy(dtype=np.dtype(str(dtype).lower()), na_value=0)
+        np.save(directory / f"{stem}.npy", data)
+        np.save(directory / f"{stem}.mask.npy", mask)
+        return dict(kind="masked", dtype=str(dtype), file=f"{stem}.npy", mask=f"{stem}.mask.npy")
+
+    if pd.api.types.is_datetime64_dtype(dtype):
+        np.save(directory / f"{stem}.npy", values.to_numpy(dtype="datetime64[ns]"))
+        return dict(kind="array", dtype="datetime64[ns]", file=f"{stem}.npy")
+
+    if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        data = values.to_numpy()
+        if data.dtype == object:
+            data = values.to_numpy(dtype=float, na_value=np.nan)
+        np.save(directory / f"{stem}.npy", data)
+        return dict(kind="array", dtype=str(data.dtype), file=f"{stem}.npy")
+
+    codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+    return _write_dictionary(codes, [str(value) for value in uniques], directory, stem)
+
+
+def _write_dictionary(codes: np.ndarray, dictionary: list, directory: Path, stem: str) -> dict:
+    size = len(dictionary)
+    code_type = np.int8 if size < 2**7 else np.int16 if size < 2**15 else np.int32
+    np.save(directory / f"{stem}.npy", codes.astype(code_type))
+    with open(directory / f"{stem}.dict.json", "w", encoding="utf-8") as file:
+        json.dump([_to_json_value(value) for value in dictionary], file, ensure_ascii=False)
+    return dict(kind="dictionary", dtype=np.dtype(code_type).name, file=f"{stem}.npy", dictionary=f"{stem}.dict.json")
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def open_column_store(directory: str) -> pd.DataFrame:
+    """
+    Открывает колоночное хранилище через mmap без копирования данных.
+    Числа и даты - массивы numpy поверх файлов, строки - категории с кодами поверх файлов.
+    Страницы файлов общие для всех процессов через кэш ОС. Файлы открытой версии остаются
+    доступны и после записи новой версии.
+    """
+    path = Path(directory) / column_store_version(directory)
+    with open(path / MANIFEST, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported column store format: {manifest.get('format')}")
+
+    data: dict[str, Any] = {}
+    for column in manifest["columns"]:
+        array = np.load(path / column["file"], mmap_mode="r")
+        if column["kind"] == "dictionary":
+            with open(path / column["dictionary"], "r", encoding="utf-8") as file:
+                dictionary = json.load(file)
+            data[column["name"]] = pd.Categorical.from_codes(array, categories=dictionary, validate=False)
+        elif column["kind"] == "masked":
+            mask = np.load(path / column["mask"], mmap_mode="r")
+            data[column["name"]] = pd.arrays.IntegerArray(np.asarray(array), np.asarray(mask))
+        else:
+            data[column["name"]] = array
+
+    return pd.DataFrame(data, copy=False)
+
+
+def column_store_version(directory: str) -> str:
+    """
+    Возвращает текущую версию хранилища
+    """
+    with open(Path(directory) / CURRENT, "r", encoding="utf-8") as file:
+        return file.read().strip()
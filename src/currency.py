@@ -0,0 +1,179 @@
+import os
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+from src.logging_setup import setup_logger
+from src.quota import BACKGROUND
+from src.utils import API_KEY_FOR_CURRENT_EXCHANGE_RATE, APILAYER_URL, MARKET_SCHEDULERS, parse_payment_dates
+
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("currency")
+
+RATES_PATH = MODULE_DIR.parent / "data" / "exchange_rates.csv"
+TIMESERIES_URL = f"{APILAYER_URL}/timeseries"
+MAX_TIMESERIES_DAYS = 365
+RATE_COLUMNS = ["date", "currency", "rate"]
+
+
+def load_rate_table(file_path: str = str(RATES_PATH)) -> pd.DataFrame:
+    """
+    Загружает таблицу курсов (дата, валюта, курс к рублю) с диска
+    """
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "currency": [], "rate": []})
+
+    table = pd.read_csv(file_path, parse_dates=["date"])
+    return table[RATE_COLUMNS]
+
+
+def save_rate_table(table: pd.DataFrame, file_path: str = str(RATES_PATH)) -> None:
+    """
+    Сохраняет таблицу курсов на диск
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    table.sort_values(["currency", "date"]).to_csv(file_path, index=False, date_format="%Y-%m-%d")
+
+
+def fetch_rate_history(currencies: list[str], start_date: date, end_date: date) -> pd.DataFrame:
+    """
+    Загружает курсы валют к рублю за период запросами timeseries, по одному запросу на каждые 365 дней
+    """
+    frames: list[pd.DataFrame] = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(end_date, chunk_start + timedelta(days=MAX_TIMESERIES_DAYS - 1))
+        fetch = partial(_fetch_timeseries, currencies, chunk_start, chunk_end)
+        frames.append(MARKET_SCHEDULERS["apilayer"].call(fetch, BACKGROUND))
+        chunk_start = chunk_end + timedelta(days=1)
+
+    if not frames:
+        return load_rate_table("")
+    return pd.concat(frames, ignore_index=True)
+
+
+def _fetch_timeseries(currencies: list[str], start_date: date, end_date: date) -> pd.DataFrame:
+    headers = {"apikey": API_KEY_FOR_CURRENT_EXCHANGE_RATE}
+    params = {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "base": "RUB",
+        "symbols": ",".join(currencies),
+    }
+    response = requests.get(TIMESERIES_URL, headers=headers, params=params)
+    rates = response.json()["rates"]
+
+    rows = [
+        (day, currency, 1 / float(value))
+        for day, day_rates in rates.items()
+        for currency, value in day_rates.items()
+        if value
+    ]
+    table = pd.DataFrame(rows, columns=RATE_COLUMNS)
+    table["date"] = pd.to_datetime(table["date"])
+    return table
+
+
+def update_rate_table(
+    currencies: list[str], start_date: date, end_date: date, file_path: str = str(RATES_PATH)
+) -> pd.DataFrame:
+    """
+    Дополняет таблицу курсов на диске недостающими датами для валют и возвращает её.
+    Валюты с одинаковыми недостающими промежутками загружаются одним запросом.
+    """
+    table = load_rate_table(file_path)
+    currencies = sorted({code for code in currencies if code != "RUB"})
+
+    missing: dict[tuple[date, date], list[str]] = {}
+    for currency in currencies:
+        known = table.loc[table["currency"] == currency, "date"]
+        if known.empty:
+            spans = [(start_date, end_date)]
+        else:
+            first, last = known.min().date(), known.max().date()
+            spans = [(start_date, first - timedelta(days=1)), (last + timedelta(days=1), end_date)]
+        for span in spans:
+            if span[0] <= span[1]:
+                missing.setdefault(span, []).append(currency)
+
+    if not missing:
+        return table
+
+    fetched = [fetch_rate_history(codes, *span) for span, codes in missing.items()]
+    table = pd.concat([table, *fetched], ignore_index=True).drop_duplicates(["date", "currency"], keep="last")
+    save_rate_table(table, file_path)
+    logger.info("Rate table updated: %s spans, %s rows", len(missing), len(table))
+    return table
+
+
+def convert_to_rub(
+    transactions: pd.DataFrame,
+    rates: pd.DataFrame,
+    amount_column: str = "Сумма платежа",
+    currency_column: str = "Валюта платежа",
+    date_column: str = "Дата платежа",
+) -> pd.DataFrame:
+    """
+    Пересчитывает суммы в рубли по курсу на дату операции (последний известный курс не позже даты).
+    Исходные сумма и валюта сохраняются в столбцах "Исходная ...", операции без курса остаются без изменений.
+    """
+    result = transactions.copy()
+    if result.empty:
+        return result
+
+    currencies = result[currency_column].astype("string").fillna("RUB").to_numpy(dtype=object)
+    foreign = currencies != "RUB"
+    result[f"Исходная {amount_column.lower()}"] = result[amount_column]
+    result[f"Исходная {currency_column.lower()}"] = result[currency_column]
+    if not foreign.any() or rates.empty:
+        return result
+
+    positions = np.flatnonzero(foreign)
+    left = pd.DataFrame(
+        {
+            "position": positions,
+            "date": parse_payment_dates(result[date_column].iloc[positions]).to_numpy(dtype="datetime64[ns]"),
+            "currency": currencies[positions],
+        }
+    )
+    left = left.dropna(subset=["date"]).sort_values("date").astype({"currency": object})
+    right = rates.astype({"date": "datetime64[ns]", "currency": object, "rate": float}).sort_values("date")
+
+    joined = pd.merge_asof(left, right, on="date", by="currency", direction="backward")
+    joined = joined.dropna(subset=["rate"])
+
+    missing = len(positions) - len(joined)
+    if missing:
+        logger.warning("No exchange rate for %s transactions", missing)
+
+    target = joined["position"].to_numpy()
+    amounts = result[amount_column].to_numpy(dtype=float).copy()
+    amounts[target] = np.round(amounts[target] * joined["rate"].to_numpy(), 2)
+    codes = currencies.copy()
+    codes[target] = "RUB"
+
+    result[amount_column] = amounts
+    result[currency_column] = codes
+    return result
+
+
+def convert_records_to_rub(transactions: list[dict], rates: Optional[pd.DataFrame] = None) -> list[dict]:
+    """
+    Пересчитывает суммы списка операций в рубли по таблице курсов (по умолчанию - сохранённой на диске)
+    """
+    if rates is None:
+        rates = load_rate_table()
+    if not transactions or rates.empty:
+        return transactions
+
+    frame = pd.DataFrame(transactions)
+    if "Валюта платежа" not in frame or "Дата платежа" not in frame:
+        return transactions
+
+    records: list[dict] = convert_to_rub(frame, rates).to_dict(orient="records")
+    return records
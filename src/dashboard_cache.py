@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from src.singleflight import SingleFlight
+
+# Настройки, которые не входят в сводку по операциям: курсы, цены и статус бюджетов считаются при каждом показе
+PAGE_SETTINGS = ("user_currencies", "user_stocks", "budgets")
+
+
+def dataset_version(*file_paths: str) -> Optional[str]:
+    """
+    Возвращает версию набора файлов по времени изменения и размеру.
+    Если основного (первого) файла нет, возвращает None. Отсутствующие дополнительные файлы учитываются как "-"
+    """
+    if not file_paths or not os.path.exists(file_paths[0]):
+        return None
+
+    parts = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            parts.append("-")
+            continue
+        parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+
+def settings_hash(user_settings: dict) -> str:
+    """
+    Возвращает хеш настроек, влияющих на сводку по операциям (всё, кроме валют, акций и бюджетов)
+    """
+    relevant = {key: value for key, value in user_settings.items() if key not in PAGE_SETTINGS}
+    payload = json.dumps(relevant, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class DashboardCache:
+    """
+    LRU-кэш сводок главной страницы по ключу (выписка, начало месяца, конец периода, версия данных, хеш настроек).
+    Записи разных выписок и версий хранятся вместе, при переполнении вытесняется давно не использованная.
+    Если задан persist_path, кэш сохраняется в JSON и загружается при создании.
+    """
+
+    def __init__(self, max_entries: int = 128, persist_path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def make_key(file_path: str, start: str, end: str, version: str, settings_digest: str) -> str:
+        """
+        Формирует ключ записи. Выписка учитывается по абсолютному пути: версия по времени изменения и размеру
+        у разных файлов может совпасть
+        """
+        return "|".join([os.path.realpath(file_path), start, end, settings_digest, version])
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Возвращает запись и отмечает её как недавно использованную
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Сохраняет запись, при переполнении вытесняет давно не использованные
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            snapshot = list(self._entries.items()) if self.persist_path else None
+
+        if snapshot is not None:
+            self._save(snapshot)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Возвращает запись из кэша или вычисляет и сохраняет её.
+        Одновременные промахи по одному ключу вычисляют запись один раз
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def compute_and_put() -> Any:
+            result = compute()
+            self.put(key, result)
+            return result
+
+        return self._flights.do(key, compute_and_put)
+
+    def clear(self) -> None:
+        """
+        Очищает кэш
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Возвращает размер кэша и счётчики попаданий
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _load(self) -> None:
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except (json.JSONDecodeError, OSError):
+            return
+        for key, value in entries[-self.max_entries :]:
+            self._entries[key] = value
+
+    def _save(self, entries: list) -> None:
+        if not self.persist_path:
+            return
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        temporary = f"{self.persist_path}.tmp"
+        with self._save_lock:
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(entries, file, ensure_ascii=False)
+            os.replace(temporary, self.persist_path)
@@ -0,0 +1,180 @@
+import bz2
+import gzip
+import json
+import lzma
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Callable, Optional
+
+import pandas as pd
+from openpyxl import Workbook  # type: ignore[import-untyped]
+
+from src.column_store import write_column_store
+from src.logging_setup import setup_logger
+
+logger = setup_logger("export")
+
+CHUNK_SIZE = 10000
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+FORMAT_EXTENSIONS = {".json": "json", ".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".xlsx": "xlsx"}
+OPENERS: dict[str, Callable[..., IO]] = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+NESTED_KEYS = ("date", "category")
+
+EXPORT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+_pending: list[Future] = []
+_pending_lock = threading.Lock()
+
+
+def detect_format(filename: str) -> tuple[str, Optional[str]]:
+    """
+    Определяет формат и сжатие по имени файла: report.csv.gz -> ("csv", "gzip").
+    Имя без расширения или с неизвестным расширением - json, колоночное хранилище задаётся только file_format
+    """
+    stem, extension = os.path.splitext(filename)
+    compression = COMPRESSION_SUFFIXES.get(extension.lower())
+    if compression:
+        stem, extension = os.path.splitext(stem)
+    return FORMAT_EXTENSIONS.get(extension.lower(), "json"), compression
+
+
+def to_frame(result: Any, keys: tuple[str, ...] = NESTED_KEYS) -> pd.DataFrame:
+    """
+    Приводит результат отчёта к таблице. Вложенные словари списков записей
+    ({дата: {категория: [...]}}) разворачиваются, ключи уровней попадают в столбцы keys
+    """
+    if isinstance(result, pd.DataFrame):
+        return result
+    if isinstance(result, list):
+        return pd.DataFrame(result)
+    if isinstance(result, dict) and all(isinstance(value, (dict, list)) for value in result.values()):
+        rows = list(_flatten(result, keys, {}))
+        return pd.DataFrame(rows)
+    return pd.DataFrame([result])
+
+
+def _flatten(value: Any, keys: tuple[str, ...], prefix: dict) -> Any:
+    if isinstance(value, list):
+        for item in value:
+            yield {**prefix, **item} if isinstance(item, dict) else {**prefix, "value": item}
+        return
+    level = keys[len(prefix)] if len(prefix) < len(keys) else f"key_{len(prefix)}"
+    for key, item in value.items():
+        yield from _flatten(item, keys, {**prefix, level: key})
+
+
+def _chunks(frame: pd.DataFrame, chunk_size: int) -> Any:
+    for start in range(0, max(len(frame), 1), chunk_size):
+        yield start, frame.iloc[start : start + chunk_size]
+
+
+def _open(filename: str, compression: Optional[str]) -> IO:
+    if compression is None:
+        return open(filename, "w", encoding="utf-8", newline="")
+    return OPENERS[compression](filename, "wt", encoding="utf-8", newline="")
+
+
+def _write_json_file(handle: IO, result: Any, chunk_size: int) -> None:
+    if isinstance(result, pd.DataFrame):
+        result.to_json(handle, orient="records", force_ascii=False, indent=2)
+    else:
+        json.dump(result, handle, ensure_ascii=False, indent=2, default=str)
+
+
+def _write_csv(handle: IO, result: Any, chunk_size: int) -> None:
+    for start, chunk in _chunks(to_frame(result), chunk_size):
+        chunk.to_csv(handle, index=False, header=start == 0)
+
+
+def _write_ndjson(handle: IO, result: Any, chunk_size: int) -> None:
+    frame = to_frame(result)
+    for _, chunk in _chunks(frame, chunk_size):
+        if not chunk.empty:
+            lines = chunk.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+            handle.write(lines.rstrip("\n") + "\n")
+
+
+def _write_xlsx(filename: str, result: Any, chunk_size: int) -> None:
+    frame = to_frame(result)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("report")
+    sheet.append([str(column) for column in frame.columns])
+    for _, chunk in _chunks(frame, chunk_size):
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(filename)
+
+
+TEXT_WRITERS: dict[str, Callable[[IO, Any, int], None]] = {
+    "json": _write_json_file,
+    "csv": _write_csv,
+    "ndjson": _write_ndjson,
+}
+
+
+def export_report(
+    filename: str,
+    result: Any,
+    file_format: Optional[str] = None,
+    compression: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> str:
+    """
+    Записывает результат отчёта в файл формата json, csv, ndjson, xlsx или columns (колоночное хранилище,
+    filename - каталог, только при file_format="columns"). Формат и сжатие (gzip, bz2, xz) по умолчанию
+    определяются по имени файла. Таблицы пишутся частями по chunk_size строк, файл появляется под итоговым
+    именем только целиком. Возвращает имя записанного файла.
+    """
+    detected_format, detected_compression = detect_format(filename)
+    file_format = file_format or detected_format
+    compression = compression or detected_compression
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+    if file_format == "columns":
+        if compression:
+            raise ValueError("Compression is not supported for the columns format")
+        write_column_store(to_frame(result), filename)
+        return filename
+
+    temporary = f"{filename}.tmp"
+    if file_format == "xlsx":
+        if compression:
+            raise ValueError("Compression is not supported for the xlsx format")
+        _write_xlsx(temporary, result, chunk_size)
+    elif file_format in TEXT_WRITERS:
+        with _open(temporary, compression) as handle:
+            TEXT_WRITERS[file_format](handle, result, chunk_size)
+    else:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    os.replace(temporary, filename)
+    logger.info("Report written: %s", filename)
+    return filename
+
+
+def submit_export(write: Callable[..., Any], *args: Any) -> Future:
+    """
+    Выполняет запись в фоновом потоке, записи выполняются по очереди в порядке вызова
+    """
+    future = EXPORT_EXECUTOR.submit(write, *args)
+    future.add_done_callback(_log_failure)
+    with _pending_lock:
+        _pending[:] = [item for item in _pending if not item.done()]
+        _pending.append(future)
+    return future
+
+
+def _log_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        logger.error("Background export failed: %s", error)
+
+
+def wait_for_exports(timeout: Optional[float] = None) -> None:
+    """
+    Дожидается завершения фоновых записей, ошибки записи выбрасываются
+    """
+    with _pending_lock:
+        pending = list(_pending)
+    for future in pending:
+        future.result(timeout=timeout)
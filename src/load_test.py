@@ -0,0 +1,149 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import requests
+
+from src import utils
+from src.market_stub import MarketStubServer
+from src.quota import ProviderScheduler, RateLimited
+from src.views import main_page
+
+MODULE_DIR = Path(__file__).resolve().parent
+DATA_PATH = MODULE_DIR.parent / "data" / "operations.xlsx"
+SETTINGS_PATH = MODULE_DIR.parent / "user_settings.json"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def latency_report(latencies: list[float]) -> dict[str, float]:
+    """
+    Возвращает перцентили и максимум задержек в миллисекундах
+    """
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    report = {f"p{percentile}": round(float(np.percentile(values, percentile)), 2) for percentile in PERCENTILES}
+    report["max"] = round(float(values.max()), 2)
+    return report
+
+
+def drive(render: Callable[[], Any], renders: int, concurrency: int) -> dict[str, Any]:
+    """
+    Выполняет render renders раз в concurrency потоках и возвращает задержки, ошибки и пропускную способность
+    """
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def timed() -> None:
+        started = time.perf_counter()
+        try:
+            render()
+        except Exception as error:
+            with lock:
+                errors[type(error).__name__] = errors.get(type(error).__name__, 0) + 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for future in [executor.submit(timed) for _ in range(renders)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "renders": renders,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed": round(elapsed, 3),
+        "renders_per_second": round(renders / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": latency_report(latencies),
+    }
+
+
+def run_load_test(
+    renders: int = 200,
+    concurrency: int = 16,
+    date_string: str = "2021-10-30 15:12:30",
+    file_path: str = str(DATA_PATH),
+    settings_path: str = str(SETTINGS_PATH),
+    latency: float = 0.05,
+    jitter: float = 0.02,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_delay: float = 0.05,
+    seed: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Запускает заглушку курсов и акций, направляет на неё запросы utils и рендерит главную страницу
+    renders раз в concurrency потоках. Квоты провайдеров на время теста снимаются, повторы ждут retry_delay.
+    Возвращает перцентили задержек, ошибки и счётчики заглушки и объединения запросов.
+    """
+    saved = (utils.APILAYER_URL, utils.ALPHA_VANTAGE_URL, dict(utils.MARKET_SCHEDULERS))
+    with MarketStubServer(
+        latency=latency, jitter=jitter, error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=seed
+    ) as stub:
+        utils.APILAYER_URL = stub.apilayer_url
+        utils.ALPHA_VANTAGE_URL = stub.alpha_vantage_url
+        for name in utils.MARKET_SCHEDULERS:
+            utils.MARKET_SCHEDULERS[name] = ProviderScheduler(
+                name, per_minute=None, base_delay=retry_delay, retry_on=(RateLimited, requests.RequestException)
+            )
+        flights_before = utils.get_market_data_metrics()
+        try:
+            result = drive(lambda: main_page(date_string, file_path, settings_path), renders, concurrency)
+        finally:
+            metrics = utils.get_market_data_metrics()
+            utils.APILAYER_URL, utils.ALPHA_VANTAGE_URL = saved[0], saved[1]
+            utils.MARKET_SCHEDULERS.update(saved[2])
+
+    result["stub"] = stub.stats()
+    result["market"] = {
+        name: {key: metrics[name][key] - flights_before[name][key] for key in ("calls", "executed", "deduplicated")}
+        for name in ("currency_rates", "stock_prices")
+    }
+    result["providers"] = metrics["providers"]
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Запускает нагрузочный тест и выводит отчёт в JSON
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.load_test", description="Нагрузочный тест главной страницы")
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--date", default="2021-10-30 15:12:30")
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--settings", default=str(SETTINGS_PATH))
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка заглушки, с")
+    parser.add_argument("--jitter", type=float, default=0.02, help="разброс задержки, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов о превышении лимита")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    report = run_load_test(
+        args.renders,
+        args.concurrency,
+        args.date,
+        args.data,
+        args.settings,
+        args.latency,
+        args.jitter,
+        args.error_rate,
+        args.rate_limit_rate,
+        seed=args.seed,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import os
+import sys
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.logging_setup import setup_logger
+from src.merchants import MERCHANT_COLUMN, MERCHANTS
+
+logger = setup_logger("loader")
+
+CATEGORY_COLUMNS = ["Номер карты", "Статус", "Валюта операции", "Валюта платежа", "Категория"]
+MONEY_COLUMNS = ["Сумма операции", "Сумма платежа", "Кэшбэк", "Сумма операции с округлением"]
+INTEGER_COLUMNS = ["MCC", "Бонусы (включая кэшбэк)", "Округление на инвесткопилку"]
+DATE_COLUMNS = {"Дата операции": "%d.%m.%Y %H:%M:%S", "Дата платежа": "%d.%m.%Y"}
+INTERNED_COLUMNS = ["Описание"]
+REQUIRED_COLUMNS = [
+    "Дата операции",
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Категория",
+    "Описание",
+]
+NOT_NULL_COLUMNS = ["Дата операции", "Дата платежа", "Статус", "Сумма платежа", "Валюта платежа"]
+
+
+class SchemaError(ValueError):
+    """
+    Выписка не соответствует схеме: problems - список проблем {"row", "column", "value", "problem"}
+    """
+
+    def __init__(self, message: str, problems: list[dict]) -> None:
+        super().__init__(message)
+        self.problems = problems
+
+
+def read_transactions_frame(file_path: str, compact: bool = False, validate: bool = False) -> pd.DataFrame:
+    """
+    Считывает финансовые операции из Excel в DataFrame без преобразования в список словарей.
+    При validate=True строки с ошибками отбрасываются (см. validate_transactions),
+    при compact=True столбцы переводятся в компактные типы (см. compact_transactions)
+    """
+    if not os.path.exists(file_path):
+        logger.warning("File not found")
+        return pd.DataFrame()
+
+    if os.path.getsize(file_path) == 0:
+        logger.warning("File is empty")
+        return pd.DataFrame()
+
+    logger.info("Reading file from: %s", file_path)
+    transactions = pd.read_excel(file_path)
+    if validate:
+        transactions = validated(transactions)
+    if compact:
+        return compact_transactions(transactions)
+    return transactions
+
+
+def validate_transactions(transactions: pd.DataFrame) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    Проверяет выписку за один проход по столбцам: наличие обязательных столбцов, формат дат,
+    числовые суммы и коды, отсутствие пропусков в NOT_NULL_COLUMNS.
+    Возвращает типизированные строки без ошибок (даты - datetime64, суммы - float64) и список всех проблем
+    {"row": номер строки, "column", "value", "problem"}. Без обязательных столбцов выбрасывает SchemaError.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in transactions]
+    if missing:
+        missing_columns = [dict(row=None, column=column, value=None, problem="missing column") for column in missing]
+        raise SchemaError(f"Missing columns: {', '.join(missing)}", missing_columns)
+
+    result = pd.DataFrame(index=transactions.index)
+    bad = np.zeros(len(transactions), dtype=bool)
+    problems: list[dict] = []
+    for column in transactions.columns:
+        values = transactions[column]
+        if column in DATE_COLUMNS:
+            typed, empty = _parse_dates(values, DATE_COLUMNS[column])
+            problem = "invalid date"
+        elif column in MONEY_COLUMNS or column in INTEGER_COLUMNS:
+            typed = pd.to_numeric(values, errors="coerce")
+            if column in MONEY_COLUMNS:
+                typed = typed.astype(float)
+            empty = values.isna().to_numpy()
+            problem = "not a number"
+        else:
+            result[column] = values
+            if column in NOT_NULL_COLUMNS:
+                empty = values.isna().to_numpy()
+                bad |= empty
+                problems.extend(_problems(values, empty, column, "missing value"))
+            continue
+
+        invalid = typed.isna().to_numpy() & ~empty
+        bad |= invalid
+        problems.extend(_problems(values, invalid, column, problem))
+        if column in NOT_NULL_COLUMNS:
+            bad |= empty
+            problems.extend(_problems(values, empty, column, "missing value"))
+        result[column] = typed
+
+    problems.sort(key=lambda item: item["row"])
+    return result[~bad], problems
+
+
+def _parse_dates(values: pd.Series, date_format: str) -> tuple[pd.Series, np.ndarray]:
+    # Даты в выписке повторяются, поэтому разбирается только каждое уникальное значение
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    text = pd.Series(uniques, dtype="string").str.strip()
+    text = text.where(text != "")
+    parsed = pd.to_datetime(text, format=date_format, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    known = codes >= 0
+    dates = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+    dates[known] = parsed[codes[known]]
+    empty = ~known
+    empty[known] = text.isna().to_numpy()[codes[known]]
+    return pd.Series(dates, index=values.index), empty
+
+
+def _problems(values: pd.Series, mask: np.ndarray, column: str, problem: str) -> list[dict]:
+    positions = np.flatnonzero(mask)
+    return [
+        dict(row=int(position), column=column, value=_to_json_value(values.iloc[position]), problem=problem)
+        for position in positions
+    ]
+
+
+def _to_json_value(value: Any) -> Any:
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def validated(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Возвращает строки выписки без ошибок (validate_transactions), проблемы записываются в лог
+    """
+    clean, problems = validate_transactions(transactions)
+    if problems:
+        rows = len({item["row"] for item in problems})
+        logger.warning("Schema validation: %s rows dropped, problems: %s", rows, problems[:20])
+    return clean
+
+
+def to_records(transactions: pd.DataFrame) -> list[dict]:
+    """
+    Возвращает операции списком словарей в формате read_transactions_xlsx (даты - строки исходного формата)
+    """
+    frame = transactions.copy()
+    for column, date_format in DATE_COLUMNS.items():
+        if column in frame and pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime(date_format).astype(object)
+    records: list[dict] = frame.to_dict(orient="records")
+    return records
+
+
+def compact_transactions(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Переводит операции в компактные типы: категории для строк с малым числом значений,
+    копейки в int64 для денежных столбцов, datetime64 для дат, интернированные строки для описаний.
+    После описания добавляется столбец канонических продавцов MERCHANT_COLUMN в словарном кодировании.
+    """
+    result = pd.DataFrame(index=transactions.index)
+    for column in transactions.columns:
+        values = transactions[column]
+        if column in CATEGORY_COLUMNS:
+            result[column] = values.astype("category")
+        elif column in MONEY_COLUMNS:
+            result[column] = to_kopecks(values)
+        elif column in INTEGER_COLUMNS:
+            result[column] = _downcast_integer(values)
+        elif column in DATE_COLUMNS:
+            result[column] = pd.to_datetime(values, format=DATE_COLUMNS[column], errors="coerce")
+        elif column in INTERNED_COLUMNS:
+            result[column] = _intern_strings(values)
+        else:
+            result[column] = values
+    if "Описание" in transactions.columns and MERCHANT_COLUMN not in transactions.columns:
+        position = list(result.columns).index("Описание") + 1
+        result.insert(position, MERCHANT_COLUMN, MERCHANTS.normalize(transactions["Описание"]))
+    return result
+
+
+def to_kopecks(amounts: pd.Series) -> pd.Series:
+    """
+    Переводит суммы в рублях в целые копейки (int64, при пропусках - Int64)
+    """
+    kopecks = (pd.to_numeric(amounts, errors="coerce") * 100).round()
+    if kopecks.isna().any():
+        return kopecks.astype("Int64")
+    return kopecks.astype("int64")
+
+
+def to_rubles(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Возвращает копию компактных операций с денежными столбцами в рублях (float64)
+    """
+    result = transactions.copy()
+    for column in MONEY_COLUMNS:
+        if column in result:
+            result[column] = result[column].astype("Float64").astype(float) / 100
+    return result
+
+
+def _downcast_integer(values: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.isna().any():
+        non_null = numbers.dropna()
+        if (non_null != np.round(non_null)).any():
+            return numbers
+        low, high = (non_null.min(), non_null.max()) if len(non_null) else (0, 0)
+        for dtype, info in ((pd.Int16Dtype(), np.iinfo(np.int16)), (pd.Int32Dtype(), np.iinfo(np.int32))):
+            if info.min <= low and high <= info.max:
+                return numbers.astype(dtype)
+        return numbers.astype(pd.Int64Dtype())
+    if (numbers != np.round(numbers)).any():
+        return numbers
+    return pd.to_numeric(numbers.astype("int64"), downcast="integer")
+
+
+def _intern_strings(values: pd.Series) -> pd.Series:
+    interned = {value: sys.intern(value) for value in values.dropna().unique() if isinstance(value, str)}
+    return pd.Series(
+        [interned.get(value, value) if isinstance(value, str) else None for value in values],
+        index=values.index,
+        dtype=object,
+    )
+
+
+def column_bytes(values: pd.Series) -> int:
+    """
+    Возвращает объём памяти столбца в байтах. Для строковых объектов одинаковые строки считаются один раз
+    """
+    if values.dtype != object:
+        return int(values.memory_usage(index=False, deep=True))
+
+    unique_objects = {id(value): value for value in values.to_numpy()}
+    return int(values.memory_usage(index=False, deep=False)) + sum(
+        sys.getsizeof(value) for value in unique_objects.values() if value is not None
+    )
+
+
+def memory_report(transactions: pd.DataFrame) -> list[dict]:
+    """
+    Возвращает объём памяти по столбцам (по убыванию) и итоговую строку "total"
+    """
+    report: list[dict[str, Any]] = [
+        dict(column=str(column), dtype=str(transactions[column].dtype), bytes=column_bytes(transactions[column]))
+        for column in transactions.columns
+    ]
+    report.sort(key=lambda item: item["bytes"], reverse=True)
+    report.append(dict(column="total", dtype="", bytes=sum(item["bytes"] for item in report)))
+    return report
@@ -0,0 +1,172 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Any, Optional
+
+MODULE_DIR = Path(__file__).resolve().parent
+LOG_DIR = Path(os.getenv("LOG_DIR", str(MODULE_DIR.parent / "logs")))
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s: %(message)s"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Ограничения для отдельных логгеров: sample_rate - доля сохраняемых записей ниже WARNING,
+# per_second - не больше стольких записей ниже WARNING в секунду. WARNING и выше проходят всегда.
+LOGGER_LIMITS: dict[str, dict[str, Any]] = {
+    "server": {"per_second": 50},
+    "utils": {"per_second": 100},
+    "services": {"per_second": 100},
+}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю sample_rate записей ниже WARNING и не больше per_second таких записей в секунду
+    (корзина токенов). Отброшенные записи считаются в dropped.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, per_second: Optional[float] = None) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.per_second = per_second
+        self.dropped = 0
+        self._tokens = float(per_second or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return False
+        if self.per_second is None:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.per_second), self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+            if self._tokens < 1:
+                self.dropped += 1
+                return False
+            self._tokens -= 1
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Кладёт запись в очередь без ожидания и без форматирования: сообщение собирается в фоновом потоке.
+    При переполнении очереди запись отбрасывается.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FileRouter(logging.Handler):
+    """
+    Пишет записи в файл logs/<имя логгера>.log, файлы открываются при настройке логгера
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.handlers: dict[str, logging.Handler] = {}
+
+    def add(self, name: str) -> None:
+        if name in self.handlers:
+            return
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(LOG_DIR / f"{name}.log", mode="w", encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.handlers[name] = file_handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        handler = self.handlers.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+    def flush(self) -> None:
+        for handler in self.handlers.values():
+            handler.flush()
+
+
+LOG_QUEUE: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+QUEUE_HANDLER = DroppingQueueHandler(LOG_QUEUE)
+_router = _FileRouter()
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
+    """
+    Возвращает логгер, записи которого уходят в очередь и пишутся в logs/<name>.log фоновым потоком.
+    Записи не передаются обработчикам корневого логгера. Уровень и ограничения берутся из LOG_LEVEL и LOGGER_LIMITS
+    """
+    global _listener
+    logger = logging.getLogger(name)
+    with _setup_lock:
+        logger.setLevel(level or LOG_LEVEL)
+        logger.propagate = False
+        _router.add(name)
+        if QUEUE_HANDLER not in logger.handlers:
+            logger.addHandler(QUEUE_HANDLER)
+            limits = LOGGER_LIMITS.get(name)
+            if limits:
+                logger.addFilter(SamplingFilter(**limits))
+        if _listener is None:
+            _listener = QueueListener(LOG_QUEUE, _router)
+            _listener.start()
+            atexit.register(stop_logging)
+    return logger
+
+
+def flush_logs() -> None:
+    """
+    Дожидается записи на диск всех записей, попавших в очередь до вызова
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = QueueListener(LOG_QUEUE, _router)
+            _listener.start()
+        _router.flush()
+
+
+def stop_logging() -> None:
+    """
+    Дописывает очередь на диск и останавливает фоновый поток, вызывается при завершении процесса
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        _router.flush()
+
+
+def logging_stats() -> dict:
+    """
+    Возвращает размер очереди и число отброшенных записей (переполнение очереди и ограничения логгеров)
+    """
+    sampled = {
+        name: sum(item.dropped for item in logging.getLogger(name).filters if isinstance(item, SamplingFilter))
+        for name in _router.handlers
+    }
+    return {"queued": LOG_QUEUE.qsize(), "dropped_queue_full": QUEUE_HANDLER.dropped, "dropped_sampled": sampled}
@@ -1,20 +1,326 @@
+import argparse
+import cProfile
+import io
+import json
+import pstats
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO
+
 import pandas as pd
 
-from src.reports import spending_by_category
-from src.services import simple_search
-from src.utils import read_transactions_xlsx
-from src.views import main_page
+from src.aggregates import BASELINES, DIMENSIONS, SpendingAggregates
+from src.anomaly import AnomalyDetector
+from src.backfill import BACKFILL_PATH, backfill_dashboards
+from src.column_store import write_column_store
+from src.currency import convert_records_to_rub, update_rate_table
+from src.loader import read_transactions_frame
+from src.logging_setup import setup_logger
+from src.recurring import find_recurring
+from src.reports import (batch_spending_by_category, batch_spending_comparison, spending_by_category,
+                         spending_comparison)
+from src.services import search_transactions, simple_search
+from src.stock_history import PRICES_PATH, read_price_range, update_price_history
+from src.utils import filter_by_date, get_greeting, load_json_data, parse_payment_dates, read_transactions_xlsx
+from src.views import get_market_data, get_month_bounds, get_transactions_summary, main_page
+
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("main")
+
+DATA_PATH = MODULE_DIR.parent / "data" / "operations.xlsx"
+SETTINGS_PATH = MODULE_DIR.parent / "user_settings.json"
+COLUMN_STORE_PATH = MODULE_DIR.parent / "data" / "column_store"
+BATCH_CHUNK_SIZE = 32
+PROFILE_LINES = 25
+
+
+def read_batch(file_path: str) -> list[str]:
+    """
+    Считывает непустые строки файла пакетного режима ("-" - стандартный ввод)
+    """
+    if file_path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(file_path, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def write_ndjson(records: Iterable[dict], output: TextIO) -> int:
+    """
+    Записывает записи по одной JSON-строке по мере готовности и возвращает их число
+    """
+    count = 0
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        output.flush()
+        count += 1
+    return count
+
+
+def map_chunks(func: Callable[..., list], items: list[str], workers: int, *args: Any) -> Iterator[Any]:
+    """
+    Применяет func(chunk, *args) к последовательным частям items и отдаёт результаты по порядку по мере готовности.
+    При workers > 1 части обрабатываются в процессах.
+    """
+    chunks = [items[i : i + BATCH_CHUNK_SIZE] for i in range(0, len(items), BATCH_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from func(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        for result in executor.map(func, chunks, *[[arg] * len(chunks) for arg in args]):
+            yield from result
+
+
+def _dashboard_summaries(dates: list[str], transactions: list[dict], cashback_rules: Optional[list]) -> list[dict]:
+    summaries = []
+    for date_string in dates:
+        date_start_of_month, date_end_of_month = get_month_bounds(date_string)
+        filtered_transactions = filter_by_date(transactions, date_start_of_month, date_end_of_month)
+        summaries.append({"date": date_string, **get_transactions_summary(filtered_transactions, cashback_rules)})
+    return summaries
+
+
+def _search_results(queries: list[str], transactions: list[dict]) -> list[dict]:
+    return [{"query": query, "transactions": search_transactions(query, transactions)} for query in queries]
+
+
+def run_dashboard(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Главная страница для даты или, в пакетном режиме, для каждой даты из файла
+    """
+    if not args.batch:
+        output.write(main_page(args.date, args.data, args.settings) + "\n")
+        return
+
+    dates = read_batch(args.batch)
+    user_settings = load_json_data(args.settings)
+    transactions = convert_records_to_rub(read_transactions_xlsx(args.data, validate=True))
+    market = get_market_data(user_settings)
+    greeting = get_greeting(datetime.now().hour)
+
+    cashback_rules = user_settings.get("cashback_rules")
+    summaries = map_chunks(_dashboard_summaries, dates, args.workers, transactions, cashback_rules)
+    count = write_ndjson(({"greeting": greeting, **summary, **market} for summary in summaries), output)
+    logger.info("Dashboard batch: %s dates", count)
+
+
+def run_search(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Поиск по строке или, в пакетном режиме, по каждой строке из файла
+    """
+    if not args.batch:
+        output.write(simple_search(args.query, args.data) + "\n")
+        return
+
+    queries = read_batch(args.batch)
+    transactions = read_transactions_xlsx(args.data)
+    count = write_ndjson(map_chunks(_search_results, queries, args.workers, transactions), output)
+    logger.info("Search batch: %s queries", count)
+
+
+def run_report(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Траты по категории за три месяца до даты или, в пакетном режиме, до каждой даты из файла
+    """
+    transactions = pd.DataFrame(convert_records_to_rub(read_transactions_xlsx(args.data, validate=True)))
+    if not args.batch:
+        result = spending_by_category(transactions, args.category, args.date)
+        output.write(json.dumps(result.to_dict(orient="records"), ensure_ascii=False, indent=2, default=str) + "\n")
+        return
+
+    dates = read_batch(args.batch)
+    report = batch_spending_by_category(transactions, dates, [args.category], workers=args.workers)
+    records = ({"date": date_string, "transactions": report[date_string][args.category]} for date_string in dates)
+    count = write_ndjson(records, output)
+    logger.info("Report batch: %s dates", count)
+
+
+def run_compare(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Изменение трат по категориям или картам за месяц даты по сравнению с прошлым месяцем или годом.
+    Траты по месяцам считаются один раз, в пакетном режиме каждая дата сравнивается по ним
+    """
+    transactions = convert_records_to_rub(read_transactions_xlsx(args.data, validate=True))
+    aggregates = SpendingAggregates.from_transactions(transactions)
+    if not args.batch:
+        result = spending_comparison(aggregates, args.date, args.by, args.baseline)
+        output.write(json.dumps(result.to_dict(orient="records"), ensure_ascii=False, indent=2) + "\n")
+        return
+
+    dates = read_batch(args.batch)
+    report = batch_spending_comparison(aggregates, dates, args.by, args.baseline)
+    records = ({"date": date_string, "comparison": report[date_string]} for date_string in dates)
+    count = write_ndjson(records, output)
+    logger.info("Comparison batch: %s dates", count)
+
+
+def run_ingest(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Загружает выписку в колоночное хранилище, при --rates дополняет таблицу курсов за период выписки
+    """
+    transactions = read_transactions_frame(args.data, compact=True)
+    result: dict[str, Any] = {"rows": len(transactions)}
+
+    if args.rates and not transactions.empty:
+        dates = parse_payment_dates(transactions["Дата платежа"]).dropna()
+        currencies = transactions["Валюта платежа"].dropna().astype(str).unique().tolist()
+        if not dates.empty:
+            table = update_rate_table(currencies, dates.min().date(), dates.max().date())
+            result["rates"] = len(table)
+
+    result["version"] = write_column_store(transactions, args.output)
+    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    logger.info("Ingested %s rows into %s", result["rows"], args.output)
+
+
+def run_backfill(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Сводки главной страницы за все месяцы выписки с продолжением прерванного запуска
+    """
+    stats = backfill_dashboards(args.data, args.settings, args.output, workers=args.workers)
+    output.write(json.dumps(stats, ensure_ascii=False) + "\n")
+
+
+def run_anomalies(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Необычно крупные траты по категории или карте, результат - NDJSON.
+    Каждая трата сравнивается с более ранними, поэтому операции подаются по возрастанию даты платежа
+    (в выписке они идут от новых к старым), операции без даты - в конце
+    """
+    detector = AnomalyDetector(threshold=args.threshold, min_count=args.min_count)
+    transactions = convert_records_to_rub(read_transactions_xlsx(args.data, validate=True))
+    payment_dates = parse_payment_dates(pd.Series([item.get("Дата платежа") for item in transactions], dtype=object))
+    order = payment_dates.sort_values(kind="stable", na_position="last").index
+    count = write_ndjson(detector.anomalies(transactions[index] for index in order), output)
+    logger.info("Anomalies: %s of %s transactions", count, len(transactions))
+
+
+def run_recurring(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Регулярные платежи и подписки, результат - NDJSON
+    """
+    transactions = convert_records_to_rub(read_transactions_xlsx(args.data, validate=True))
+    count = write_ndjson(find_recurring(transactions, min_payments=args.min_payments), output)
+    logger.info("Recurring payments: %s", count)
+
+
+def run_prices(args: argparse.Namespace, output: TextIO) -> None:
+    """
+    Дневные цены акций из локального хранилища за период, результат - NDJSON.
+    При --update хранилище сначала дополняется недостающими днями, иначе запросов к провайдеру нет
+    """
+    symbols = args.symbols or load_json_data(args.settings).get("user_stocks", [])
+    if args.update:
+        added = update_price_history(symbols, directory=args.store)
+        logger.info("Price history updated: %s", added)
+
+    start = date.fromisoformat(args.start) if args.start else None
+    end = date.fromisoformat(args.end) if args.end else None
+
+    def records() -> Iterator[dict]:
+        for symbol in symbols:
+            prices = read_price_range(symbol, start, end, args.store)
+            prices["date"] = prices["date"].dt.strftime("%Y-%m-%d")
+            for row in prices.to_dict(orient="records"):
+                yield {"stock": symbol.upper(), **row}
+
+    count = write_ndjson(records(), output)
+    logger.info("Prices: %s rows for %s stocks", count, len(symbols))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Возвращает разбор аргументов командной строки
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Анализ банковских операций")
+    parser.add_argument("--data", default=str(DATA_PATH), help="файл выписки (xlsx)")
+    parser.add_argument("--settings", default=str(SETTINGS_PATH), help="файл пользовательских настроек")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов для пакетной обработки")
+    parser.add_argument("--profile", action="store_true", help="вывести профиль cProfile и пик памяти в stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dashboard = subparsers.add_parser("dashboard", help="главная страница")
+    dashboard.add_argument("date", nargs="?", default=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    dashboard.add_argument("--batch", help="файл с датами, результат - NDJSON")
+    dashboard.set_defaults(handler=run_dashboard)
+
+    search = subparsers.add_parser("search", help="простой поиск")
+    search.add_argument("query", nargs="?", default="")
+    search.add_argument("--batch", help="файл со строками поиска, результат - NDJSON")
+    search.set_defaults(handler=run_search)
+
+    report = subparsers.add_parser("report", help="траты по категории")
+    report.add_argument("category")
+    report.add_argument("date", nargs="?")
+    report.add_argument("--batch", help="файл с датами, результат - NDJSON")
+    report.set_defaults(handler=run_report)
+
+    compare = subparsers.add_parser("compare", help="изменение трат к прошлому месяцу или году")
+    compare.add_argument("date", nargs="?")
+    compare.add_argument("--by", choices=list(DIMENSIONS), default="category")
+    compare.add_argument("--baseline", choices=list(BASELINES), default="month")
+    compare.add_argument("--batch", help="файл с датами, результат - NDJSON")
+    compare.set_defaults(handler=run_compare)
+
+    ingest = subparsers.add_parser("ingest", help="загрузка выписки в колоночное хранилище")
+    ingest.add_argument("--output", default=str(COLUMN_STORE_PATH), help="каталог хранилища")
+    ingest.add_argument("--rates", action="store_true", help="дополнить таблицу курсов")
+    ingest.set_defaults(handler=run_ingest)
+
+    backfill = subparsers.add_parser("backfill", help="сводки главной страницы за все месяцы")
+    backfill.add_argument("--output", default=str(BACKFILL_PATH), help="каталог файлов ГГГГ-ММ.json")
+    backfill.set_defaults(handler=run_backfill)
+
+    anomalies = subparsers.add_parser("anomalies", help="необычно крупные траты")
+    anomalies.add_argument("--threshold", type=float, default=3.0, help="порог z-оценки")
+    anomalies.add_argument("--min-count", type=int, default=5, help="минимум предшествующих трат по ключу")
+    anomalies.set_defaults(handler=run_anomalies)
+
+    recurring = subparsers.add_parser("recurring", help="регулярные платежи и подписки")
+    recurring.add_argument("--min-payments", type=int, default=3, help="минимум платежей в серии")
+    recurring.set_defaults(handler=run_recurring)
+
+    prices = subparsers.add_parser("prices", help="дневные цены акций из локального хранилища")
+    prices.add_argument("symbols", nargs="*", help="акции (по умолчанию - user_stocks из настроек)")
+    prices.add_argument("--start", help="первый день периода ГГГГ-ММ-ДД")
+    prices.add_argument("--end", help="последний день периода ГГГГ-ММ-ДД")
+    prices.add_argument("--update", action="store_true", help="дополнить хранилище недостающими днями")
+    prices.add_argument("--store", default=str(PRICES_PATH), help="каталог хранилища цен")
+    prices.set_defaults(handler=run_prices)
+
+    return parser
+
 
-# проверка работы модуля views
-print("проверка работы модуля views")
-print(main_page("2021-10-30 15:12:30"))
+def main(argv: Optional[list[str]] = None, output: Optional[TextIO] = None, errors: Optional[TextIO] = None) -> int:
+    """
+    Точка входа командной строки
+    """
+    output = output or sys.stdout
+    errors = errors or sys.stderr
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        args.handler(args, output)
+        return 0
 
-# проверка работы модуля services
-print("проверка работы модуля services")
-print(simple_search("продукты", "../data/operations.xlsx"))
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        profiler.runcall(args.handler, args, output)
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        errors.write(stream.getvalue())
+        errors.write(f"peak memory: {peak / 2**20:.1f} MiB\n")
+    return 0
 
-# проверка работы модуля reports
-print("проверка работы модуля reports")
 
-df = pd.DataFrame(read_transactions_xlsx("../data/operations.xlsx"))
-print(spending_by_category(df, "Супермаркеты", "2021-10-30 15:12:30"))
+if __name__ == "__main__":
+    sys.exit(main())
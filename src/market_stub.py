@@ -0,0 +1,218 @@
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_RATES = {"USD": 73.21, "EUR": 87.08, "CNY": 11.35, "GBP": 101.45}
+DEFAULT_PRICES = {"AAPL": 150.12, "AMZN": 3173.18, "GOOGL": 2742.39, "MSFT": 296.71, "TSLA": 1007.08}
+
+
+class MarketStubServer:
+    """
+    Локальная замена apilayer (exchangerates_data/latest) и Alpha Vantage (GLOBAL_QUOTE) для нагрузочных тестов.
+    Каждый ответ задерживается на latency ± jitter секунд, с вероятностью error_rate возвращается 500,
+    с вероятностью rate_limit_rate - ответ о превышении лимита в формате провайдера
+    (apilayer - статус 429, Alpha Vantage - статус 200 с полем "Note").
+    Запросы обрабатываются в отдельных потоках, счётчики доступны по /stats и через stats().
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rates = dict(DEFAULT_RATES)
+        self.prices = dict(DEFAULT_PRICES)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+        self._httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        Адрес сервера
+        """
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def apilayer_url(self) -> str:
+        """
+        Значение для APILAYER_URL
+        """
+        return f"{self.base_url}/exchangerates_data"
+
+    @property
+    def alpha_vantage_url(self) -> str:
+        """
+        Значение для ALPHA_VANTAGE_URL
+        """
+        return f"{self.base_url}/query"
+
+    def start(self) -> "MarketStubServer":
+        """
+        Запускает сервер в фоновом потоке
+        """
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="market-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Обслуживает запросы в текущем потоке до остановки процесса
+        """
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MarketStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        """
+        Возвращает число запросов, ошибок, ответов о лимите и максимум одновременных запросов
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def respond(self, path: str, params: dict) -> tuple[int, dict]:
+        """
+        Возвращает статус и тело ответа на запрос с учётом задержки, ошибок и лимитов
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["in_flight"] += 1
+            self._counters["max_in_flight"] = max(self._counters["max_in_flight"], self._counters["in_flight"])
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            outcome = self._random.random()
+
+        try:
+            time.sleep(delay)
+            provider = "apilayer" if path.startswith("/exchangerates_data") else "alpha_vantage"
+            if outcome < self.error_rate:
+                self._count("errors")
+                return 500, {"message": "Internal Server Error"}
+            if outcome < self.error_rate + self.rate_limit_rate:
+                self._count("rate_limited")
+                if provider == "apilayer":
+                    return 429, {"message": "API rate limit exceeded"}
+                return 200, {"Note": "Thank you for using Alpha Vantage! Our standard API rate limit is 5 per minute."}
+            if path == "/exchangerates_data/latest":
+                return self._latest(params)
+            if path == "/query" and params.get("function") == "GLOBAL_QUOTE":
+                return self._global_quote(params)
+            return 404, {"message": "no Route matched with those values"}
+        finally:
+            with self._lock:
+                self._counters["in_flight"] -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _latest(self, params: dict) -> tuple[int, dict]:
+        base = params.get("base", "EUR")
+        if base not in self.rates:
+            return 400, {"success": False, "error": {"code": 201, "type": "invalid_base_currency"}}
+        return 200, {
+            "success": True,
+            "timestamp": int(time.time()),
+            "base": base,
+            "date": date.today().isoformat(),
+            "rates": {"RUB": self.rates[base]},
+        }
+
+    def _global_quote(self, params: dict) -> tuple[int, dict]:
+        symbol = params.get("symbol", "")
+        if symbol not in self.prices:
+            return 200, {"Global Quote": {}}
+        price = self.prices[symbol]
+        return 200, {
+            "Global Quote": {
+                "01. symbol": symbol,
+                "05. price": f"{price:.4f}",
+                "07. latest trading day": date.today().isoformat(),
+                "08. previous close": f"{price:.4f}",
+            }
+        }
+
+
+def _handler_for(stub: MarketStubServer) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            if parts.path == "/stats":
+                status, body = 200, stub.stats()
+            else:
+                status, body = stub.respond(parts.path, params)
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Запускает заглушку до остановки процесса
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.market_stub", description="Заглушка API курсов и акций")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.02, help="разброс задержки, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов о превышении лимита")
+    args = parser.parse_args(argv)
+
+    stub = MarketStubServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.rate_limit_rate)
+    print(f"APILAYER_URL={stub.apilayer_url}")
+    print(f"ALPHA_VANTAGE_URL={stub.alpha_vantage_url}")
+    stub.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MERCHANT_COLUMN = "Продавец"
+
+# Правила для известных сетей: каноническое имя и регулярные выражения для нормализованного описания
+DEFAULT_RULES: dict[str, list[str]] = {
+    "Магнит": [r"^магнит\b", r"^magnit\b"],
+    "Пятёрочка": [r"^пятерочка\b", r"^pyaterochka\b"],
+    "Перекрёсток": [r"^перекресток\b", r"^perekrestok\b"],
+    "Дикси": [r"^дикси\b", r"^diksi\b", r"^dixy\b"],
+    "Лента": [r"^лента\b", r"^lenta\b"],
+    "ВкусВилл": [r"^вкусвилл\b", r"^vkusvill\b"],
+    "SPAR": [r"^spar\b", r"^спар\b"],
+    "Яндекс Такси": [r"^яндекс такси\b", r"^yandex taxi\b", r"^yandex go\b"],
+    "McDonald's": [r"^mcdonald", r"^макдоналдс\b"],
+    "Бургер Кинг": [r"^бургер кинг\b", r"^burger king\b"],
+    "KFC": [r"^kfc\b", r"^ростикс\b"],
+    "Ozon": [r"^ozon\b", r"^озон\b"],
+    "Wildberries": [r"^wildberries\b", r"^вайлдберриз\b"],
+}
+
+LEGAL_FORMS = r"\b(?:ооо|оао|пао|зао|ао|ип|ooo|oao|pao|zao|ao|ip|llc|ltd)\b"
+
+
+def merchant_key(description: str) -> str:
+    """
+    Ключ описания для сравнения: нижний регистр, ё -> е, без цифр, знаков препинания и организационных форм
+    ("ООО", "ИП", ...), пробелы схлопнуты
+    """
+    text = description.lower().replace("ё", "е")
+    text = re.sub(r"[\W\d_]+", " ", text)
+    text = re.sub(LEGAL_FORMS, " ", text)
+    return " ".join(text.split())
+
+
+class MerchantNormalizer:
+    """
+    Таблица соответствия описаний операций каноническим продавцам. Продавец определяется первым подходящим
+    правилом rules (имя: регулярные выражения для merchant_key), иначе ключом описания; имя продавца без правила -
+    самый частый вариант описания при первом появлении. Номер продавца - позиция в names, он не меняется.
+    Соответствия уже встречавшихся описаний кэшируются (не больше max_descriptions, при переполнении вытесняются
+    самые старые), новые описания разбираются по одному разу.
+    """
+
+    def __init__(self, rules: Optional[dict[str, list[str]]] = None, max_descriptions: int = 100000) -> None:
+        self.rules = [
+            (name, re.compile("|".join(patterns)))
+            for name, patterns in (DEFAULT_RULES if rules is None else rules).items()
+        ]
+        self.names: list[str] = []
+        self._by_key: dict[str, int] = {}
+        self._by_description: dict[str, int] = {}
+        self.max_descriptions = max_descriptions
+        self._lock = threading.Lock()
+
+    def merchant_ids(self, descriptions: pd.Series) -> np.ndarray:
+        """
+        Номера продавцов для описаний, -1 для пустых. Разбираются только уникальные описания
+        """
+        codes, uniques = pd.factorize(descriptions, use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        with self._lock:
+            order = np.argsort(-counts, kind="stable")
+            ids = np.empty(len(uniques), dtype=np.int64)
+            for position in order:
+                ids[position] = self._lookup(uniques[position])
+        result = np.full(len(codes), -1, dtype=np.int64)
+        known = codes >= 0
+        result[known] = ids[codes[known]]
+        return result
+
+    def _lookup(self, description: object) -> int:
+        if not isinstance(description, str):
+            return -1
+        merchant_id = self._by_description.get(description)
+        if merchant_id is not None:
+            return merchant_id
+
+        key = merchant_key(description)
+        if not key:
+            merchant_id = -1
+        else:
+            name = next((name for name, pattern in self.rules if pattern.search(key)), None)
+            key = f"rule:{name}" if name is not None else key
+            merchant_id = self._by_key.get(key, -1)
+            if merchant_id < 0:
+                merchant_id = len(self.names)
+                self.names.append(name if name is not None else " ".join(description.split()))
+                self._by_key[key] = merchant_id
+        if len(self._by_description) >= self.max_descriptions:
+            del self._by_description[next(iter(self._by_description))]
+        self._by_description[description] = merchant_id
+        return merchant_id
+
+    def normalize(self, descriptions: pd.Series) -> pd.Series:
+        """
+        Столбец канонических продавцов в словарном кодировании. Словарь содержит только продавцов из descriptions
+        (по возрастанию номеров), поэтому размер результата не зависит от числа всех известных продавцов
+        """
+        ids = self.merchant_ids(descriptions)
+        known = ids >= 0
+        present, local_codes = np.unique(ids[known], return_inverse=True)
+        codes = np.full(len(ids), -1, dtype=np.int64)
+        codes[known] = local_codes
+        categories = pd.Index([self.names[merchant_id] for merchant_id in present.tolist()], dtype=object)
+        categorical = pd.Categorical.from_codes(codes, categories=categories)
+        return pd.Series(categorical, index=descriptions.index, name=MERCHANT_COLUMN)
+
+
+MERCHANTS = MerchantNormalizer()
+
+
+def add_merchant_column(transactions: pd.DataFrame, normalizer: Optional[MerchantNormalizer] = None) -> pd.DataFrame:
+    """
+    Возвращает операции со столбцом MERCHANT_COLUMN после "Описание". Если столбец уже есть, операции не меняются
+    """
+    if MERCHANT_COLUMN in transactions.columns or "Описание" not in transactions.columns:
+        return transactions
+    result = transactions.copy()
+    result.insert(
+        list(result.columns).index("Описание") + 1,
+        MERCHANT_COLUMN,
+        (normalizer or MERCHANTS).normalize(transactions["Описание"]),
+    )
+    return result
+
+
+def top_merchants(transactions: pd.DataFrame, k: int = 5) -> list[dict]:
+    """
+    Возвращает k продавцов с наибольшими тратами: сумма трат и число операций.
+    Суммы считаются по кодам словаря без сравнения строк
+    """
+    frame = add_merchant_column(transactions)
+    if frame.empty or MERCHANT_COLUMN not in frame.columns:
+        return []
+
+    merchants = frame[MERCHANT_COLUMN].astype("category")
+    codes = merchants.cat.codes.to_numpy()
+    amounts = pd.to_numeric(frame["Сумма платежа"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    spends = (codes >= 0) & (amounts < 0)
+    if "Статус" in frame.columns:
+        spends &= frame["Статус"].eq("OK").to_numpy()
+
+    size = len(merchants.cat.categories)
+    totals = np.bincount(codes[spends], weights=-amounts[spends], minlength=size)
+    counts = np.bincount(codes[spends], minlength=size)
+    top = np.flatnonzero(counts)
+    top = top[np.lexsort((top, -totals[top]))][:k]
+    return [
+        {
+            "merchant": str(merchants.cat.categories[int(code)]),
+            "total_spent": round(float(totals[code]), 2),
+            "transactions": int(counts[code]),
+        }
+        for code in top
+    ]
+
+
+def merchant_mask(transactions: pd.DataFrame, search_string: str) -> np.ndarray:
+    """
+    Отмечает операции, имя продавца которых содержит строку поиска. Строки сравниваются только для словаря
+    """
+    merchants = add_merchant_column(transactions)[MERCHANT_COLUMN].astype("category")
+    pattern = search_string.lower()
+    matched = np.array([pattern in str(name).lower() for name in merchants.cat.categories], dtype=bool)
+    # Код -1 (пустое описание) указывает на добавленный в конец False
+    return np.append(matched, False)[merchants.cat.codes.to_numpy()]
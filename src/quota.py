@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Optional
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class RateLimited(Exception):
+    """
+    Провайдер отклонил запрос из-за превышения лимита. payload - исходный ответ провайдера
+    """
+
+    def __init__(self, payload: Any, daily: bool = False) -> None:
+        super().__init__(f"Rate limit reached: {payload}")
+        self.payload = payload
+        self.daily = daily
+
+
+class QuotaExceeded(Exception):
+    """
+    Квота провайдера исчерпана, запрос не отправлялся
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Запросы к провайдеру временно остановлены после серии ошибок
+    """
+
+
+class ProviderScheduler:
+    """
+    Планировщик запросов к внешнему API с учётом лимитов провайдера.
+    Поминутный лимит реализован корзиной токенов, суточный - счётчиком за календарный день.
+    Фоновые запросы не используют последние background_reserve токенов и пропускают вперёд
+    ожидающие интерактивные запросы. Ошибки из retry_on повторяются с экспоненциальной задержкой
+    со случайным разбросом, после failure_threshold ошибок подряд запросы прекращаются на reset_timeout секунд.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: Optional[int],
+        per_day: Optional[int] = None,
+        background_reserve: int = 1,
+        max_retries: int = 2,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_wait: Optional[float] = 15.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        retry_on: tuple = (RateLimited, ConnectionError, TimeoutError),
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.name = name
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.background_reserve = background_reserve if per_minute is None else min(background_reserve, per_minute - 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retry_on = retry_on
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Сбрасывает счётчики, корзину токенов и состояние предохранителя
+        """
+        with self._cond:
+            self._tokens = float(self.per_minute or 0)
+            self._updated = time.monotonic()
+            self._day = date.today()
+            self._day_count = 0
+            self._interactive_waiting = 0
+            self._failures = 0
+            self._opened_at: Optional[float] = None
+            self._trial_in_progress = False
+            self.requests = 0
+            self.retries = 0
+            self.rejected = 0
+            self._cond.notify_all()
+
+    def call(self, func: Callable[[], Any], priority: int = INTERACTIVE, max_wait: Optional[float] = None) -> Any:
+        """
+        Выполняет func в пределах квоты провайдера с повторами и предохранителем.
+        max_wait ограничивает ожидание токена для интерактивных запросов, фоновые ждут без ограничения.
+        """
+        if max_wait is None and priority == INTERACTIVE:
+            max_wait = self.max_wait
+
+        attempt = 0
+        while True:
+            self._before_call()
+            try:
+                self._acquire(priority, max_wait)
+            except QuotaExceeded:
+                self._release_trial()
+                raise
+
+            try:
+                result = func()
+            except self.retry_on as error:
+                self._record_failure(error)
+                if attempt >= self.max_retries or self._is_open():
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                attempt += 1
+                with self._cond:
+                    self.retries += 1
+                self._sleep(delay)
+                continue
+            except Exception as error:
+                # Ошибки вне retry_on не повторяются, но учитываются предохранителем и завершают пробный запрос
+                self._record_failure(error)
+                raise
+
+            self._record_success()
+            return result
+
+    def stats(self) -> dict:
+        """
+        Возвращает состояние квоты и счётчики запросов
+        """
+        with self._cond:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 2),
+                "used_today": self._day_count,
+                "requests": self.requests,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "circuit_open": self._opened_at is not None,
+            }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.per_minute is not None:
+            self._tokens = min(float(self.per_minute), self._tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._day_count = 0
+
+    def _acquire(self, priority: int, max_wait: Optional[float]) -> None:
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.per_day is not None and self._day_count >= self.per_day:
+                        self.rejected += 1
+                        raise QuotaExceeded(f"{self.name}: daily quota of {self.per_day} requests is exhausted")
+
+                    if self.per_minute is None:
+                        break
+
+                    reserve = 0 if priority == INTERACTIVE else self.background_reserve
+                    yields = priority != INTERACTIVE and self._interactive_waiting > 0
+                    if self._tokens >= 1 + reserve and not yields:
+                        self._tokens -= 1
+                        break
+
+                    wait = max((1 + reserve - self._tokens) * 60 / self.per_minute, 0.01)
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise QuotaExceeded(f"{self.name}: no request tokens available within {max_wait}s")
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+
+                self._day_count += 1
+                self.requests += 1
+            finally:
+                if priority == INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def _is_open(self) -> bool:
+        with self._cond:
+            return self._opened_at is not None
+
+    def _before_call(self) -> None:
+        with self._cond:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_progress:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name}: circuit is open after {self._failures} failures")
+            self._trial_in_progress = True
+
+    def _release_trial(self) -> None:
+        with self._cond:
+            self._trial_in_progress = False
+
+    def _record_success(self) -> None:
+        with self._cond:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def _record_failure(self, error: BaseException) -> None:
+        with self._cond:
+            self._failures += 1
+            if isinstance(error, RateLimited):
+                self._tokens = 0.0
+                if error.daily and self.per_day is not None:
+                    self._day_count = self.per_day
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_progress = False
@@ -0,0 +1,137 @@
+from typing import Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.utils import parse_payment_dates
+
+PERIODS = {"weekly": 7, "monthly": 30, "quarterly": 91, "yearly": 365}
+DAY = np.timedelta64(1, "D")
+
+
+def normalize_descriptions(descriptions: pd.Series) -> pd.Series:
+    """
+    Приводит описания к виду для сравнения: нижний регистр, без цифр и знаков препинания.
+    Обрабатываются только уникальные значения, коды совпадают для описаний вроде "Яндекс Плюс 12/21" и "ЯНДЕКС ПЛЮС"
+    """
+    codes, uniques = pd.factorize(descriptions.astype("string"), use_na_sentinel=True)
+    normalized = pd.Series(uniques, dtype="string").str.lower().str.replace(r"[\W\d_]+", " ", regex=True).str.strip()
+    normalized = normalized.where(normalized != "")
+    result = pd.Series(pd.NA, index=descriptions.index, dtype="string")
+    present = codes >= 0
+    result[present] = normalized.to_numpy()[codes[present]]
+    return result
+
+
+def amount_buckets(amounts: pd.Series, tolerance: float = 0.1) -> pd.Series:
+    """
+    Номер корзины суммы на логарифмической шкале: суммы, отличающиеся меньше чем на tolerance, чаще всего
+    попадают в одну корзину
+    """
+    buckets: pd.Series = np.floor(np.log(amounts.abs()) / np.log1p(tolerance)).astype("int64")
+    return buckets
+
+
+def find_recurring(
+    transactions: Union[list[dict], pd.DataFrame],
+    tolerance: float = 0.1,
+    min_payments: int = 3,
+    periods: Optional[dict[str, int]] = None,
+    period_tolerance: float = 0.2,
+    min_regular: float = 0.75,
+) -> list[dict]:
+    """
+    Находит регулярные платежи: траты с одинаковым описанием (normalize_descriptions) и близкой суммой
+    (amount_buckets), повторяющиеся не меньше min_payments раз примерно через один из периодов periods.
+    Период подходит, если медианный интервал между платежами отличается от него не больше чем на
+    period_tolerance, и так же от него отличаются не меньше min_regular интервалов.
+    Группы собираются хешированием, операции сортируются один раз, время O(n log n).
+    """
+    periods = periods or PERIODS
+    frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+    if frame.empty or not {"Дата платежа", "Сумма платежа", "Описание"} <= set(frame.columns):
+        return []
+
+    dates = frame["Дата платежа"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = parse_payment_dates(dates)
+    amounts = pd.to_numeric(frame["Сумма платежа"], errors="coerce")
+    descriptions = normalize_descriptions(frame["Описание"])
+
+    mask = (amounts < 0) & dates.notna() & descriptions.notna()
+    if "Статус" in frame.columns:
+        mask &= frame["Статус"].astype("string").fillna("OK").eq("OK")
+    if not mask.any():
+        return []
+
+    spends = pd.DataFrame(
+        {
+            "key": descriptions[mask],
+            "bucket": amount_buckets(amounts[mask], tolerance),
+            "date": dates[mask].to_numpy(dtype="datetime64[ns]"),
+            "amount": -amounts[mask],
+            "row": np.flatnonzero(mask.to_numpy()),
+        }
+    )
+    spends["group"] = spends.groupby(["key", "bucket"], sort=False).ngroup()
+    spends = spends.iloc[np.lexsort((spends["date"].to_numpy(), spends["group"].to_numpy()))]
+
+    groups = spends["group"].to_numpy()
+    intervals = pd.DataFrame(
+        {
+            "group": groups[1:],
+            "days": np.diff(spends["date"].to_numpy()) / DAY,
+        }
+    )[groups[1:] == groups[:-1]]
+    if intervals.empty:
+        return []
+
+    by_group = intervals.groupby("group")["days"]
+    summary = pd.DataFrame({"payments": by_group.size() + 1, "interval": by_group.median()})
+    summary = summary[summary["payments"] >= min_payments]
+    if summary.empty:
+        return []
+
+    lengths = np.array(list(periods.values()), dtype=float)
+    distance = np.abs(summary["interval"].to_numpy()[:, None] - lengths[None, :]) / lengths[None, :]
+    nearest = distance.argmin(axis=1)
+    summary["period"] = lengths[nearest]
+    summary["name"] = np.array(list(periods))[nearest]
+    summary = summary[distance[np.arange(len(summary)), nearest] <= period_tolerance]
+
+    candidates = intervals[intervals["group"].isin(summary.index)]
+    period = summary["period"].reindex(candidates["group"]).to_numpy()
+    regular = (np.abs(candidates["days"].to_numpy() - period) <= period * period_tolerance).astype(float)
+    share = pd.Series(regular).groupby(candidates["group"].to_numpy()).mean()
+    summary = summary[share.reindex(summary.index).fillna(0).to_numpy() >= min_regular]
+    if summary.empty:
+        return []
+
+    selected = spends[spends["group"].isin(summary.index)]
+    stats = selected.groupby("group").agg(
+        amount=("amount", "median"), first=("date", "first"), last=("date", "last"), row=("row", "last")
+    )
+    stats = stats.join(summary)
+
+    result = []
+    for _, item in stats.sort_values("amount", ascending=False).iterrows():
+        source = frame.iloc[int(item["row"])]
+        result.append(
+            {
+                "description": source["Описание"],
+                "category": _optional(source.get("Категория")),
+                "card": _optional(source.get("Номер карты")),
+                "amount": round(float(item["amount"]), 2),
+                "period": item["name"],
+                "interval_days": float(item["interval"]),
+                "payments": int(item["payments"]),
+                "first_date": item["first"].strftime("%d.%m.%Y"),
+                "last_date": item["last"].strftime("%d.%m.%Y"),
+                "next_date": (item["last"] + pd.Timedelta(days=int(item["period"]))).strftime("%d.%m.%Y"),
+            }
+        )
+    return result
+
+
+def _optional(value: Any) -> Any:
+    return None if pd.isna(value) else value
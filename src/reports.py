@@ -1,33 +1,41 @@
+import copy
 import json
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from functools import wraps
-from typing import Optional
+from pathlib import Path
+from typing import Optional, Union
 
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 
-from src.utils import filter_by_date, get_date
+from src.aggregates import SpendingAggregates, comparison_month
+from src.export import CHUNK_SIZE, detect_format, export_report, submit_export
+from src.merchants import MERCHANT_COLUMN, add_merchant_column
+from src.utils import filter_by_date, get_date, parse_payment_dates
 
+MODULE_DIR = Path(__file__).resolve().parent
 
-def _default_name(func):
-    return f"../reports/report_{func.__name__}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+REPORTS_PATH = MODULE_DIR.parent / "reports"
 
 
-def report_writer(arg=None):
+def _default_name(func, extension="json"):
+    return str(REPORTS_PATH / f"report_{func.__name__}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
+
+def report_writer(arg=None, file_format=None, compression=None, chunk_size=CHUNK_SIZE, background=False):
     """
-    Декоратор для формирования отчётов
+    Декоратор для формирования отчётов.
+    Формат (json, csv, ndjson, xlsx, columns) и сжатие определяются по имени файла или задаются
+    file_format и compression, таблицы пишутся частями по chunk_size строк (см. export.export_report).
+    При background=True функция возвращает результат сразу, запись выполняется в фоновом потоке
+    (дождаться её можно через export.wait_for_exports), в поток передаётся копия результата.
+    Имя без расширения или с неизвестным расширением записывается в json.
     """
     if callable(arg):  # @report_writer
-        func = arg
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            _write_json(_default_name(func), result)
-            return result
-
-        return wrapper
+        return report_writer()(arg)
 
     filename = None if arg is None else str(arg)
 
@@ -35,7 +43,13 @@ def report_writer(arg=None):
         @wraps(func)
         def wrapper(*args, **kwargs):
             result = func(*args, **kwargs)
-            _write_json(filename or _default_name(func), result)
+            target = filename or _default_name(func, file_format or "json")
+            if background:
+                # Вызывающий код может менять результат, пока поток записи его сериализует
+                snapshot = result.copy() if isinstance(result, pd.DataFrame) else copy.deepcopy(result)
+                submit_export(_export, target, snapshot, file_format, compression, chunk_size)
+            else:
+                _export(target, result, file_format, compression, chunk_size)
             return result
 
         return wrapper
@@ -43,6 +57,14 @@ def report_writer(arg=None):
     return decorator
 
 
+def _export(filename, result, file_format, compression, chunk_size):
+    detected_format, detected_compression = detect_format(filename)
+    if (file_format or detected_format) == "json" and not (compression or detected_compression):
+        _write_json(filename, result)
+    else:
+        export_report(filename, result, file_format, compression, chunk_size)
+
+
 def _write_json(filename, result):
     """
     Создаёт или генерирует json файл
@@ -80,3 +102,155 @@ def spending_by_category(transactions: pd.DataFrame, category: str, date: Option
     category_data = data[data["Категория"] == category]
     result = pd.DataFrame(category_data)
     return result
+
+
+@report_writer()
+def spending_by_merchant(transactions: pd.DataFrame, merchant: str, date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Возвращает траты у продавца (каноническое имя, см. merchants) за последние три месяца (от переданной даты).
+    Продавцы сравниваются по кодам словарного столбца, окно выбирается бинарным поиском по дате платежа.
+    """
+    end_date = datetime.now().date()
+    if date is not None:
+        end_date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S").date()
+
+    frame = add_merchant_column(transactions)
+    if frame.empty or MERCHANT_COLUMN not in frame.columns:
+        return pd.DataFrame()
+
+    sorted_transactions, payment_dates = sort_by_payment_date(frame)
+    window = select_period(sorted_transactions, payment_dates, end_date - relativedelta(months=3), end_date)
+    merchants = window[MERCHANT_COLUMN].astype("category")
+    if merchant not in merchants.cat.categories:
+        return window.iloc[0:0]
+    return window[merchants.cat.codes == merchants.cat.categories.get_loc(merchant)]
+
+
+@report_writer()
+def spending_comparison(
+    transactions: Union[pd.DataFrame, SpendingAggregates],
+    date: Optional[str] = None,
+    by: str = "category",
+    baseline: str = "month",
+) -> pd.DataFrame:
+    """
+    Возвращает изменение трат по категориям (by="category") или картам (by="card") за месяц переданной даты
+    по сравнению с предыдущим месяцем (baseline="month") или тем же месяцем прошлого года (baseline="year").
+    Вместо операций можно передать SpendingAggregates, посчитанные один раз для версии данных,
+    тогда сравнение не читает операции.
+    """
+    aggregates = (
+        transactions
+        if isinstance(transactions, SpendingAggregates)
+        else SpendingAggregates.from_transactions(transactions)
+    )
+    return aggregates.compare(by, comparison_month(date), baseline)
+
+
+@report_writer()
+def batch_spending_comparison(
+    transactions: Union[pd.DataFrame, SpendingAggregates],
+    dates: list[str],
+    by: str = "category",
+    baseline: str = "month",
+) -> dict[str, list[dict]]:
+    """
+    Возвращает изменение трат (см. spending_comparison) за месяц каждой из переданных дат.
+    Траты по месяцам считаются один раз для всех дат.
+    """
+    aggregates = (
+        transactions
+        if isinstance(transactions, SpendingAggregates)
+        else SpendingAggregates.from_transactions(transactions)
+    )
+    return {
+        date_string: _records(aggregates.compare(by, comparison_month(date_string), baseline)) for date_string in dates
+    }
+
+
+def _records(frame: pd.DataFrame) -> list[dict]:
+    """
+    Переводит DataFrame в список словарей, заменяя пропуски на None
+    """
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+
+
+def sort_by_payment_date(transactions: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Сортирует операции по дате платежа и возвращает их вместе с массивом разобранных дат.
+    Операции без корректной даты платежа отбрасываются.
+    """
+    payment_dates = parse_payment_dates(transactions["Дата платежа"])
+    valid = payment_dates.notna()
+    order = payment_dates[valid].argsort(kind="stable").to_numpy()
+    sorted_transactions = transactions[valid].iloc[order]
+    sorted_dates = payment_dates[valid].iloc[order].to_numpy(dtype="datetime64[ns]")
+    return sorted_transactions, sorted_dates
+
+
+def select_period(
+    sorted_transactions: pd.DataFrame, payment_dates: np.ndarray, start_date: date, end_date: date
+) -> pd.DataFrame:
+    """
+    Возвращает операции с датой платежа от start_date до end_date включительно бинарным поиском
+    """
+    left = np.searchsorted(payment_dates, np.datetime64(start_date, "ns"), side="left")
+    right = np.searchsorted(payment_dates, np.datetime64(end_date, "ns"), side="right")
+    return sorted_transactions.iloc[left:right]
+
+
+def spending_for_periods(
+    sorted_transactions: pd.DataFrame, payment_dates: np.ndarray, dates: list[str], categories: Optional[list[str]]
+) -> dict[str, dict[str, list[dict]]]:
+    """
+    Считает траты по категориям за три месяца до каждой из дат по результату sort_by_payment_date
+    """
+    result: dict[str, dict[str, list[dict]]] = {}
+    for date_string in dates:
+        end_date = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S").date()
+        start_date = end_date - relativedelta(months=3)
+        window = select_period(sorted_transactions, payment_dates, start_date, end_date)
+
+        by_category = {}
+        for category, group in window.groupby("Категория", sort=True):
+            if categories is None or category in categories:
+                by_category[str(category)] = _records(group)
+        if categories is not None:
+            for category in categories:
+                by_category.setdefault(category, [])
+        result[date_string] = by_category
+
+    return result
+
+
+@report_writer()
+def batch_spending_by_category(
+    transactions: pd.DataFrame,
+    dates: list[str],
+    categories: Optional[list[str]] = None,
+    workers: Optional[int] = None,
+) -> dict[str, dict[str, list[dict]]]:
+    """
+    Возвращает траты по всем категориям (или по заданным) за три месяца до каждой из переданных дат.
+    Даты разбираются и сортируются один раз, окна периодов выбираются бинарным поиском.
+    При workers > 1 периоды распределяются между процессами.
+    """
+    if transactions.empty or not dates:
+        return {date_string: {category: [] for category in categories or []} for date_string in dates}
+
+    sorted_transactions, payment_dates = sort_by_payment_date(transactions)
+
+    if not workers or workers <= 1 or len(dates) == 1:
+        return spending_for_periods(sorted_transactions, payment_dates, dates, categories)
+
+    chunks = [dates[i::workers] for i in range(workers) if dates[i::workers]]
+    result: dict[str, dict[str, list[dict]]] = {}
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        futures = [
+            executor.submit(spending_for_periods, sorted_transactions, payment_dates, chunk, categories)
+            for chunk in chunks
+        ]
+        for future in futures:
+            result.update(future.result())
+
+    return {date_string: result[date_string] for date_string in dates}
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src.aggregates import BASELINES, DIMENSIONS, comparison_month
+from src.budgets import budget_month
+from src.currency import convert_records_to_rub
+from src.logging_setup import logging_stats, setup_logger
+from src.reports import spending_for_periods
+from src.services import search_transactions
+from src.snapshot import DatasetSnapshot, SnapshotStore
+from src.utils import get_greeting, get_market_data_metrics, load_json_data, read_transactions_xlsx
+from src.views import get_market_data, get_month_bounds
+
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("server")
+
+DATA_PATH = MODULE_DIR.parent / "data" / "operations.xlsx"
+SETTINGS_PATH = MODULE_DIR.parent / "user_settings.json"
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """
+    Ошибка обработки запроса с HTTP-статусом
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class DashboardServer:
+    """
+    Асинхронный HTTP-сервер для главной страницы, поиска и отчётов.
+    Данные и индексы по ним хранятся в памяти неизменяемым снимком DatasetSnapshot, сводка по месяцу вычисляется
+    один раз для снимка, статус бюджетов берётся из журнала трат BudgetLedger. Новые операции и новая выписка
+    собираются в новый снимок вне цикла событий и публикуются заменой ссылки: запрос работает с одним снимком
+    от начала до конца без блокировок. Работа pandas выполняется в пуле потоков,
+    число одновременно обрабатываемых запросов ограничено.
+    """
+
+    def __init__(
+        self,
+        transactions: list[dict],
+        user_settings: dict,
+        workers: int = 4,
+        max_concurrency: int = 64,
+        queue_timeout: float = 1.0,
+        market_ttl: float = 60.0,
+        summary_cache_size: int = 256,
+    ) -> None:
+        self.user_settings = user_settings
+        self.queue_timeout = queue_timeout
+        self.market_ttl = market_ttl
+        self.snapshots = SnapshotStore(
+            DatasetSnapshot(transactions, user_settings.get("cashback_rules"), summary_cache_size=summary_cache_size)
+        )
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._market_data: Optional[dict] = None
+        self._market_updated = 0.0
+        self._market_task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.Server] = None
+        self._routes: dict[str, Callable[[dict], Awaitable[Any]]] = {
+            "/health": self.health,
+            "/metrics": self.metrics,
+            "/dashboard": self.dashboard,
+            "/search": self.search,
+            "/reports/spending_by_category": self.spending_report,
+            "/cards/history": self.card_history,
+            "/reports/comparison": self.comparison_report,
+            "/reports/category_stats": self.category_stats,
+        }
+
+    @property
+    def transactions(self) -> list[dict]:
+        """
+        Операции текущего снимка
+        """
+        return self.snapshots.current.transactions
+
+    async def add_transactions(self, transactions: list[dict]) -> DatasetSnapshot:
+        """
+        Собирает в пуле потоков снимок с добавленными операциями и публикует его: журнал бюджетов дополняется
+        только ими, сводки по месяцам пересчитываются в новом снимке. Цикл событий при этом не блокируется,
+        одновременные добавления применяются по очереди и не теряются
+        """
+        snapshot: DatasetSnapshot = await self._run_blocking(
+            self.snapshots.update, lambda current: current.extend(transactions)
+        )
+        return snapshot
+
+    async def reload(self, transactions: list[dict]) -> DatasetSnapshot:
+        """
+        Собирает снимок по новой выписке в пуле потоков и публикует его, запросы тем временем обслуживаются
+        предыдущим снимком
+        """
+        snapshot: DatasetSnapshot = await self._run_blocking(
+            self.snapshots.update, lambda current: current.replace(transactions)
+        )
+        return snapshot
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.Server:
+        """
+        Запускает сервер и возвращает объект asyncio.Server
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        logger.info("Server started on %s:%s", host, port)
+        return self._server
+
+    async def close(self) -> None:
+        """
+        Останавливает сервер и пул потоков
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._market_task is not None and not self._market_task.done():
+            self._market_task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Server stopped")
+
+    async def _run_blocking(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def health(self, params: dict) -> dict:
+        """
+        Проверка работоспособности сервера
+        """
+        snapshot = self.snapshots.current
+        return {"status": "ok", "transactions": len(snapshot.transactions), "version": snapshot.version}
+
+    async def metrics(self, params: dict) -> dict:
+        """
+        Статистика объединения запросов к API котировок и очереди логов
+        """
+        return {**get_market_data_metrics(), "logging": logging_stats()}
+
+    async def market_data(self) -> dict:
+        """
+        Возвращает курсы валют и акций, обновляя их не чаще раза в market_ttl секунд.
+        Одновременные запросы ожидают одно общее обновление.
+        """
+        if self._market_data is not None and time.monotonic() - self._market_updated < self.market_ttl:
+            return self._market_data
+
+        if self._market_task is None or self._market_task.done():
+            self._market_task = asyncio.create_task(self._refresh_market_data())
+        return await asyncio.shield(self._market_task)
+
+    async def _refresh_market_data(self) -> dict:
+        data: dict = await self._run_blocking(get_market_data, self.user_settings)
+        self._market_data = data
+        self._market_updated = time.monotonic()
+        return data
+
+    async def dashboard(self, params: dict) -> dict:
+        """
+        Данные главной страницы на дату date (ГГГГ-ММ-ДД ЧЧ:ММ:СС)
+        """
+        date_string = _required(params, "date")
+        try:
+            start, end = get_month_bounds(date_string)
+            start_date = datetime.strptime(start, "%d.%m.%Y").date()
+            end_date = datetime.strptime(end, "%d.%m.%Y").date()
+        except ValueError:
+            raise HTTPError(400, "Invalid date")
+
+        snapshot = self.snapshots.current
+        summary_future = self._run_blocking(snapshot.summary, start_date, end_date)
+        summary, market = await asyncio.gather(summary_future, self.market_data())
+
+        result = {"greeting": get_greeting(datetime.now().hour), **summary, **market}
+        if self.user_settings.get("budgets"):
+            result["budgets"] = snapshot.budgets.status(self.user_settings["budgets"], budget_month(end))
+        return result
+
+    async def card_history(self, params: dict) -> dict:
+        """
+        История трат и кешбэка по картам за months (по умолчанию 12) месяцев по месяц даты date включительно
+        """
+        date_string = _required(params, "date")
+        try:
+            _, end = get_month_bounds(date_string)
+            months = int(params.get("months", 12))
+        except ValueError:
+            raise HTTPError(400, "Invalid date or months")
+        if not 0 < months <= 120:
+            raise HTTPError(400, "Invalid date or months")
+
+        return {"cards": self.snapshots.current.card_history.history(budget_month(end), months)}
+
+    async def search(self, params: dict) -> list[dict]:
+        """
+        Поиск по описанию и категории
+        """
+        query = _required(params, "query")
+        snapshot = self.snapshots.current
+        result: list[dict] = await self._run_blocking(search_transactions, query, snapshot.transactions)
+        return result
+
+    async def spending_report(self, params: dict) -> list[dict]:
+        """
+        Траты по категории за три месяца до даты date
+        """
+        category = _required(params, "category")
+        date_string = params.get("date") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise HTTPError(400, "Invalid date")
+
+        snapshot = self.snapshots.current
+        result = await self._run_blocking(
+            spending_for_periods, snapshot.sorted_transactions, snapshot.payment_dates, [date_string], [category]
+        )
+        report: list[dict] = result[date_string][category]
+        return report
+
+    async def comparison_report(self, params: dict) -> list[dict]:
+        """
+        Изменение трат по категориям или картам (by) за месяц даты date к прошлому месяцу или году (baseline)
+        """
+        date_string = _required(params, "date")
+        by = params.get("by", "category")
+        baseline = params.get("baseline", "month")
+        if by not in DIMENSIONS or baseline not in BASELINES:
+            raise HTTPError(400, "Invalid by or baseline")
+        try:
+            month = comparison_month(date_string)
+        except ValueError:
+            raise HTTPError(400, "Invalid date")
+
+        aggregates = self.snapshots.current.aggregates
+        report: list[dict] = aggregates.compare(by, month, baseline).to_dict(orient="records")
+        return report
+
+    async def category_stats(self, params: dict) -> list[dict]:
+        """
+        Медиана и 95-й перцентиль размера траты и число различных продавцов по категориям (или категории category)
+        за месяцы ГГГГ-ММ с start по end включительно (по умолчанию end = start). Считается объединением
+        месячных скетчей снимка, операции не читаются
+        """
+        start = _required(params, "start")
+        end = params.get("end") or start
+        try:
+            valid = datetime.strptime(start, "%Y-%m") <= datetime.strptime(end, "%Y-%m")
+        except ValueError:
+            valid = False
+        if not valid:
+            raise HTTPError(400, "Invalid start or end")
+
+        categories = [params["category"]] if params.get("category") else None
+        return self.snapshots.current.sketches.stats(start, end, categories)
+
+    async def dispatch(self, method: str, target: str) -> tuple[int, Any]:
+        """
+        Выполняет запрос и возвращает статус и тело ответа
+        """
+        url = urlsplit(target)
+        handler = self._routes.get(url.path)
+        if handler is None:
+            return 404, {"error": "Not found"}
+        if method != "GET":
+            return 405, {"error": "Method not allowed"}
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Too many requests, rejecting %s", url.path)
+            return 503, {"error": "Server is busy"}
+
+        started = time.perf_counter()
+        try:
+            body = await handler(params)
+            logger.debug("GET %s 200 in %.1f ms", url.path, (time.perf_counter() - started) * 1000)
+            return 200, body
+        except HTTPError as error:
+            return error.status, {"error": error.message}
+        except Exception:
+            logger.exception("Request %s failed", target)
+            return 500, {"error": "Internal server error"}
+        finally:
+            self._semaphore.release()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = int(headers.get("content-length", 0) or 0)
+                if content_length:
+                    await reader.readexactly(content_length)
+
+                parts = request_line.decode("utf-8", errors="replace").split()
+                if len(parts) != 3:
+                    await self._send(writer, 400, {"error": "Bad request"}, keep_alive=False)
+                    break
+
+                method, target, version = parts
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, body = await self.dispatch(method, target)
+                await self._send(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, body: Any, keep_alive: bool) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+def _required(params: dict, name: str) -> str:
+    value = params.get(name)
+    if not value:
+        raise HTTPError(400, f"Parameter '{name}' is required")
+    return str(value)
+
+
+async def serve(
+    file_path: str = str(DATA_PATH),
+    settings_path: str = str(SETTINGS_PATH),
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 4,
+) -> None:
+    """
+    Загружает данные и обслуживает запросы до остановки процесса
+    """
+    transactions = convert_records_to_rub(read_transactions_xlsx(file_path, validate=True))
+    server = DashboardServer(transactions, load_json_data(settings_path), workers=workers)
+    asyncio_server = await server.start(host, port)
+    try:
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
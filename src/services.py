@@ -1,39 +1,68 @@
 import json
-import logging
-from pathlib import Path
 
-from src.utils import read_transactions_xlsx
+import pandas as pd
 
-MODULE_DIR = Path(__file__).resolve().parent
-LOG_DIR = MODULE_DIR.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
+from src.loader import to_records
+from src.logging_setup import setup_logger
+from src.merchants import MERCHANT_COLUMN, add_merchant_column, merchant_mask
+from src.recurring import find_recurring
+from src.utils import read_transactions_xlsx
 
-logger = logging.getLogger("services")
-logger.setLevel(logging.DEBUG)
-log_file = LOG_DIR / "services.log"
-file_handler = logging.FileHandler(log_file, mode="w")
-file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(funcName)s: %(message)s")
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
+logger = setup_logger("services")
 
 
-def simple_search(search_string: str, file_path: str) -> str:
+def search_transactions(search_string: str, transactions: list[dict]) -> list[dict]:
     """
-    Возвращает результат поиска по категориям и описанию
+    Возвращает транзакции, содержащие строку поиска в описании, категории или имени продавца
     """
-
-    data = read_transactions_xlsx(file_path)
-
     new_data = list()
 
     search_string_pattern = search_string.lower()
-    for item in data:
+    for item in transactions:
         if (
             search_string_pattern in str(item.get("Описание")).lower()
             or search_string_pattern in str(item.get("Категория")).lower()
+            or search_string_pattern in str(item.get(MERCHANT_COLUMN, "")).lower()
         ):
             new_data.append(item)
+
+    return new_data
+
+
+def search_by_merchant(search_string: str, transactions: pd.DataFrame) -> list[dict]:
+    """
+    Возвращает операции продавцов, каноническое имя которых содержит строку поиска.
+    Строка сравнивается только с именами продавцов, операции выбираются по кодам словаря
+    """
+    frame = add_merchant_column(transactions)
+    if frame.empty or MERCHANT_COLUMN not in frame.columns:
+        return []
+    return to_records(frame[merchant_mask(frame, search_string)])
+
+
+def simple_search(search_string: str, file_path: str) -> str:
+    """
+    Возвращает результат поиска по категориям и описанию
+    """
+
+    data = read_transactions_xlsx(file_path)
+
+    new_data = search_transactions(search_string, data)
     logger.info("Search is done")
 
     json_string = json.dumps(new_data, ensure_ascii=False, indent=2)
     return json_string
+
+
+def recurring_payments(file_path: str) -> str:
+    """
+    Возвращает регулярные платежи и подписки (см. recurring.find_recurring)
+    """
+
+    data = read_transactions_xlsx(file_path)
+
+    recurring = find_recurring(data)
+    logger.info("Recurring payments found: %s", len(recurring))
+
+    json_string = json.dumps(recurring, ensure_ascii=False, indent=2)
+    return json_string
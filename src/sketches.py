@@ -0,0 +1,294 @@
+import hashlib
+import math
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.card_history import month_number
+from src.merchants import MERCHANT_COLUMN, MERCHANTS
+from src.utils import parse_payment_dates
+
+QUANTILE_ACCURACY = 0.01
+HLL_PRECISION = 12
+
+
+class QuantileSketch:
+    """
+    Скетч квантилей с относительной погрешностью accuracy (схема DDSketch): положительные значения раскладываются
+    по логарифмическим корзинам [gamma^(i-1), gamma^i), gamma = (1 + accuracy) / (1 - accuracy), хранится число
+    значений в каждой корзине. Любой квантиль отличается от точного не более чем на accuracy от своей величины.
+    Скетчи с одинаковой точностью объединяются сложением счётчиков корзин.
+    """
+
+    def __init__(self, accuracy: float = QUANTILE_ACCURACY, buckets: Optional[dict[int, int]] = None) -> None:
+        if not 0 < accuracy < 1:
+            raise ValueError(f"Invalid accuracy: {accuracy}")
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.buckets: dict[int, int] = dict(buckets or {})
+
+    @property
+    def count(self) -> int:
+        """
+        Число значений в скетче
+        """
+        return sum(self.buckets.values())
+
+    def bucket_indexes(self, values: np.ndarray) -> np.ndarray:
+        """
+        Номера корзин для положительных значений
+        """
+        indexes: np.ndarray = np.ceil(np.log(values) / math.log(self.gamma)).astype(np.int64)
+        return indexes
+
+    def add(self, values: Iterable[float]) -> None:
+        """
+        Добавляет значения, неположительные значения пропускаются
+        """
+        array = np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype=float)
+        indexes, counts = np.unique(self.bucket_indexes(array[array > 0]), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Возвращает скетч объединения значений двух скетчей
+        """
+        if other.accuracy != self.accuracy:
+            raise ValueError("Sketches with different accuracy cannot be merged")
+        merged = QuantileSketch(self.accuracy, self.buckets)
+        for index, count in other.buckets.items():
+            merged.buckets[index] = merged.buckets.get(index, 0) + count
+        return merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Квантиль уровня q (0..1), None для пустого скетча
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"Invalid quantile: {q}")
+        total = self.count
+        if not total:
+            return None
+
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+def hash_values(values: Iterable[str]) -> np.ndarray:
+    """
+    64-битные хэши строк, одинаковые в любом процессе
+    """
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big") for value in values],
+        dtype=np.uint64,
+    )
+
+
+class HyperLogLog:
+    """
+    Оценка числа различных значений по 2^precision регистрам: хэш значения выбирает регистр, в регистре хранится
+    максимальная позиция первой единицы в остальных битах хэша. Стандартная ошибка - 1.04 / sqrt(2^precision)
+    (1.6% при precision=12). Скетчи с одинаковой точностью объединяются поэлементным максимумом регистров.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None) -> None:
+        if not 11 <= precision <= 16:
+            raise ValueError(f"Invalid precision: {precision}")
+        self.precision = precision
+        size = 1 << precision
+        self.registers = np.zeros(size, dtype=np.uint8) if registers is None else registers.astype(np.uint8)
+
+    def positions(self, hashes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Номера регистров и позиции первой единицы для 64-битных хэшей
+        """
+        width = 64 - self.precision
+        hashes = hashes.astype(np.uint64)
+        registers = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Остаток не длиннее 53 бит и точно представим в float64, frexp даёт его длину в битах (0 для нуля)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        ranks = (width - bit_length + 1).astype(np.uint8)
+        return registers, ranks
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Добавляет значения по их 64-битным хэшам
+        """
+        registers, ranks = self.positions(hashes)
+        np.maximum.at(self.registers, registers, ranks)
+
+    def add(self, values: Iterable[str]) -> None:
+        """
+        Добавляет строковые значения
+        """
+        self.add_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Возвращает скетч объединения значений двух скетчей
+        """
+        if other.precision != self.precision:
+            raise ValueError("Sketches with different precision cannot be merged")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def count(self) -> int:
+        """
+        Оценка числа различных значений
+        """
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size**2 / float(np.sum(np.ldexp(1.0, -self.registers.astype(int))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+class CategorySketches:
+    """
+    Скетчи размера трат (QuantileSketch) и различных продавцов (HyperLogLog) по каждой категории за каждый месяц.
+    Операции добавляются по мере загрузки, ранее учтённые операции повторно не читаются. Статистика за любой
+    период считается объединением месячных скетчей: время пропорционально числу месяцев, а не операций.
+    """
+
+    def __init__(self, accuracy: float = QUANTILE_ACCURACY, precision: int = HLL_PRECISION) -> None:
+        self.accuracy = accuracy
+        self.precision = precision
+        self.sketches: dict[str, dict[int, tuple[QuantileSketch, HyperLogLog]]] = {}
+
+    @classmethod
+    def from_transactions(
+        cls,
+        transactions: Union[list[dict], pd.DataFrame],
+        accuracy: float = QUANTILE_ACCURACY,
+        precision: int = HLL_PRECISION,
+    ) -> "CategorySketches":
+        """
+        Строит скетчи по операциям
+        """
+        sketches = cls(accuracy, precision)
+        sketches.add(transactions)
+        return sketches
+
+    def copy(self) -> "CategorySketches":
+        """
+        Независимая копия: операции, добавленные в копию, не меняют исходные скетчи
+        """
+        result = CategorySketches(self.accuracy, self.precision)
+        result.sketches = {
+            category: {
+                month: (
+                    QuantileSketch(self.accuracy, quantiles.buckets),
+                    HyperLogLog(self.precision, merchants.registers),
+                )
+                for month, (quantiles, merchants) in months.items()
+            }
+            for category, months in self.sketches.items()
+        }
+        return result
+
+    def add(self, transactions: Union[list[dict], pd.DataFrame]) -> None:
+        """
+        Учитывает успешные траты с датой платежа и категорией: размер траты и продавца (по описанию)
+        """
+        frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+        if frame.empty or not {"Дата платежа", "Сумма платежа", "Категория"} <= set(frame.columns):
+            return
+
+        dates = frame["Дата платежа"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = parse_payment_dates(dates)
+        amounts = pd.to_numeric(frame["Сумма платежа"], errors="coerce")
+        spent = dates.notna() & (amounts < 0) & frame["Категория"].notna()
+        if "Статус" in frame.columns:
+            spent &= frame["Статус"].eq("OK")
+        mask = spent.to_numpy(dtype=bool)
+        if not mask.any():
+            return
+
+        template = QuantileSketch(self.accuracy)
+        spends = pd.DataFrame(
+            {
+                "category": frame["Категория"].astype(str).to_numpy()[mask],
+                "month": (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()[mask].astype(np.int64),
+                "bucket": template.bucket_indexes(-amounts.to_numpy(dtype=float)[mask]),
+            }
+        )
+        keys = spends.groupby(["category", "month"], sort=False).ngroup().to_numpy()
+        key_names = spends[["category", "month"]].drop_duplicates().itertuples(index=False, name=None)
+
+        registers = np.zeros((int(keys.max()) + 1, 1 << self.precision), dtype=np.uint8)
+        merchants = self._merchants(frame)
+        if merchants is not None:
+            codes = merchants.cat.codes.to_numpy()[mask]
+            known = codes >= 0
+            # Хэшируются только продавцы учитываемых трат, а не весь словарь столбца
+            used, used_codes = np.unique(codes[known], return_inverse=True)
+            names = (str(merchants.cat.categories[code]) for code in used.tolist())
+            positions, ranks = HyperLogLog(self.precision).positions(hash_values(names))
+            np.maximum.at(registers, (keys[known], positions[used_codes]), ranks[used_codes])
+
+        counts = spends.assign(key=keys).groupby(["key", "bucket"], sort=False).size()
+        buckets: dict[int, dict[int, int]] = {}
+        for key, bucket, count in counts.reset_index().itertuples(index=False, name=None):
+            buckets.setdefault(int(key), {})[int(bucket)] = int(count)
+
+        for key, (category, month) in enumerate(key_names):
+            addition = (QuantileSketch(self.accuracy, buckets[key]), HyperLogLog(self.precision, registers[key]))
+            months = self.sketches.setdefault(category, {})
+            current = months.get(int(month))
+            if current is None:
+                months[int(month)] = addition
+            else:
+                months[int(month)] = (current[0].merge(addition[0]), current[1].merge(addition[1]))
+
+    @staticmethod
+    def _merchants(frame: pd.DataFrame) -> Optional[pd.Series]:
+        # Продавцы в словарном кодировании: операции ссылаются на словарь кодами
+        if MERCHANT_COLUMN in frame.columns:
+            return frame[MERCHANT_COLUMN].astype("category")
+        if "Описание" in frame.columns:
+            return MERCHANTS.normalize(frame["Описание"])
+        return None
+
+    def merged(self, category: str, start_month: str, end_month: str) -> tuple[QuantileSketch, HyperLogLog]:
+        """
+        Скетчи категории за месяцы ГГГГ-ММ с start_month по end_month включительно
+        """
+        quantiles, merchants = QuantileSketch(self.accuracy), HyperLogLog(self.precision)
+        first, last = month_number(start_month), month_number(end_month)
+        for month, (month_quantiles, month_merchants) in self.sketches.get(category, {}).items():
+            if first <= month <= last:
+                quantiles = quantiles.merge(month_quantiles)
+                merchants = merchants.merge(month_merchants)
+        return quantiles, merchants
+
+    def stats(self, start_month: str, end_month: str, categories: Optional[list[str]] = None) -> list[dict]:
+        """
+        Для каждой категории с тратами за месяцы ГГГГ-ММ с start_month по end_month: число трат, медиана и 95-й
+        перцентиль размера траты (относительная погрешность accuracy) и оценка числа различных продавцов
+        """
+        result = []
+        for category in sorted(self.sketches if categories is None else categories):
+            quantiles, merchants = self.merged(category, start_month, end_month)
+            if not quantiles.count:
+                continue
+            result.append(
+                {
+                    "category": category,
+                    "start_month": start_month,
+                    "end_month": end_month,
+                    "transactions": quantiles.count,
+                    "median": round(float(quantiles.quantile(0.5) or 0), 2),
+                    "p95": round(float(quantiles.quantile(0.95) or 0), 2),
+                    "distinct_merchants": merchants.count(),
+                }
+            )
+        return result
@@ -0,0 +1,224 @@
+import threading
+from datetime import date
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.aggregates import SpendingAggregates
+from src.budgets import BudgetLedger
+from src.card_history import CardHistory
+from src.logging_setup import setup_logger
+from src.reports import select_period, sort_by_payment_date
+from src.sketches import CategorySketches
+from src.views import get_transactions_summary
+
+logger = setup_logger("snapshot")
+
+
+def _period_summary(
+    sorted_transactions: pd.DataFrame,
+    payment_dates: np.ndarray,
+    cashback_rules: Optional[list[dict]],
+    start_date: date,
+    end_date: date,
+) -> dict:
+    window = select_period(sorted_transactions, payment_dates, start_date, end_date)
+    return get_transactions_summary(window.to_dict(orient="records"), cashback_rules)
+
+
+def _sort_frame(frame: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    if "Дата платежа" in frame.columns:
+        return sort_by_payment_date(frame)
+    return frame, pd.Series([], dtype="datetime64[ns]").to_numpy()
+
+
+def _merge_sorted(
+    sorted_transactions: pd.DataFrame, payment_dates: np.ndarray, frame: pd.DataFrame
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Сливает отсортированные операции с новыми и возвращает их, даты платежа и отсортированные даты новых операций
+    """
+    if "Дата платежа" not in sorted_transactions.columns:
+        # Прежние операции без дат не сортировались: сортируем всё заново
+        merged, dates = _sort_frame(pd.concat([sorted_transactions, frame]) if len(sorted_transactions) else frame)
+        return merged, dates, _sort_frame(frame)[1]
+    if "Дата платежа" not in frame.columns:
+        return sorted_transactions, payment_dates, payment_dates[:0]
+
+    new_sorted, new_dates = sort_by_payment_date(frame)
+    if not len(new_dates):
+        return sorted_transactions, payment_dates, new_dates
+    if sorted_transactions.empty:
+        return new_sorted, new_dates, new_dates
+    merged = pd.concat([sorted_transactions, new_sorted])
+    dates = np.concatenate([payment_dates, new_dates])
+    if new_dates[0] < payment_dates[-1]:
+        # Обе части уже отсортированы: устойчивая сортировка сливает две серии за линейное время
+        order = dates.argsort(kind="stable")
+        merged, dates = merged.iloc[order], dates[order]
+    return merged, dates, new_dates
+
+
+class DatasetSnapshot:
+    """
+    Версия данных в памяти: операции и все построенные по ним индексы (сортировка по дате платежа, журнал бюджетов,
+    история по картам, траты по месяцам, скетчи трат по категориям). Снимок собирается целиком до публикации
+    и после неё не меняется, поэтому читатели используют его без блокировок. Новые операции дают новый снимок
+    со следующей версией. Сводки по периодам кэшируются в снимке и освобождаются вместе с ним.
+    Словари операций в transactions общие для всех версий снимка, продолженных через extend, и только
+    читаются: extend копирует лишь переданные ему новые операции, а изменять записи снимка нельзя.
+    """
+
+    __slots__ = (
+        "version",
+        "transactions",
+        "cashback_rules",
+        "sorted_transactions",
+        "payment_dates",
+        "budgets",
+        "card_history",
+        "aggregates",
+        "sketches",
+        "summary_cache_size",
+        "_summary",
+        "__weakref__",
+    )
+
+    version: int
+    transactions: list[dict]
+    cashback_rules: Optional[list[dict]]
+    sorted_transactions: pd.DataFrame
+    payment_dates: np.ndarray
+    budgets: BudgetLedger
+    card_history: CardHistory
+    aggregates: SpendingAggregates
+    sketches: CategorySketches
+    summary_cache_size: int
+    _summary: Callable[[date, date], dict]
+
+    def __init__(
+        self,
+        transactions: list[dict],
+        cashback_rules: Optional[list[dict]] = None,
+        version: int = 1,
+        budgets: Optional[BudgetLedger] = None,
+        summary_cache_size: int = 256,
+        sketches: Optional[CategorySketches] = None,
+        sorted_index: Optional[tuple[pd.DataFrame, np.ndarray]] = None,
+        card_history: Optional[CardHistory] = None,
+        aggregates: Optional[SpendingAggregates] = None,
+    ) -> None:
+        if sorted_index is not None:
+            sorted_transactions, payment_dates = sorted_index
+        else:
+            sorted_transactions, payment_dates = _sort_frame(pd.DataFrame(transactions))
+        if card_history is None:
+            card_history = CardHistory.from_transactions(transactions, cashback_rules)
+        if aggregates is None:
+            aggregates = SpendingAggregates.from_transactions(transactions)
+
+        # Кэш сводок ссылается на данные, а не на снимок, чтобы снимок освобождался без сборщика циклов
+        summary = partial(_period_summary, sorted_transactions, payment_dates, cashback_rules)
+        fields = {
+            "version": version,
+            "transactions": transactions,
+            "cashback_rules": cashback_rules,
+            "sorted_transactions": sorted_transactions,
+            "payment_dates": payment_dates,
+            "budgets": budgets if budgets is not None else BudgetLedger.from_transactions(transactions),
+            "card_history": card_history,
+            "aggregates": aggregates,
+            "sketches": sketches if sketches is not None else CategorySketches.from_transactions(transactions),
+            "summary_cache_size": summary_cache_size,
+            "_summary": lru_cache(maxsize=summary_cache_size)(summary),
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("DatasetSnapshot is immutable")
+
+    def summary(self, start_date: date, end_date: date) -> dict:
+        """
+        Информация по картам и топ транзакций за период (один раз для периода в снимке)
+        """
+        return self._summary(start_date, end_date)
+
+    def extend(self, transactions: list[dict]) -> "DatasetSnapshot":
+        """
+        Новый снимок с добавленными операциями (копиями переданных словарей). Журнал бюджетов и скетчи копируются
+        и дополняются только новыми операциями, новые операции вливаются в отсортированные, а история по картам
+        и траты по месяцам пересчитываются только за месяцы, в которые попали новые операции
+        """
+        added = [dict(record) for record in transactions]
+        budgets = self.budgets.copy()
+        budgets.append(added)
+        sketches = self.sketches.copy()
+        sketches.add(added)
+
+        start = len(self.transactions)
+        frame = pd.DataFrame(added, index=pd.RangeIndex(start, start + len(added)))
+        sorted_transactions, payment_dates, new_dates = _merge_sorted(
+            self.sorted_transactions, self.payment_dates, frame
+        )
+        card_history, aggregates = self.card_history, self.aggregates
+        if len(new_dates):
+            first_month = new_dates[0].astype("datetime64[M]")
+            end_month = new_dates[-1].astype("datetime64[M]") + 1
+            left = np.searchsorted(payment_dates, first_month.astype("datetime64[ns]"), side="left")
+            right = np.searchsorted(payment_dates, end_month.astype("datetime64[ns]"), side="left")
+            window = sorted_transactions.iloc[left:right]
+            card_history = card_history.update_months(CardHistory.from_transactions(window, self.cashback_rules))
+            aggregates = aggregates.update_months(SpendingAggregates.from_transactions(window))
+
+        return DatasetSnapshot(
+            self.transactions + added,
+            self.cashback_rules,
+            self.version + 1,
+            budgets,
+            self.summary_cache_size,
+            sketches,
+            (sorted_transactions, payment_dates),
+            card_history,
+            aggregates,
+        )
+
+    def replace(self, transactions: list[dict]) -> "DatasetSnapshot":
+        """
+        Новый снимок по новой выписке целиком
+        """
+        return DatasetSnapshot(
+            transactions, self.cashback_rules, self.version + 1, summary_cache_size=self.summary_cache_size
+        )
+
+
+class SnapshotStore:
+    """
+    Ссылка на текущий снимок данных. Читатели берут current один раз на запрос без блокировок и работают с ним
+    до конца запроса, даже если тем временем опубликован новый снимок. Писатели собирают новый снимок целиком
+    и публикуют его заменой ссылки, публикации упорядочены блокировкой писателей. Старый снимок освобождается,
+    когда его не держит ни один читатель.
+    """
+
+    def __init__(self, snapshot: DatasetSnapshot) -> None:
+        self._current = snapshot
+        self._writer = threading.Lock()
+
+    @property
+    def current(self) -> DatasetSnapshot:
+        """
+        Текущий снимок
+        """
+        return self._current
+
+    def update(self, build: Callable[[DatasetSnapshot], DatasetSnapshot]) -> DatasetSnapshot:
+        """
+        Собирает новый снимок из текущего функцией build и публикует его
+        """
+        with self._writer:
+            snapshot = build(self._current)
+            self._current = snapshot
+        logger.info("Snapshot %s published: %s transactions", snapshot.version, len(snapshot.transactions))
+        return snapshot
@@ -0,0 +1,214 @@
+import os
+import shutil
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import requests
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+                                    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday,
+                                    sunday_to_monday)
+
+from src.logging_setup import setup_logger
+from src.quota import BACKGROUND, CircuitOpenError, QuotaExceeded, RateLimited
+from src.utils import ALPHA_VANTAGE_URL, API_KEY_ALPHA_VANTAGE, MARKET_SCHEDULERS
+
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("stock_history")
+
+PRICES_PATH = MODULE_DIR.parent / "data" / "stock_prices"
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+DAILY_FIELDS = {"1. open": "open", "2. high": "high", "3. low": "low", "4. close": "close", "5. volume": "volume"}
+# Ответ outputsize=compact содержит последние 100 торговых дней
+COMPACT_DAYS = 100
+# Дневная цена появляется после закрытия основной сессии NYSE/NASDAQ
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_CLOSE = time(16, 0)
+
+
+class ExchangeHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Праздничные дни NYSE/NASDAQ, в которые торгов нет и новых дневных цен не бывает
+    """
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+EXCHANGE_CALENDAR = ExchangeHolidayCalendar()
+
+
+def price_path(symbol: str, directory: str = str(PRICES_PATH)) -> str:
+    """
+    Путь к файлу дневных цен акции
+    """
+    return os.path.join(directory, f"{symbol.upper()}.csv")
+
+
+def load_price_history(symbol: str, directory: str = str(PRICES_PATH)) -> pd.DataFrame:
+    """
+    Загружает дневные цены акции (дата, открытие, максимум, минимум, закрытие, объём) с диска, по возрастанию даты
+    """
+    file_path = price_path(symbol, directory)
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        table = pd.DataFrame({column: pd.Series(dtype=float) for column in PRICE_COLUMNS})
+        table["date"] = pd.Series(dtype="datetime64[ns]")
+        return table
+
+    table = pd.read_csv(file_path, parse_dates=["date"])
+    return table[PRICE_COLUMNS]
+
+
+def save_price_history(symbol: str, table: pd.DataFrame, directory: str = str(PRICES_PATH)) -> None:
+    """
+    Перезаписывает файл дневных цен акции. Файл заменяется целиком, читатели не видят частично записанных данных
+    """
+    file_path = price_path(symbol, directory)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    table.sort_values("date")[PRICE_COLUMNS].to_csv(temp_path, index=False, date_format="%Y-%m-%d")
+    os.replace(temp_path, file_path)
+
+
+def append_price_history(symbol: str, rows: pd.DataFrame, directory: str = str(PRICES_PATH)) -> None:
+    """
+    Дописывает в конец файла цены за новые дни (все даты rows позже последней даты в файле). Строки дописываются
+    к копии файла без разбора прежних цен, копия заменяет файл целиком, как в save_price_history
+    """
+    file_path = price_path(symbol, directory)
+    temp_path = f"{file_path}.tmp"
+    shutil.copyfile(file_path, temp_path)
+    rows.sort_values("date")[PRICE_COLUMNS].to_csv(
+        temp_path, mode="a", header=False, index=False, date_format="%Y-%m-%d"
+    )
+    os.replace(temp_path, file_path)
+
+
+def read_price_range(
+    symbol: str, start: Optional[date] = None, end: Optional[date] = None, directory: str = str(PRICES_PATH)
+) -> pd.DataFrame:
+    """
+    Возвращает дневные цены акции с start по end включительно из локального хранилища, без запросов к провайдеру
+    """
+    table = load_price_history(symbol, directory)
+    dates = table["date"]
+    lower = 0 if start is None else int(dates.searchsorted(pd.Timestamp(start), side="left"))
+    upper = len(table) if end is None else int(dates.searchsorted(pd.Timestamp(end), side="right"))
+    result: pd.DataFrame = table.iloc[lower:upper].reset_index(drop=True)
+    return result
+
+
+def last_session_day(now: Optional[datetime] = None) -> date:
+    """
+    Последний день, торги которого к моменту now (по умолчанию - сейчас) уже закончились: день now по времени биржи
+    после закрытия (16:00 по Нью-Йорку), иначе предыдущий. Время без часового пояса считается временем биржи
+    """
+    now = now or datetime.now(MARKET_TIMEZONE)
+    if now.tzinfo is not None:
+        now = now.astimezone(MARKET_TIMEZONE)
+    return now.date() if now.time() >= MARKET_CLOSE else now.date() - timedelta(days=1)
+
+
+def missing_trading_days(last: Optional[date], today: date) -> Optional[int]:
+    """
+    Число торговых дней (рабочих, кроме праздников биржи) после last по today включительно
+    (None, если цен ещё нет)
+    """
+    if last is None:
+        return None
+    start, end = np.datetime64(last, "D") + 1, np.datetime64(today, "D") + 1
+    if start >= end:
+        return 0
+    holidays = EXCHANGE_CALENDAR.holidays(pd.Timestamp(start), pd.Timestamp(end)).to_numpy(dtype="datetime64[D]")
+    return int(np.busday_count(start, end, holidays=holidays))
+
+
+def _fetch_daily(symbol: str, outputsize: str) -> pd.DataFrame:
+    params = {
+        "function": "TIME_SERIES_DAILY",
+        "symbol": symbol,
+        "outputsize": outputsize,
+        "apikey": API_KEY_ALPHA_VANTAGE,
+    }
+    response = requests.get(ALPHA_VANTAGE_URL, params=params)
+    response.raise_for_status()
+
+    payload: dict = response.json()
+    series = payload.get("Time Series (Daily)")
+    if series is None:
+        if "Note" in payload or "Information" in payload:
+            message = str(payload.get("Note") or payload.get("Information"))
+            raise RateLimited(payload, daily="per day" in message)
+        raise ValueError(f"No daily prices for {symbol}: {payload}")
+
+    table = pd.DataFrame.from_dict(series, orient="index").rename(columns=DAILY_FIELDS)
+    table = table.rename_axis("date").reset_index()
+    table["date"] = pd.to_datetime(table["date"])
+    table = table.astype({"open": float, "high": float, "low": float, "close": float, "volume": np.int64})
+    return table[PRICE_COLUMNS].sort_values("date").reset_index(drop=True)
+
+
+def fetch_daily_prices(symbol: str, outputsize: str = "compact") -> pd.DataFrame:
+    """
+    Загружает дневные цены акции запросом TIME_SERIES_DAILY: compact - последние 100 торговых дней, full - вся история
+    """
+    fetch = partial(_fetch_daily, symbol, outputsize)
+    prices: pd.DataFrame = MARKET_SCHEDULERS["alpha_vantage"].call(fetch, BACKGROUND)
+    return prices
+
+
+def update_price_history(
+    symbols: list[str], today: Optional[date] = None, directory: str = str(PRICES_PATH)
+) -> dict[str, int]:
+    """
+    Дополняет локальное хранилище дневными ценами акций по today включительно (по умолчанию - по последний
+    завершённый торговый день, см. last_session_day) и возвращает число новых дней по акциям.
+    Для акции без истории один раз загружается вся история (outputsize=full), дальше - только недостающий хвост:
+    если он короче 100 торговых дней, запрашивается compact и новые строки дописываются в конец файла.
+    Акции, для которых нет новых торговых дней, не запрашиваются; ошибки провайдера по акции пишутся в лог,
+    такая акция в результат не попадает.
+    """
+    today = today or last_session_day()
+    added: dict[str, int] = {}
+    for symbol in dict.fromkeys(code.upper() for code in symbols):
+        table = load_price_history(symbol, directory)
+        last = None if table.empty else table["date"].iloc[-1].date()
+        missing = missing_trading_days(last, today)
+        if missing == 0:
+            added[symbol] = 0
+            continue
+
+        outputsize = "compact" if missing is not None and missing < COMPACT_DAYS else "full"
+        try:
+            fetched = fetch_daily_prices(symbol, outputsize)
+        except (RateLimited, QuotaExceeded, CircuitOpenError, ValueError, requests.RequestException) as error:
+            logger.warning("Price history for %s was not updated: %s", symbol, error)
+            continue
+
+        if last is None:
+            save_price_history(symbol, fetched, directory)
+            added[symbol] = len(fetched)
+        else:
+            tail = fetched[fetched["date"] > pd.Timestamp(last)]
+            if outputsize == "compact":
+                append_price_history(symbol, tail, directory)
+            else:
+                merged = pd.concat([table, tail], ignore_index=True)
+                save_price_history(symbol, merged, directory)
+            added[symbol] = len(tail)
+        logger.info("Price history for %s updated (%s): %s new days", symbol, outputsize, added[symbol])
+    return added
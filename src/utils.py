@@ -1,30 +1,49 @@
 import json
-import logging
 import os
 from datetime import datetime
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
-MODULE_DIR = Path(__file__).resolve().parent
-LOG_DIR = MODULE_DIR.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
+from src.cashback import CashbackEngine
+from src.loader import to_records, validated
+from src.logging_setup import setup_logger
+from src.quota import INTERACTIVE, CircuitOpenError, ProviderScheduler, QuotaExceeded, RateLimited
+from src.singleflight import SingleFlight
 
-logger = logging.getLogger("utils")
-logger.setLevel(logging.DEBUG)
-log_file = LOG_DIR / "utils.log"
-file_handler = logging.FileHandler(log_file, mode="w")
-file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(funcName)s: %(message)s")
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("utils")
 
-load_dotenv("../.env")
+load_dotenv(MODULE_DIR.parent / ".env")
 
 API_KEY_FOR_CURRENT_EXCHANGE_RATE = os.getenv("API_KEY_FOR_CURRENT_EXCHANGE_RATE")
 API_KEY_ALPHA_VANTAGE = os.getenv("API_KEY_ALPHA_VANTAGE")
 
+APILAYER_URL = os.getenv("APILAYER_URL", "https://api.apilayer.com/exchangerates_data")
+ALPHA_VANTAGE_URL = os.getenv("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+
+EXCHANGE_RATE_FLIGHTS = SingleFlight()
+STOCK_FLIGHTS = SingleFlight()
+
+MARKET_SCHEDULERS = {
+    "apilayer": ProviderScheduler(
+        "apilayer",
+        per_minute=int(os.getenv("APILAYER_PER_MINUTE", "60")),
+        per_day=int(os.getenv("APILAYER_PER_DAY", "100")),
+        retry_on=(RateLimited, requests.RequestException),
+    ),
+    "alpha_vantage": ProviderScheduler(
+        "alpha_vantage",
+        per_minute=int(os.getenv("ALPHA_VANTAGE_PER_MINUTE", "5")),
+        per_day=int(os.getenv("ALPHA_VANTAGE_PER_DAY", "25")),
+        retry_on=(RateLimited, requests.RequestException),
+    ),
+}
+
 
 def get_greeting(now_hour: int) -> str:
     """
@@ -44,9 +63,11 @@ def get_greeting(now_hour: int) -> str:
     return message
 
 
-def read_transactions_xlsx(file_path: str) -> list[dict]:
+def read_transactions_xlsx(file_path: str, validate: bool = False) -> list[dict]:
     """
-    Функция для считывания финансовых операций из Excel
+    Функция для считывания финансовых операций из Excel.
+    При validate=True выписка проверяется по схеме (см. loader.validate_transactions): строки с ошибками
+    отбрасываются и записываются в лог, без обязательных столбцов выбрасывается SchemaError
     """
 
     if not os.path.exists(file_path):
@@ -57,8 +78,10 @@ def read_transactions_xlsx(file_path: str) -> list[dict]:
         logger.warning("File is empty")
         return []
 
-    logger.info(f"Reading file from: {file_path}")
+    logger.info("Reading file from: %s", file_path)
     xlsx_data = pd.read_excel(file_path)
+    if validate:
+        return to_records(validated(xlsx_data))
     xlsx_data_dict = xlsx_data.to_dict(orient="records")
 
     if isinstance(xlsx_data_dict, list):
@@ -82,7 +105,7 @@ def load_json_data(file_path: str) -> dict:
             return {}
 
         with open(file_path, "r", encoding="utf-8") as file:
-            logger.info(f"Reading file from: {file_path}")
+            logger.info("Reading file from: %s", file_path)
             data = json.load(file)
 
         if isinstance(data, dict):
@@ -128,9 +151,10 @@ def filter_by_state(data: list[dict], state: str = "OK") -> list[dict]:
     return new_data
 
 
-def get_card_infos(transactions: list[dict]) -> list[dict]:
+def get_card_infos(transactions: list[dict], cashback_rules: Optional[list[dict]] = None) -> list[dict]:
     """
-    Возвращает инфомацию о картах
+    Возвращает инфомацию о картах.
+    Если переданы правила кешбэка (см. CashbackEngine), кешбэк считается по ним, иначе 1% от трат.
     """
     if not transactions:
         return []
@@ -140,6 +164,20 @@ def get_card_infos(transactions: list[dict]) -> list[dict]:
     cards = []
 
     negative_df = df[df["Сумма платежа"] < 0]
+
+    if cashback_rules is not None:
+        if negative_df.empty:
+            return []
+        by_card = CashbackEngine(cashback_rules).by_card(negative_df)
+        for card_number, row in by_card.iterrows():
+            card_info = dict(
+                last_digits=get_last_four(str(card_number)),
+                total_spent=round(float(row["total_spent"]), 2),
+                cashback=round(float(row["cashback"]), 2),
+            )
+            cards.append(card_info)
+        return cards
+
     data = negative_df.groupby("Номер карты")["Сумма платежа"].sum()
 
     for card_number, total_amount in data.items():
@@ -170,49 +208,111 @@ def get_top_transactions(transactions: list[dict]) -> list[dict]:
     return result
 
 
-def get_current_exchange_rate(currency_codes: list) -> list:
+def _fetch_exchange_rate(code: str) -> dict:
     """
-    Функция возврата текущего курса
+    Запрашивает текущий курс одной валюты к рублю
     """
-
-    url = "https://api.apilayer.com/exchangerates_data/latest"
+    url = f"{APILAYER_URL}/latest"
 
     headers = {"apikey": API_KEY_FOR_CURRENT_EXCHANGE_RATE}
+    params = {"symbols": "RUB", "base": code}
+    response = requests.get(url, headers=headers, params=params)
+    if response.status_code == 429:
+        raise RateLimited(response.json())
+    response.raise_for_status()
+    response_to_float = float(response.json()["rates"]["RUB"])
+
+    return dict(currency=code, rate=round(response_to_float, 2))
+
+
+def get_current_exchange_rate(currency_codes: list, priority: int = INTERACTIVE) -> list:
+    """
+    Функция возврата текущего курса.
+    Одновременные запросы одной валюты из разных потоков выполняются одним обращением к API,
+    обращения к API проходят через планировщик квоты apilayer с приоритетом priority.
+    Если курс получить не удалось, вместо него возвращается описание ошибки, как в get_stock.
+    """
+    scheduler = MARKET_SCHEDULERS["apilayer"]
     result = []
     for code in currency_codes:
-        params = {"symbols": "RUB", "base": code}
-        response = requests.get(url, headers=headers, params=params)
-        response_to_float = float(response.json()["rates"]["RUB"])
-
-        currency_code_info = dict(currency=code, rate=round(response_to_float, 2))
-        result.append(currency_code_info)
+        fetch = partial(scheduler.call, partial(_fetch_exchange_rate, code), priority)
+        try:
+            currency_code_info = EXCHANGE_RATE_FLIGHTS.do(code, fetch)
+        except RateLimited as error:
+            logger.warning("The request ended with an error %s", error.payload)
+            currency_code_info = {"currency": code, "Information": str(error)}
+        except (QuotaExceeded, CircuitOpenError) as error:
+            logger.warning("The request was not sent: %s", error)
+            currency_code_info = {"currency": code, "Information": str(error)}
+        except requests.RequestException as error:
+            logger.warning("The request failed: %s", error)
+            currency_code_info = {"currency": code, "Information": str(error)}
+        result.append(dict(currency_code_info))
 
     return result
 
 
-def get_stock(stocks: list) -> list:
+def _fetch_stock(stock: str) -> dict:
     """
-    Функция возврата текущего курса
+    Запрашивает текущую цену одной акции
     """
-    url = "https://www.alphavantage.co/query"
+    url = ALPHA_VANTAGE_URL
+
+    params = {"function": "GLOBAL_QUOTE", "symbol": stock, "apikey": API_KEY_ALPHA_VANTAGE}
+    response = requests.get(url, params=params)
+    response.raise_for_status()
+
+    global_quote = response.json().get("Global Quote")
+    if global_quote is not None:
+        response_to_float = float(response.json()["Global Quote"]["05. price"])
+        return dict(stock=stock, price=round(response_to_float, 2))
+
+    error: dict = response.json()
+    if "Note" in error or "Information" in error:
+        message = str(error.get("Note") or error.get("Information"))
+        raise RateLimited(error, daily="per day" in message)
+
+    logger.warning("The request ended with an error %s", error)
+    return error
 
+
+def get_stock(stocks: list, priority: int = INTERACTIVE) -> list:
+    """
+    Функция возврата текущего курса.
+    Одновременные запросы одной акции из разных потоков выполняются одним обращением к API,
+    обращения к API проходят через планировщик квоты Alpha Vantage с приоритетом priority.
+    """
+    scheduler = MARKET_SCHEDULERS["alpha_vantage"]
     result = []
     for stock in stocks:
-        params = {"function": "GLOBAL_QUOTE", "symbol": stock, "apikey": API_KEY_ALPHA_VANTAGE}
-        response = requests.get(url, params=params)
-
-        global_quote = response.json().get("Global Quote")
-        if global_quote is not None:
-            response_to_float = float(response.json()["Global Quote"]["05. price"])
-            stocks_info = dict(stock=stock, price=round(response_to_float, 2))
-            result.append(stocks_info)
-        else:
-            logger.warning(f"The request ended with an error {response.json()}")
-            result.append(response.json())
+        fetch = partial(scheduler.call, partial(_fetch_stock, stock), priority)
+        try:
+            stocks_info = STOCK_FLIGHTS.do(stock, fetch)
+        except RateLimited as error:
+            logger.warning("The request ended with an error %s", error.payload)
+            stocks_info = error.payload
+        except (QuotaExceeded, CircuitOpenError) as error:
+            logger.warning("The request was not sent: %s", error)
+            stocks_info = {"Information": str(error)}
+        except requests.RequestException as error:
+            logger.warning("The request failed: %s", error)
+            stocks_info = {"Information": str(error)}
+        result.append(dict(stocks_info))
 
     return result
 
 
+def get_market_data_metrics() -> dict:
+    """
+    Возвращает статистику объединения запросов курсов валют и акций и состояние квот провайдеров
+    """
+    return {
+        "currency_rates": EXCHANGE_RATE_FLIGHTS.stats(),
+        "stock_prices": STOCK_FLIGHTS.stats(),
+        "providers": {name: scheduler.stats() for name, scheduler in MARKET_SCHEDULERS.items()},
+    }
+
+
 def get_date(date: str) -> str:
     """
     Возвращает дату из формата ГГГГ-ММ-ДД в ДД.ММ.ГГГГ
@@ -230,23 +330,25 @@ def get_date(date: str) -> str:
         return date
 
 
+def parse_payment_dates(dates: pd.Series) -> pd.Series:
+    """
+    Разбирает столбец дат формата ДД.ММ.ГГГГ за один проход, некорректные значения становятся NaT
+    """
+    return pd.to_datetime(dates.astype("string").str.strip(), format="%d.%m.%Y", errors="coerce")
+
+
 def filter_by_date(data: list[dict], start_date: str, end_date: str) -> list[dict]:
     """
-    Фильтрует список словарей в промежутке star_date и  end_date по значению Дата платежа
+    Фильтрует список словарей в промежутке star_date и  end_date по значению Дата платежа.
+    Даты разбираются одним векторным проходом, операции без даты платежа пропускаются
     """
+    if not data:
+        return []
 
     start_dt = datetime.strptime(start_date, "%d.%m.%Y")
     end_dt = datetime.strptime(end_date, "%d.%m.%Y")
 
-    filter_date = []
-    for item in data:
-        date_value = str(item["Дата платежа"]).strip().lower()
-        if date_value == "nan" or date_value == "":
-            continue
-
-        item_date = datetime.strptime(str(item["Дата платежа"]), "%d.%m.%Y")
-
-        if start_dt <= item_date <= end_dt:
-            filter_date.append(item)
+    dates = parse_payment_dates(pd.Series([item.get("Дата платежа") for item in data], dtype=object))
+    mask = ((dates >= start_dt) & (dates <= end_dt)).to_numpy()
 
-    return filter_date
+    return [item for item, selected in zip(data, mask) if selected]
@@ -1,16 +1,40 @@
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
 
+import requests
+
+from src.aggregates import SpendingAggregates
+from src.budgets import BudgetLedger, budget_month
+from src.card_history import CardHistory
+from src.currency import RATES_PATH, convert_records_to_rub, load_rate_table
+from src.dashboard_cache import DashboardCache, dataset_version, settings_hash
+from src.logging_setup import setup_logger
+from src.quota import CircuitOpenError, QuotaExceeded, RateLimited
+from src.singleflight import SingleFlight
 from src.utils import (filter_by_date, filter_by_state, get_card_infos, get_current_exchange_rate, get_date,
                        get_greeting, get_stock, get_top_transactions, load_json_data, read_transactions_xlsx)
 
+MODULE_DIR = Path(__file__).resolve().parent
+logger = setup_logger("views")
+
+DATA_PATH = MODULE_DIR.parent / "data" / "operations.xlsx"
+SETTINGS_PATH = MODULE_DIR.parent / "user_settings.json"
+
+DASHBOARD_CACHE = DashboardCache(max_entries=128, persist_path=os.getenv("DASHBOARD_CACHE_PATH"))
+BUDGET_LEDGERS: Dict[str, tuple[Optional[str], BudgetLedger]] = {}
+BUDGET_LEDGER_FLIGHTS = SingleFlight()
+CARD_HISTORY_CACHE = DashboardCache(max_entries=8)
+AGGREGATES_CACHE = DashboardCache(max_entries=8)
 
-def main_page(date_string: str) -> str:
+
+def get_month_bounds(date_string: str) -> tuple[str, str]:
     """
-    Возвращает информацию для главной страницы
+    Возвращает начало месяца и переданную дату в формате ДД.ММ.ГГГГ
     """
-
     date_end_of_month = get_date(date_string)
 
     date_pars = datetime.strptime(date_end_of_month, "%d.%m.%Y")
@@ -18,22 +42,218 @@ def main_page(date_string: str) -> str:
     start_of_month_str = datetime.strftime(start_of_month_pars, "%Y-%m-%d %H:%M:%S")
     date_start_of_month = get_date(start_of_month_str)
 
-    transaction = read_transactions_xlsx("../data/operations.xlsx")
+    return date_start_of_month, date_end_of_month
+
+
+def get_transactions_summary(transactions: list[dict], cashback_rules: Optional[list[dict]] = None) -> Dict[str, Any]:
+    """
+    Возвращает информацию по картам и топ транзакций для операций за период
+    """
+    if not transactions:
+        return {"cards": [], "top_transactions": []}
+
+    filtered_transactions = filter_by_state(transactions)
+    return {
+        "cards": get_card_infos(filtered_transactions, cashback_rules),
+        "top_transactions": get_top_transactions(filtered_transactions),
+    }
 
-    filtered_transactions = filter_by_date(transaction, date_start_of_month, date_end_of_month)
-    filtered_transactions = filter_by_state(filtered_transactions)
 
-    user_settings = load_json_data("../user_settings.json")
+def get_market_data(user_settings: dict) -> Dict[str, Any]:
+    """
+    Возвращает курсы валют и стоимость акций из пользовательских настроек
+    """
     user_currencies = user_settings.get("user_currencies", [])
     user_stocks = user_settings.get("user_stocks", [])
 
+    return {
+        "currency_rates": get_current_exchange_rate(user_currencies),
+        "stock_prices": get_stock(user_stocks),
+    }
+
+
+def main_page(date_string: str, file_path: str = str(DATA_PATH), settings_path: str = str(SETTINGS_PATH)) -> str:
+    """
+    Возвращает информацию для главной страницы.
+    Сводка по операциям берётся из DASHBOARD_CACHE, пока не изменились выписка, таблица курсов и настройки,
+    курсы валют и акций запрашиваются при каждом вызове. Если в настройках заданы budgets, добавляется
+    статус бюджетов за месяц из журнала выписки (см. budget_ledger). Выписка читается не больше одного раза
+    за вызов и только если изменилась.
+    """
+
+    date_start_of_month, date_end_of_month = get_month_bounds(date_string)
+
+    user_settings = load_json_data(settings_path)
+    statement: list[list[dict]] = []
+
+    def read_statement() -> list[dict]:
+        if not statement:
+            statement.append(convert_records_to_rub(read_transactions_xlsx(file_path, validate=True)))
+        return statement[0]
+
+    def compute_summary() -> Dict[str, Any]:
+        filtered_transactions = filter_by_date(read_statement(), date_start_of_month, date_end_of_month)
+        return get_transactions_summary(filtered_transactions, user_settings.get("cashback_rules"))
+
+    version = dataset_version(file_path, str(RATES_PATH))
+    if version is None:
+        summary = compute_summary()
+    else:
+        key = DASHBOARD_CACHE.make_key(
+            file_path, date_start_of_month, date_end_of_month, version, settings_hash(user_settings)
+        )
+        summary = DASHBOARD_CACHE.get_or_compute(key, compute_summary)
+
     now_hour = datetime.now().hour
     data: Dict[str, Any] = {
         "greeting": get_greeting(now_hour),
-        "cards": get_card_infos(filtered_transactions),
-        "top_transactions": get_top_transactions(filtered_transactions),
-        "currency_rates": get_current_exchange_rate(user_currencies),
-        "stock_prices": get_stock(user_stocks),
+        **summary,
+        **get_market_data(user_settings),
     }
+    if user_settings.get("budgets"):
+        ledger = budget_ledger(file_path, version, read_statement)
+        data["budgets"] = ledger.status(user_settings["budgets"], budget_month(date_end_of_month))
     result = json.dumps(data, ensure_ascii=False, indent=2)
     return result
+
+
+def budget_ledger(file_path: str, version: Optional[str], read_statement: Callable[[], list[dict]]) -> BudgetLedger:
+    """
+    Журнал бюджетов выписки из BUDGET_LEDGERS. Пока версия выписки не изменилась, журнал используется без чтения
+    файла. После изменения операции читаются read_statement, в копию журнала добавляются только новые операции
+    (журнал пересобирается, если выписка - не продолжение прежней), копия заменяет опубликованный журнал целиком.
+    Одновременные сборки журнала для одной версии выписки объединяются через BUDGET_LEDGER_FLIGHTS:
+    файл читает один вызов, остальные получают его журнал.
+    """
+    path = os.path.realpath(file_path)
+
+    def cached() -> Optional[BudgetLedger]:
+        current = BUDGET_LEDGERS.get(path)
+        if current is not None and version is not None and current[0] == version:
+            return current[1]
+        return None
+
+    def build() -> BudgetLedger:
+        ledger = cached()
+        if ledger is not None:
+            return ledger
+        current = BUDGET_LEDGERS.get(path)
+        ledger = (current[1].copy() if current is not None else BudgetLedger()).sync(read_statement())
+        BUDGET_LEDGERS[path] = (version, ledger)
+        return ledger
+
+    ledger = cached()
+    if ledger is None:
+        ledger = BUDGET_LEDGER_FLIGHTS.do((path, version), build)
+    return ledger
+
+
+def card_history_page(
+    date_string: str, months: int = 12, file_path: str = str(DATA_PATH), settings_path: str = str(SETTINGS_PATH)
+) -> str:
+    """
+    Возвращает траты, поступления, кешбэк и число операций по картам за months месяцев по месяц даты включительно.
+    Матрица (карта × месяц) строится один раз для выписки, её версии и настроек и хранится в CARD_HISTORY_CACHE
+    вместе с матрицами других выписок.
+    """
+    user_settings = load_json_data(settings_path)
+
+    def compute_history() -> CardHistory:
+        transactions = convert_records_to_rub(read_transactions_xlsx(file_path, validate=True))
+        return CardHistory.from_transactions(transactions, user_settings.get("cashback_rules"))
+
+    version = dataset_version(file_path, str(RATES_PATH))
+    if version is None:
+        history = compute_history()
+    else:
+        key = f"card_history:{os.path.realpath(file_path)}:{version}:{settings_hash(user_settings)}"
+        history = CARD_HISTORY_CACHE.get_or_compute(key, compute_history)
+
+    end_month = budget_month(get_date(date_string))
+    result = json.dumps({"cards": history.history(end_month, months)}, ensure_ascii=False, indent=2)
+    return result
+
+
+def spending_aggregates(file_path: str = str(DATA_PATH)) -> SpendingAggregates:
+    """
+    Возвращает траты по месяцам в разрезе категорий и карт для текущей версии выписки (считаются один раз
+    и хранятся в AGGREGATES_CACHE вместе с тратами других выписок), их можно передать
+    в reports.spending_comparison вместо операций
+    """
+
+    def compute_aggregates() -> SpendingAggregates:
+        transactions = convert_records_to_rub(read_transactions_xlsx(file_path, validate=True))
+        return SpendingAggregates.from_transactions(transactions)
+
+    version = dataset_version(file_path, str(RATES_PATH))
+    if version is None:
+        return compute_aggregates()
+    aggregates: SpendingAggregates = AGGREGATES_CACHE.get_or_compute(
+        f"aggregates:{os.path.realpath(file_path)}:{version}", compute_aggregates
+    )
+    return aggregates
+
+
+def _fetch_symbol(fetch: Callable[[list], list], field: str, symbol: str) -> dict:
+    try:
+        result: dict = fetch([symbol])[0]
+    except (RateLimited, QuotaExceeded, CircuitOpenError, requests.RequestException) as error:
+        logger.warning("Market data for %s is unavailable: %s", symbol, error)
+        result = {field: symbol, "Information": str(error)}
+    return result
+
+
+def fetch_market_data_union(users_settings: list[dict], workers: int = 8) -> Dict[str, dict]:
+    """
+    Загружает курсы и цены для объединения валют и акций всех пользователей, каждый символ один раз.
+    Ошибка по символу не прерывает загрузку остальных: вместо данных символа возвращается описание ошибки
+    """
+    currencies = list(dict.fromkeys(code for item in users_settings for code in item.get("user_currencies", [])))
+    stocks = list(dict.fromkeys(stock for item in users_settings for stock in item.get("user_stocks", [])))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        rates = list(executor.map(lambda code: _fetch_symbol(get_current_exchange_rate, "currency", code), currencies))
+        prices = list(executor.map(lambda stock: _fetch_symbol(get_stock, "stock", stock), stocks))
+
+    return {"currency_rates": dict(zip(currencies, rates)), "stock_prices": dict(zip(stocks, prices))}
+
+
+def _render_transactions_summary(date_string: str, transactions: list[dict], cashback_rules: Optional[list]) -> dict:
+    date_start_of_month, date_end_of_month = get_month_bounds(date_string)
+    filtered_transactions = filter_by_date(transactions, date_start_of_month, date_end_of_month)
+    return get_transactions_summary(filtered_transactions, cashback_rules)
+
+
+def main_page_batch(date_string: str, users: list[tuple[dict, list[dict]]], workers: int = 4) -> list[str]:
+    """
+    Возвращает главные страницы для нескольких пользователей (настройки, операции).
+    Курсы и цены загружаются один раз для объединения символов всех пользователей, суммы пересчитываются
+    в рубли, как на главной странице, сводки по операциям считаются параллельно в workers процессах.
+    """
+    if not users:
+        return []
+
+    market = fetch_market_data_union([settings for settings, _ in users])
+
+    rates = load_rate_table()
+    arguments = [
+        (date_string, convert_records_to_rub(transactions, rates), settings.get("cashback_rules"))
+        for settings, transactions in users
+    ]
+    if workers > 1 and len(users) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(users))) as executor:
+            summaries = list(executor.map(_render_transactions_summary, *zip(*arguments)))
+    else:
+        summaries = [_render_transactions_summary(*argument) for argument in arguments]
+
+    greeting = get_greeting(datetime.now().hour)
+    result = []
+    for (settings, _), summary in zip(users, summaries):
+        data: Dict[str, Any] = {
+            "greeting": greeting,
+            **summary,
+            "currency_rates": [market["currency_rates"][code] for code in settings.get("user_currencies", [])],
+            "stock_prices": [market["stock_prices"][stock] for stock in settings.get("user_stocks", [])],
+        }
+        result.append(json.dumps(data, ensure_ascii=False, indent=2))
+    return result
@@ -0,0 +1,11 @@
+import pytest
+
+from src.utils import MARKET_SCHEDULERS
+
+
+@pytest.fixture(autouse=True)
+def reset_market_quotas():
+    """Сбрасывает квоты провайдеров котировок, чтобы тесты не ждали токены друг друга"""
+    for scheduler in MARKET_SCHEDULERS.values():
+        scheduler.reset()
+    yield
@@ -0,0 +1,122 @@
+import pytest
+
+from src.aggregates import SpendingAggregates, comparison_month
+
+TRANSACTIONS = [
+    {
+        "Дата платежа": "20.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -1000.0,
+        "Категория": "Супермаркеты",
+    },
+    {
+        "Дата платежа": "05.10.2021",
+        "Номер карты": "*5091",
+        "Статус": "OK",
+        "Сумма платежа": -250.0,
+        "Категория": "Транспорт",
+    },
+    {
+        "Дата платежа": "15.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "FAILED",
+        "Сумма платежа": -5000.0,
+        "Категория": "Супермаркеты",
+    },
+    {
+        "Дата платежа": "16.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": 3000.0,
+        "Категория": "Пополнения",
+    },
+    {
+        "Дата платежа": "10.09.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -800.0,
+        "Категория": "Супермаркеты",
+    },
+    {
+        "Дата платежа": "11.09.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -100.0,
+        "Категория": "Кино",
+    },
+    {
+        "Дата платежа": "01.10.2020",
+        "Номер карты": "*5091",
+        "Статус": "OK",
+        "Сумма платежа": -500.0,
+        "Категория": "Транспорт",
+    },
+]
+
+
+def test_comparison_month():
+    """Тест месяца сравнения по дате"""
+    assert comparison_month("2021-10-30 15:12:30") == "2021-10"
+
+
+def test_compare_with_previous_month():
+    """Тест сравнения с прошлым месяцем по категориям"""
+    aggregates = SpendingAggregates.from_transactions(TRANSACTIONS)
+
+    result = aggregates.compare("category", "2021-10")
+
+    assert result.to_dict(orient="records") == [
+        {
+            "Категория": "Транспорт",
+            "month": "2021-10",
+            "baseline_month": "2021-09",
+            "spent": 250.0,
+            "baseline_spent": 0.0,
+            "delta": 250.0,
+            "delta_percent": None,
+        },
+        {
+            "Категория": "Супермаркеты",
+            "month": "2021-10",
+            "baseline_month": "2021-09",
+            "spent": 1000.0,
+            "baseline_spent": 800.0,
+            "delta": 200.0,
+            "delta_percent": 25.0,
+        },
+        {
+            "Категория": "Кино",
+            "month": "2021-10",
+            "baseline_month": "2021-09",
+            "spent": 0.0,
+            "baseline_spent": 100.0,
+            "delta": -100.0,
+            "delta_percent": -100.0,
+        },
+    ]
+
+
+def test_compare_cards_with_previous_year():
+    """Тест сравнения карт с тем же месяцем прошлого года"""
+    aggregates = SpendingAggregates.from_transactions(TRANSACTIONS)
+
+    result = aggregates.compare("card", "2021-10", baseline="year")
+
+    assert result[["Номер карты", "spent", "baseline_spent", "delta_percent"]].values.tolist() == [
+        ["*7197", 1000.0, 0.0, None],
+        ["*5091", 250.0, 500.0, -50.0],
+    ]
+
+
+def test_compare_outside_data():
+    """Тест месяцев вне выписки и пустых данных"""
+    assert SpendingAggregates.from_transactions(TRANSACTIONS).compare("category", "2030-01").empty
+    assert SpendingAggregates.from_transactions([]).compare("card", "2021-10").empty
+
+
+@pytest.mark.parametrize("by,baseline", [("merchant", "month"), ("category", "week")])
+def test_compare_rejects_unknown_options(by, baseline):
+    """Тест неизвестного разреза или базы сравнения"""
+    with pytest.raises(ValueError):
+        SpendingAggregates.from_transactions(TRANSACTIONS).compare(by, "2021-10", baseline)
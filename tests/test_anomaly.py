@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomaly import AnomalyDetector, RunningStats
+
+
+def _transactions():
+    amounts = [-100.0, -110.0, -90.0, -105.0, -95.0, -2000.0, 500.0, -100.0, -98.0]
+    return [
+        {"Сумма платежа": amount, "Категория": "Супермаркеты", "Номер карты": "*7197" if i % 2 else "*5091"}
+        for i, amount in enumerate(amounts)
+    ]
+
+
+def test_running_stats_update_and_merge():
+    """Тест что обновление по одному значению и слияние групп дают среднее и дисперсию выборки"""
+    values = [3.0, 7.0, 1.0, 9.0, 4.0]
+    single = RunningStats()
+    for value in values:
+        single.update(value)
+    merged = RunningStats()
+    merged.merge(2, 5.0, 8.0)
+    merged.merge(3, np.mean(values[2:]), np.var(values[2:]) * 3)
+
+    for stats in (single, merged):
+        assert stats.count == 5
+        assert stats.mean == pytest.approx(np.mean(values))
+        assert stats.std == pytest.approx(np.std(values, ddof=1))
+
+
+def test_score_flags_large_spend():
+    """Тест что крупная трата отмечается, а поступление не оценивается и не учитывается"""
+    detector = AnomalyDetector(threshold=3.0, min_count=5)
+    scores = [detector.score(item) for item in _transactions()]
+
+    assert [item["anomaly"] for item in scores] == [False] * 5 + [True, False, False, False]
+    assert math.isnan(scores[6]["z_category"])
+    assert detector.stats["category"]["Супермаркеты"].count == 8
+    assert detector.stats["card"]["*7197"].count == 4
+
+
+def test_score_frame_matches_row_by_row():
+    """Тест что векторная оценка пакетами совпадает с построчной"""
+    rng = np.random.default_rng(0)
+    transactions = [
+        {
+            "Сумма платежа": -float(rng.lognormal(5, 1)) if rng.random() > 0.1 else 1000.0,
+            "Категория": rng.choice(["Супермаркеты", "Фастфуд", None]),
+            "Номер карты": rng.choice(["*7197", "*5091"]),
+        }
+        for _ in range(500)
+    ]
+    detector = AnomalyDetector()
+    rows = pd.DataFrame([detector.score(item) for item in transactions])
+    streamed = pd.DataFrame(list(AnomalyDetector().score_stream(transactions, batch_size=64)))
+
+    for column in ["z_category", "z_card"]:
+        np.testing.assert_allclose(streamed[column], rows[column], rtol=1e-9)
+    assert streamed["anomaly"].tolist() == rows["anomaly"].tolist()
+
+
+def test_anomalies_returns_only_flagged():
+    """Тест что anomalies возвращает только аномальные операции"""
+    result = AnomalyDetector().anomalies(_transactions())
+
+    assert [item["Сумма платежа"] for item in result] == [-2000.0]
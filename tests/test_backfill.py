@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+from src.backfill import backfill_dashboards, load_backfill, month_dashboard, partition_by_month
+
+TRANSACTIONS = [
+    {
+        "Дата платежа": date,
+        "Номер карты": card,
+        "Статус": "OK",
+        "Сумма платежа": amount,
+        "Категория": category,
+        "Описание": description,
+        "MCC": mcc,
+    }
+    for date, card, amount, category, description, mcc in [
+        ("20.10.2021", "*7197", -150.0, "Супермаркеты", "Магнит", 5411.0),
+        ("nan", "*7197", -1.0, "Переводы", "Перевод", None),
+        ("15.09.2021", "*5091", -99.0, "Супермаркеты", "Пятёрочка", 5411.0),
+        ("05.10.2021", "*7197", -320.5, "Фастфуд", "Burger King", 5814.0),
+    ]
+]
+
+
+def test_partition_by_month():
+    """Тест что операции разбиваются по месяцам платежа, операции без даты пропускаются"""
+    partitions = partition_by_month(TRANSACTIONS)
+
+    assert list(partitions) == ["2021-09", "2021-10"]
+    assert [item["Сумма платежа"] for item in partitions["2021-10"]] == [-150.0, -320.5]
+
+
+def test_month_dashboard_uses_last_day_of_month():
+    """Тест что сводка месяца помечена последним днём месяца"""
+    result = month_dashboard("2024-02", [], None)
+
+    assert result == {"month": "2024-02", "date": "29.02.2024", "cards": [], "top_transactions": []}
+
+
+@patch("src.backfill.convert_records_to_rub", side_effect=lambda transactions: transactions)
+@patch("src.backfill.read_transactions_xlsx", return_value=TRANSACTIONS)
+def test_backfill_resumes_from_saved_months(mock_read, mock_convert, tmp_path):
+    """Тест что повторный запуск пересчитывает только несохранённые месяцы"""
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({}), encoding="utf-8")
+    output = tmp_path / "dashboards"
+
+    assert backfill_dashboards(str(tmp_path / "operations.xlsx"), str(settings), str(output), workers=1) == {
+        "months": 2,
+        "computed": 2,
+        "skipped": 0,
+    }
+
+    (output / "2021-10.json").unlink()
+    stats = backfill_dashboards(str(tmp_path / "operations.xlsx"), str(settings), str(output), workers=1)
+
+    assert stats == {"months": 2, "computed": 1, "skipped": 1}
+    months = load_backfill(str(output))
+    assert [item["month"] for item in months] == ["2021-09", "2021-10"]
+    assert months[1]["cards"][0]["total_spent"] == 470.5
+
+
+@patch("src.backfill.convert_records_to_rub", side_effect=lambda transactions: transactions)
+@patch("src.backfill.read_transactions_xlsx", return_value=TRANSACTIONS)
+def test_backfill_recomputes_on_settings_change(mock_read, mock_convert, tmp_path):
+    """Тест что при изменении настроек сохранённые месяцы пересчитываются"""
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({}), encoding="utf-8")
+    output = tmp_path / "dashboards"
+    backfill_dashboards(str(tmp_path / "operations.xlsx"), str(settings), str(output), workers=2)
+
+    settings.write_text(json.dumps({"cashback_rules": [{"percent": 5}]}), encoding="utf-8")
+    stats = backfill_dashboards(str(tmp_path / "operations.xlsx"), str(settings), str(output), workers=2)
+
+    assert stats["computed"] == 2
+    assert load_backfill(str(output))[1]["cards"][0]["cashback"] == 23.52
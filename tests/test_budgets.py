@@ -0,0 +1,63 @@
+from src.budgets import BudgetLedger, budget_month
+
+TRANSACTIONS = [
+    {"Дата платежа": "20.10.2021", "Статус": "OK", "Сумма платежа": -1000.1, "Категория": "Супермаркеты"},
+    {"Дата платежа": "05.10.2021", "Статус": "OK", "Сумма платежа": -250.0, "Категория": "Транспорт"},
+    {"Дата платежа": "15.10.2021", "Статус": "FAILED", "Сумма платежа": -5000.0, "Категория": "Супермаркеты"},
+    {"Дата платежа": "16.10.2021", "Статус": "OK", "Сумма платежа": 3000.0, "Категория": "Пополнения"},
+    {"Дата платежа": "01.09.2021", "Статус": "OK", "Сумма платежа": -300.0, "Категория": "Супермаркеты"},
+    {"Дата платежа": "nan", "Статус": "OK", "Сумма платежа": -70.0, "Категория": "Супермаркеты"},
+]
+
+
+def test_budget_month():
+    """Тест месяца бюджета по дате"""
+    assert budget_month("30.10.2021") == "2021-10"
+
+
+def test_ledger_counts_successful_spends():
+    """Тест: учитываются только успешные траты с датой платежа"""
+    ledger = BudgetLedger.from_transactions(TRANSACTIONS)
+
+    assert ledger.totals == {
+        "2021-10": {"Супермаркеты": 100010, "Транспорт": 25000},
+        "2021-09": {"Супермаркеты": 30000},
+    }
+    assert ledger.spent("2021-10", "Супермаркеты") == 1000.1
+    assert ledger.applied == len(TRANSACTIONS)
+
+
+def test_status():
+    """Тест статуса бюджетов за месяц"""
+    ledger = BudgetLedger.from_transactions(TRANSACTIONS)
+
+    assert ledger.status({"Супермаркеты": 2000, "Транспорт": 200, "Кафе": 0}, "2021-10") == [
+        {"category": "Супермаркеты", "budget": 2000.0, "spent": 1000.1, "remaining": 999.9, "used_percent": 50.0},
+        {"category": "Транспорт", "budget": 200.0, "spent": 250.0, "remaining": -50.0, "used_percent": 125.0},
+        {"category": "Кафе", "budget": 0.0, "spent": 0.0, "remaining": 0.0, "used_percent": None},
+    ]
+
+
+def test_sync_applies_only_new_transactions():
+    """Тест: продолжение выписки дополняет журнал, другая выписка пересобирает его"""
+    ledger = BudgetLedger.from_transactions(TRANSACTIONS[:2])
+    ledger.sync(TRANSACTIONS)
+
+    assert ledger.totals == BudgetLedger.from_transactions(TRANSACTIONS).totals
+
+    ledger.sync(TRANSACTIONS[1:2])
+
+    assert ledger.totals == {"2021-10": {"Транспорт": 25000}}
+    assert ledger.applied == 1
+
+
+def test_copy_is_independent():
+    """Тест что операции, добавленные в копию журнала, не меняют исходный журнал"""
+    ledger = BudgetLedger.from_transactions(TRANSACTIONS[:2])
+
+    copy = ledger.copy()
+    copy.append(TRANSACTIONS[4:5])
+
+    assert ledger.totals == {"2021-10": {"Супермаркеты": 100010, "Транспорт": 25000}}
+    assert copy.spent("2021-09", "Супермаркеты") == 300.0
+    assert copy.sync(TRANSACTIONS[:2] + TRANSACTIONS[4:]).applied == 4
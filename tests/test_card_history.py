@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.card_history import CardHistory, month_name, month_number
+from src.utils import filter_by_date, get_card_infos
+
+TRANSACTIONS = [
+    {"Дата платежа": "20.10.2021", "Номер карты": "*7197", "Статус": "OK", "Сумма платежа": -1000.0},
+    {"Дата платежа": "05.10.2021", "Номер карты": "*5091", "Статус": "OK", "Сумма платежа": -250.0},
+    {"Дата платежа": "06.10.2021", "Номер карты": "*5091", "Статус": "OK", "Сумма платежа": 500.0},
+    {"Дата платежа": "15.10.2021", "Номер карты": "*7197", "Статус": "FAILED", "Сумма платежа": -5000.0},
+    {"Дата платежа": "01.08.2021", "Номер карты": "*7197", "Статус": "OK", "Сумма платежа": -300.0},
+    {"Дата платежа": "nan", "Номер карты": "*7197", "Статус": "OK", "Сумма платежа": -70.0},
+]
+
+
+def test_month_number_round_trip():
+    """Тест перевода месяца в порядковый номер и обратно"""
+    assert month_name(month_number("2021-12")) == "2021-12"
+    assert month_number("2022-01") - month_number("2021-12") == 1
+
+
+def test_matrix():
+    """Тест матрицы карта × месяц"""
+    history = CardHistory.from_transactions(TRANSACTIONS)
+
+    assert history.cards == ["*5091", "*7197"]
+    assert month_name(history.first_month) == "2021-08"
+    np.testing.assert_array_equal(history.values["spent"], [[0, 0, 250.0], [300.0, 0, 1000.0]])
+    np.testing.assert_array_equal(history.values["income"], [[0, 0, 500.0], [0, 0, 0]])
+    np.testing.assert_array_equal(history.values["transactions"], [[0, 0, 2], [1, 0, 1]])
+
+
+def test_card_window_outside_data():
+    """Тест: месяцы до и после выписки заполняются нулями"""
+    history = CardHistory.from_transactions(TRANSACTIONS)
+
+    result = history.card("*7197", "2021-11", months=5)
+
+    assert [item["month"] for item in result] == ["2021-07", "2021-08", "2021-09", "2021-10", "2021-11"]
+    assert [item["spent"] for item in result] == [0.0, 300.0, 0.0, 1000.0, 0.0]
+    assert history.card("*7197", "2020-01", months=2)[1]["transactions"] == 0
+    assert history.card("*0000", "2021-10", months=1)[0]["spent"] == 0.0
+
+
+@pytest.mark.parametrize("rules", [None, [{"percent": 5, "monthly_cap": 20}]])
+def test_month_matches_get_card_infos(rules):
+    """Тест: срез за месяц совпадает с get_card_infos по операциям месяца"""
+    history = CardHistory.from_transactions(TRANSACTIONS, rules)
+    month = [item for item in filter_by_date(TRANSACTIONS, "01.10.2021", "31.10.2021") if item["Статус"] == "OK"]
+
+    expected = get_card_infos(month, rules)
+    result = [
+        {"last_digits": card["last_digits"], "total_spent": data["spent"], "cashback": data["cashback"]}
+        for card in history.history("2021-10", months=1)
+        for data in card["months"]
+    ]
+
+    assert result == expected
+
+
+def test_empty():
+    """Тест пустой выписки"""
+    assert CardHistory.from_transactions([]).history("2021-10") == []
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cashback import CashbackEngine
+
+RULES = [
+    {"percent": 5, "categories": ["Супермаркеты"], "monthly_cap": 10},
+    {"percent": 3, "mcc": [[5811, 5814]]},
+    {"percent": 0, "categories": ["Переводы"]},
+]
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame(
+        [
+            {
+                "Дата платежа": "01.10.2021",
+                "Номер карты": "*7197",
+                "Сумма платежа": -100.0,
+                "Категория": "Супермаркеты",
+                "MCC": 5411.0,
+            },
+            {
+                "Дата платежа": "05.10.2021",
+                "Номер карты": "*7197",
+                "Сумма платежа": -150.0,
+                "Категория": "Супермаркеты",
+                "MCC": 5411.0,
+            },
+            {
+                "Дата платежа": "06.10.2021",
+                "Номер карты": "*7197",
+                "Сумма платежа": -100.0,
+                "Категория": "Супермаркеты",
+                "MCC": 5411.0,
+            },
+            {
+                "Дата платежа": "01.11.2021",
+                "Номер карты": "*7197",
+                "Сумма платежа": -100.0,
+                "Категория": "Супермаркеты",
+                "MCC": 5411.0,
+            },
+            {
+                "Дата платежа": "02.10.2021",
+                "Номер карты": "*5091",
+                "Сумма платежа": -100.0,
+                "Категория": "Супермаркеты",
+                "MCC": 5411.0,
+            },
+            {
+                "Дата платежа": "03.10.2021",
+                "Номер карты": "*5091",
+                "Сумма платежа": -200.0,
+                "Категория": "Фастфуд",
+                "MCC": 5814.0,
+            },
+            {
+                "Дата платежа": "04.10.2021",
+                "Номер карты": "*5091",
+                "Сумма платежа": -1000.0,
+                "Категория": "Переводы",
+                "MCC": np.nan,
+            },
+            {
+                "Дата платежа": "04.10.2021",
+                "Номер карты": "*5091",
+                "Сумма платежа": -50.0,
+                "Категория": "Аптеки",
+                "MCC": 5912.0,
+            },
+            {
+                "Дата платежа": "04.10.2021",
+                "Номер карты": "*5091",
+                "Сумма платежа": 500.0,
+                "Категория": "Пополнения",
+                "MCC": np.nan,
+            },
+        ]
+    )
+
+
+def test_match_rules(transactions):
+    """Тест выбора первого подходящего правила"""
+    engine = CashbackEngine(RULES)
+
+    assert engine.match_rules(transactions).tolist() == [0, 0, 0, 0, 0, 1, 2, 3, 3]
+
+
+def test_calculate_per_transaction_with_monthly_cap(transactions):
+    """Тест кешбэка по операциям с месячным лимитом по карте"""
+    result = CashbackEngine(RULES).calculate(transactions)
+
+    # *7197 в октябре: 5 + 5 (лимит 10 исчерпан), затем 0; в ноябре лимит начинается заново
+    assert result.round(2).tolist() == [5.0, 5.0, 0.0, 5.0, 5.0, 6.0, 0.0, 0.5, 0.0]
+    assert result.index.equals(transactions.index)
+
+
+def test_cap_is_applied_in_date_order(transactions):
+    """Тест что лимит исчерпывается в порядке дат, а не строк"""
+    shuffled = transactions.iloc[[2, 1, 0]]
+
+    result = CashbackEngine(RULES).calculate(shuffled)
+
+    assert result.round(2).tolist() == [0.0, 5.0, 5.0]
+
+
+def test_by_card(transactions):
+    """Тест итогов по картам"""
+    result = CashbackEngine(RULES).by_card(transactions)
+
+    assert result.loc["*7197", "total_spent"] == 450.0
+    assert result.loc["*7197", "cashback"] == pytest.approx(15.0)
+    assert result.loc["*5091", "total_spent"] == 1350.0
+    assert result.loc["*5091", "cashback"] == pytest.approx(11.5)
+
+
+def test_default_percent_without_rules(transactions):
+    """Тест ставки по умолчанию без правил"""
+    result = CashbackEngine([], default_percent=1).calculate(transactions)
+
+    assert result.sum() == pytest.approx(18.0)
+
+
+def test_empty_transactions():
+    """Тест пустого набора операций"""
+    result = CashbackEngine(RULES).calculate(pd.DataFrame(columns=["Сумма платежа"]))
+
+    assert result.empty
@@ -0,0 +1,117 @@
+import multiprocessing
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.column_store import column_store_version, open_column_store, write_column_store
+from src.loader import compact_transactions
+
+
+@pytest.fixture
+def transactions():
+    raw = pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "29.12.2021 09:15:30"],
+            "Дата платежа": ["31.12.2021", "30.12.2021", None],
+            "Номер карты": ["*7197", "*7197", "*5091"],
+            "Сумма платежа": [-160.89, -0.1, 1500.0],
+            "Кэшбэк": [np.nan, 70.0, np.nan],
+            "Категория": ["Супермаркеты", "Супермаркеты", "Пополнения"],
+            "MCC": [5411.0, 5411.0, np.nan],
+            "Описание": ["Колхоз", "Колхоз", None],
+            "Бонусы (включая кэшбэк)": [3, 0, 0],
+        }
+    )
+    return compact_transactions(raw)
+
+
+def test_round_trip(transactions, tmp_path):
+    """Тест записи и чтения колоночного хранилища"""
+    write_column_store(transactions, str(tmp_path / "store"))
+
+    result = open_column_store(str(tmp_path / "store"))
+
+    assert list(result.columns) == list(transactions.columns)
+    assert result["Сумма платежа"].tolist() == [-16089, -10, 150000]
+    assert result["Кэшбэк"].tolist()[1] == 7000
+    assert result["Кэшбэк"].isna().tolist() == [True, False, True]
+    assert result["MCC"].dtype == "Int16"
+    assert result["Категория"].tolist() == ["Супермаркеты", "Супермаркеты", "Пополнения"]
+    assert result["Описание"].isna().tolist() == [False, False, True]
+    assert result["Дата операции"].iloc[0] == pd.Timestamp(2021, 12, 31, 16, 44)
+    assert pd.isna(result["Дата платежа"].iloc[2])
+
+
+def test_open_is_zero_copy(transactions, tmp_path):
+    """Тест что столбцы открываются поверх файлов через mmap"""
+    write_column_store(transactions, str(tmp_path / "store"))
+
+    result = open_column_store(str(tmp_path / "store"))
+
+    assert isinstance(result["Сумма платежа"].values, np.memmap)
+    assert isinstance(np.asarray(result["Категория"].array.codes).base, np.memmap)
+    assert not result["Сумма платежа"].values.flags.writeable
+
+
+def test_new_version_keeps_open_readers(transactions, tmp_path):
+    """Тест что запись новой версии не мешает уже открытым читателям"""
+    directory = str(tmp_path / "store")
+    first = write_column_store(transactions, directory)
+    opened = open_column_store(directory)
+
+    second = write_column_store(transactions.iloc[:1], directory)
+
+    assert first != second
+    assert column_store_version(directory) == second
+    assert len(opened) == 3
+    assert opened["Сумма платежа"].sum() == 133901
+    assert len(open_column_store(directory)) == 1
+
+
+def test_old_versions_removed_after_grace_period(transactions, tmp_path):
+    """Тест что прежняя версия сохраняется, старые удаляются после задержки, чужие каталоги не трогаются"""
+    root = tmp_path / "store"
+    (root / "very_important").mkdir(parents=True)
+    (root / "v1-backup").mkdir()
+    first = write_column_store(transactions, str(root))
+    second = write_column_store(transactions, str(root))
+    third = write_column_store(transactions, str(root))
+
+    assert (root / first).exists()
+
+    with patch("src.column_store.GRACE_SECONDS", 0.0):
+        fourth = write_column_store(transactions, str(root))
+
+    assert sorted(path.name for path in root.iterdir() if path.is_dir()) == sorted(
+        ["very_important", "v1-backup", third, fourth]
+    )
+    assert not (root / second).exists()
+
+
+def _sum_in_worker(directory):
+    return int(open_column_store(directory)["Сумма платежа"].sum())
+
+
+def test_workers_open_same_store(transactions, tmp_path):
+    """Тест чтения хранилища из нескольких процессов"""
+    directory = str(tmp_path / "store")
+    write_column_store(transactions, directory)
+
+    with multiprocessing.get_context("spawn").Pool(2) as pool:
+        results = pool.map(_sum_in_worker, [directory, directory])
+
+    assert results == [133901, 133901]
+
+
+def test_plain_frame_strings_are_dictionary_encoded(tmp_path):
+    """Тест что строковые столбцы без категорий кодируются словарём"""
+    frame = pd.DataFrame({"Статус": ["OK", "FAILED", "OK"], "Сумма": [1.5, 2.5, np.nan]})
+
+    write_column_store(frame, str(tmp_path / "store"))
+    result = open_column_store(str(tmp_path / "store"))
+
+    assert result["Статус"].tolist() == ["OK", "FAILED", "OK"]
+    assert list(result["Статус"].cat.categories) == ["OK", "FAILED"]
+    assert np.isnan(result["Сумма"].iloc[2])
@@ -0,0 +1,111 @@
+from datetime import date
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from src.currency import convert_records_to_rub, convert_to_rub, load_rate_table, save_rate_table, update_rate_table
+
+RATES = pd.DataFrame(
+    {
+        "date": pd.to_datetime(["2021-10-01", "2021-10-05", "2021-10-01"]),
+        "currency": ["USD", "USD", "CNY"],
+        "rate": [72.0, 73.0, 11.0],
+    }
+)
+
+
+def test_convert_to_rub_uses_last_known_rate():
+    """Тест пересчёта по последнему известному курсу на дату операции"""
+    transactions = pd.DataFrame(
+        [
+            {"Дата платежа": "03.10.2021", "Сумма платежа": -10.0, "Валюта платежа": "USD"},
+            {"Дата платежа": "06.10.2021", "Сумма платежа": -10.0, "Валюта платежа": "USD"},
+            {"Дата платежа": "06.10.2021", "Сумма платежа": -100.0, "Валюта платежа": "RUB"},
+            {"Дата платежа": "02.10.2021", "Сумма платежа": -5.0, "Валюта платежа": "CNY"},
+        ]
+    )
+
+    result = convert_to_rub(transactions, RATES)
+
+    assert result["Сумма платежа"].tolist() == [-720.0, -730.0, -100.0, -55.0]
+    assert (result["Валюта платежа"] == "RUB").all()
+    assert result["Исходная сумма платежа"].tolist() == [-10.0, -10.0, -100.0, -5.0]
+    assert result["Исходная валюта платежа"].tolist() == ["USD", "USD", "RUB", "CNY"]
+    assert transactions["Валюта платежа"].tolist() == ["USD", "USD", "RUB", "CNY"]
+
+
+def test_convert_to_rub_without_rate_keeps_amount():
+    """Тест что операции без известного курса не меняются"""
+    transactions = pd.DataFrame(
+        [
+            {"Дата платежа": "01.09.2021", "Сумма платежа": -10.0, "Валюта платежа": "USD"},
+            {"Дата платежа": "01.10.2021", "Сумма платежа": -10.0, "Валюта платежа": "EUR"},
+        ]
+    )
+
+    result = convert_to_rub(transactions, RATES)
+
+    assert result["Сумма платежа"].tolist() == [-10.0, -10.0]
+    assert result["Валюта платежа"].tolist() == ["USD", "EUR"]
+
+
+def test_rate_table_round_trip(tmp_path):
+    """Тест сохранения и загрузки таблицы курсов"""
+    path = str(tmp_path / "rates.csv")
+
+    save_rate_table(RATES, path)
+    loaded = load_rate_table(path)
+
+    pd.testing.assert_frame_equal(
+        loaded.sort_values(["currency", "date"]).reset_index(drop=True),
+        RATES.sort_values(["currency", "date"]).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_load_rate_table_missing_file(tmp_path):
+    """Тест загрузки отсутствующей таблицы"""
+    assert load_rate_table(str(tmp_path / "missing.csv")).empty
+
+
+@patch("src.currency.requests.get")
+def test_update_rate_table_fetches_only_missing_dates(mock_get, tmp_path):
+    """Тест что загружаются только недостающие даты, валюты с одним промежутком - одним запросом"""
+    path = str(tmp_path / "rates.csv")
+    save_rate_table(RATES[RATES["currency"] == "USD"], path)
+
+    def timeseries(*args, **kwargs):
+        params = kwargs["params"]
+        days = pd.date_range(params["start_date"], params["end_date"]).strftime("%Y-%m-%d")
+        response = Mock()
+        response.json.return_value = {
+            "rates": {day: {code: 0.01 for code in params["symbols"].split(",")} for day in days}
+        }
+        return response
+
+    mock_get.side_effect = timeseries
+
+    table = update_rate_table(["USD", "EUR", "RUB"], date(2021, 10, 1), date(2021, 10, 7), path)
+
+    requested = sorted(
+        (call[1]["params"]["symbols"], call[1]["params"]["start_date"]) for call in mock_get.call_args_list
+    )
+    assert requested == [("EUR", "2021-10-01"), ("USD", "2021-10-06")]
+    assert len(table[table["currency"] == "EUR"]) == 7
+    assert len(load_rate_table(path)) == len(table)
+    assert table.loc[table["currency"] == "EUR", "rate"].iloc[0] == pytest.approx(100.0)
+
+    mock_get.reset_mock()
+    update_rate_table(["USD", "EUR"], date(2021, 10, 1), date(2021, 10, 7), path)
+    mock_get.assert_not_called()
+
+
+def test_convert_records_to_rub():
+    """Тест пересчёта списка операций"""
+    records = [{"Дата платежа": "03.10.2021", "Сумма платежа": -10.0, "Валюта платежа": "USD"}]
+
+    result = convert_records_to_rub(records, RATES)
+
+    assert result[0]["Сумма платежа"] == -720.0
+    assert convert_records_to_rub(records, RATES.iloc[0:0]) is records
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.dashboard_cache import DashboardCache, dataset_version, settings_hash
+
+
+def test_get_or_compute_uses_cached_value():
+    """Тест что повторный запрос берёт значение из кэша"""
+    cache = DashboardCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"cards": []}
+
+    key = DashboardCache.make_key("operations.xlsx", "01.01.2021", "20.01.2021", "v1", "s")
+    assert cache.get_or_compute(key, compute) == {"cards": []}
+    assert cache.get_or_compute(key, compute) == {"cards": []}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_statements_do_not_evict_each_other(tmp_path):
+    """Тест что записи разных выписок с одинаковой версией не совпадают и не вытесняют друг друга"""
+    cache = DashboardCache()
+    first_key = DashboardCache.make_key(str(tmp_path / "first.xlsx"), "01.01.2021", "20.01.2021", "v1", "s")
+    second_key = DashboardCache.make_key(str(tmp_path / "second.xlsx"), "01.01.2021", "20.01.2021", "v1", "s")
+    new_key = DashboardCache.make_key(str(tmp_path / "second.xlsx"), "01.01.2021", "20.01.2021", "v2", "s")
+    cache.put(first_key, 1)
+    cache.put(second_key, 2)
+    cache.put(new_key, 3)
+
+    assert first_key != second_key
+    assert first_key == DashboardCache.make_key(f"{tmp_path}/./first.xlsx", "01.01.2021", "20.01.2021", "v1", "s")
+    assert [cache.get(first_key), cache.get(second_key), cache.get(new_key)] == [1, 2, 3]
+
+
+def test_lru_eviction():
+    """Тест что при переполнении вытесняется давно не использованная запись"""
+    cache = DashboardCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_persists_between_instances(tmp_path):
+    """Тест что кэш сохраняется на диск и загружается новым экземпляром"""
+    path = str(tmp_path / "cache" / "dashboard.json")
+    DashboardCache(persist_path=path).put("a", {"cards": [1]})
+
+    assert DashboardCache(persist_path=path).get("a") == {"cards": [1]}
+
+
+def test_dataset_version_changes_with_file(tmp_path):
+    """Тест что версия данных меняется при изменении файла и равна None без файла"""
+    statement = tmp_path / "operations.xlsx"
+    assert dataset_version(str(statement)) is None
+
+    statement.write_bytes(b"first")
+    first = dataset_version(str(statement), str(tmp_path / "rates.csv"))
+    statement.write_bytes(b"second version")
+    os.utime(statement, ns=(1, 1))
+
+    assert first.endswith("|-")
+    assert dataset_version(str(statement), str(tmp_path / "rates.csv")) != first
+
+
+def test_settings_hash_ignores_market_settings():
+    """Тест что хеш настроек не зависит от валют, акций и бюджетов"""
+    base = {"user_currencies": ["USD"], "user_stocks": ["AAPL"], "cashback_rules": []}
+
+    assert settings_hash(base) == settings_hash({**base, "user_currencies": ["EUR"], "user_stocks": []})
+    assert settings_hash(base) == settings_hash({**base, "budgets": {"Супермаркеты": 1500}})
+    assert settings_hash(base) != settings_hash({**base, "cashback_rules": [{"category": "Супермаркеты"}]})
+
+
+def test_concurrent_misses_compute_once():
+    """Тест что одновременные промахи по одному ключу вычисляют запись один раз"""
+    cache = DashboardCache()
+    started = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.wait(1)
+        return {"cards": []}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get_or_compute, "key", compute) for _ in range(4)]
+        time.sleep(0.1)
+        started.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert results == [{"cards": []}] * 4
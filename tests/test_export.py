@@ -0,0 +1,127 @@
+import gzip
+import json
+import threading
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.column_store import open_column_store
+from src.export import detect_format, export_report, submit_export, to_frame, wait_for_exports
+from src.reports import report_writer
+
+FRAME = pd.DataFrame(
+    {
+        "Дата платежа": ["20.10.2021", "15.09.2021", "05.10.2021"],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Фастфуд"],
+        "Сумма платежа": [-150.0, -99.0, -320.5],
+    }
+)
+
+
+def test_detect_format():
+    """Тест определения формата и сжатия по имени файла"""
+    assert detect_format("report.csv.gz") == ("csv", "gzip")
+    assert detect_format("report.JSONL") == ("ndjson", None)
+    assert detect_format("report.xlsx") == ("xlsx", None)
+    assert detect_format("reports/store") == ("json", None)
+    assert detect_format("report.txt") == ("json", None)
+
+
+def test_to_frame_flattens_nested_result():
+    """Тест разворачивания вложенного результата пакетного отчёта"""
+    result = {"2021-10-30": {"Фастфуд": [{"Сумма платежа": -320.5}], "Супермаркеты": []}}
+
+    frame = to_frame(result)
+
+    assert frame.to_dict(orient="records") == [{"date": "2021-10-30", "category": "Фастфуд", "Сумма платежа": -320.5}]
+
+
+def test_csv_chunks_match_single_write(tmp_path):
+    """Тест: запись частями даёт тот же CSV, что и запись целиком"""
+    whole = export_report(str(tmp_path / "whole.csv"), FRAME)
+    chunked = export_report(str(tmp_path / "chunked.csv"), FRAME, chunk_size=2)
+
+    with open(whole, encoding="utf-8") as first, open(chunked, encoding="utf-8") as second:
+        assert first.read() == second.read()
+    assert pd.read_csv(chunked).equals(FRAME)
+
+
+def test_ndjson_gzip(tmp_path):
+    """Тест записи NDJSON со сжатием gzip"""
+    filename = export_report(str(tmp_path / "report.ndjson.gz"), FRAME, chunk_size=2)
+
+    with gzip.open(filename, "rt", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+
+    assert records == FRAME.to_dict(orient="records")
+    assert not (tmp_path / "report.ndjson.gz.tmp").exists()
+
+
+def test_xlsx(tmp_path):
+    """Тест записи xlsx"""
+    filename = export_report(str(tmp_path / "report.xlsx"), FRAME, chunk_size=2)
+
+    rows = list(load_workbook(filename).active.iter_rows(values_only=True))
+
+    assert rows[0] == tuple(FRAME.columns)
+    assert rows[1:] == list(FRAME.itertuples(index=False, name=None))
+
+
+def test_columns(tmp_path):
+    """Тест записи в колоночное хранилище"""
+    directory = export_report(str(tmp_path / "store"), FRAME, file_format="columns")
+
+    assert open_column_store(directory).to_dict(orient="records") == FRAME.to_dict(orient="records")
+
+
+def test_unsupported_compression(tmp_path):
+    """Тест: сжатие xlsx не поддерживается"""
+    with pytest.raises(ValueError):
+        export_report(str(tmp_path / "report.xlsx"), FRAME, compression="gzip")
+
+
+def test_unknown_extension_written_as_json(tmp_path):
+    """Тест: имя без расширения или с неизвестным расширением записывается в json"""
+
+    @report_writer(str(tmp_path / "report.txt"))
+    def report():
+        return [{"a": 1}]
+
+    assert report() == [{"a": 1}]
+    export_report(str(tmp_path / "store"), [{"a": 2}])
+
+    assert json.loads((tmp_path / "report.txt").read_text(encoding="utf-8")) == [{"a": 1}]
+    assert json.loads((tmp_path / "store").read_text(encoding="utf-8")) == [{"a": 2}]
+
+
+def test_report_writer_background(tmp_path):
+    """Тест фоновой записи отчёта в CSV"""
+    filename = tmp_path / "report.csv"
+
+    @report_writer(str(filename), background=True)
+    def build_report():
+        return FRAME
+
+    assert build_report() is FRAME
+    wait_for_exports()
+    assert pd.read_csv(filename).equals(FRAME)
+
+
+def test_report_writer_background_copies_result(tmp_path):
+    """Тест что фоновая запись сохраняет результат на момент возврата, а не после его изменения"""
+    filename = tmp_path / "report.json"
+    started, release = threading.Event(), threading.Event()
+    submit_export(lambda: (started.set(), release.wait(5)))
+
+    @report_writer(str(filename), background=True)
+    def build_report():
+        return {"2021-10-30": [{"Сумма платежа": -100.0}]}
+
+    result = build_report()
+    started.wait(5)
+    result["2021-10-30"].append({"Сумма платежа": -200.0})
+    release.set()
+    wait_for_exports()
+
+    assert json.loads(filename.read_text(encoding="utf-8")) == {"2021-10-30": [{"Сумма платежа": -100.0}]}
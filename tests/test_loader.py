@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.loader import (SchemaError, compact_transactions, memory_report, read_transactions_frame, to_kopecks,
+                        to_records, to_rubles, validate_transactions)
+from src.merchants import MERCHANT_COLUMN
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "29.12.2021 09:15:30"],
+            "Дата платежа": ["31.12.2021", "30.12.2021", "bad"],
+            "Номер карты": ["*7197", "*7197", "*5091"],
+            "Статус": ["OK", "OK", "FAILED"],
+            "Сумма платежа": [-160.89, -0.1, 1500.0],
+            "Валюта платежа": ["RUB", "RUB", "RUB"],
+            "Кэшбэк": [np.nan, 70.0, np.nan],
+            "Категория": ["Супермаркеты", "Супермаркеты", "Пополнения"],
+            "MCC": [5411.0, 5411.0, np.nan],
+            "Описание": ["Колхоз", "Колхоз", None],
+            "Бонусы (включая кэшбэк)": [3, 0, 0],
+        }
+    )
+
+
+def test_compact_transactions_dtypes(transactions):
+    """Тест компактных типов столбцов"""
+    result = compact_transactions(transactions)
+
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["Номер карты"].dtype, pd.CategoricalDtype)
+    assert result["Сумма платежа"].dtype == "int64"
+    assert result["Сумма платежа"].tolist() == [-16089, -10, 150000]
+    assert result["Кэшбэк"].dtype == "Int64"
+    assert result["MCC"].dtype == "Int16"
+    assert result["Бонусы (включая кэшбэк)"].dtype == "int8"
+    assert pd.api.types.is_datetime64_any_dtype(result["Дата операции"])
+    assert result["Дата операции"].iloc[2] == pd.Timestamp(2021, 12, 29, 9, 15, 30)
+    assert pd.isna(result["Дата платежа"].iloc[2])
+
+
+def test_descriptions_are_interned(transactions):
+    """Тест что одинаковые описания хранятся одним объектом"""
+    transactions["Описание"] = ["".join(["Кол", "хоз"]), "".join(["Колх", "оз"]), None]
+    assert transactions["Описание"].iloc[0] is not transactions["Описание"].iloc[1]
+
+    result = compact_transactions(transactions)
+
+    assert result["Описание"].iloc[0] is result["Описание"].iloc[1]
+    assert result["Описание"].iloc[2] is None
+
+
+def test_to_kopecks_rounds_float_error():
+    """Тест перевода в копейки без ошибок округления"""
+    assert to_kopecks(pd.Series([0.29, 1198.23, -14216.42])).tolist() == [29, 119823, -1421642]
+
+
+def test_to_rubles_round_trip(transactions):
+    """Тест обратного перевода денежных столбцов в рубли"""
+    result = to_rubles(compact_transactions(transactions))
+
+    assert result["Сумма платежа"].tolist() == transactions["Сумма платежа"].tolist()
+    assert result["Кэшбэк"].iloc[1] == 70.0
+    assert np.isnan(result["Кэшбэк"].iloc[0])
+
+
+def test_memory_report(transactions):
+    """Тест отчёта о памяти по столбцам"""
+    big = pd.concat([transactions] * 1000, ignore_index=True)
+
+    before = memory_report(big)
+    after = memory_report(compact_transactions(big))
+
+    assert before[-1]["column"] == "total"
+    assert after[-1]["bytes"] < before[-1]["bytes"] / 2
+    assert [item["bytes"] for item in after[:-1]] == sorted((item["bytes"] for item in after[:-1]), reverse=True)
+    assert {item["column"] for item in after} == set(big.columns) | {MERCHANT_COLUMN, "total"}
+
+
+def test_read_transactions_frame_missing_file(tmp_path):
+    """Тест чтения отсутствующего файла"""
+    assert read_transactions_frame(str(tmp_path / "missing.xlsx")).empty
+
+
+@patch("src.loader.pd.read_excel")
+def test_read_transactions_frame_compact(mock_read_excel, transactions, tmp_path):
+    """Тест чтения с компактным профилем"""
+    test_file = tmp_path / "test.xlsx"
+    test_file.write_bytes(b"test data")
+    mock_read_excel.return_value = transactions
+
+    result = read_transactions_frame(str(test_file), compact=True)
+
+    assert result["Сумма платежа"].dtype == "int64"
+
+
+def test_validate_transactions_reports_all_bad_rows(transactions):
+    """Тест что все ошибочные строки выявляются за один вызов и отбрасываются"""
+    transactions["Сумма платежа"] = transactions["Сумма платежа"].astype(object)
+    transactions.loc[1, "Сумма платежа"] = "много"
+    transactions.loc[0, "Статус"] = None
+
+    clean, problems = validate_transactions(transactions)
+
+    assert [(item["row"], item["column"], item["problem"]) for item in problems] == [
+        (0, "Статус", "missing value"),
+        (1, "Сумма платежа", "not a number"),
+        (2, "Дата платежа", "invalid date"),
+    ]
+    assert problems[2]["value"] == "bad"
+    assert clean.empty
+
+
+def test_validate_transactions_types(transactions):
+    """Тест типов столбцов после проверки и обратного преобразования в записи"""
+    clean, problems = validate_transactions(transactions.iloc[:2])
+
+    assert problems == []
+    assert clean["Дата платежа"].dtype == "datetime64[ns]"
+    assert clean["Сумма платежа"].dtype == float
+    assert to_records(clean)[0]["Дата операции"] == "31.12.2021 16:44:00"
+    assert to_records(clean)[1]["Дата платежа"] == "30.12.2021"
+
+
+def test_validate_transactions_missing_columns(transactions):
+    """Тест что без обязательных столбцов выбрасывается SchemaError со списком столбцов"""
+    with pytest.raises(SchemaError, match="Сумма платежа, Категория") as error:
+        validate_transactions(transactions.drop(columns=["Сумма платежа", "Категория"]))
+
+    assert [item["column"] for item in error.value.problems] == ["Сумма платежа", "Категория"]
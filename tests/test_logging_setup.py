@@ -0,0 +1,59 @@
+import logging
+import queue
+import threading
+
+from src import logging_setup
+from src.logging_setup import DroppingQueueHandler, SamplingFilter, flush_logs, setup_logger
+
+
+def _record(level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, "message %s", (1,), None)
+
+
+def test_setup_logger_writes_in_background(tmp_path, monkeypatch):
+    """Тест что записи пишутся в файл логгера фоновым потоком, а сообщение собирается не в вызывающем потоке"""
+    monkeypatch.setattr(logging_setup, "LOG_DIR", tmp_path)
+    logger = setup_logger("test_background")
+    caller = threading.get_ident()
+    formatted_in = []
+
+    class Argument:
+        def __str__(self):
+            formatted_in.append(threading.get_ident())
+            return "lazy"
+
+    logger.info("Reading %s", Argument())
+    flush_logs()
+
+    assert "Reading lazy" in (tmp_path / "test_background.log").read_text(encoding="utf-8")
+    assert formatted_in and caller not in formatted_in
+
+
+def test_sampling_filter_rate_limit():
+    """Тест что ограничение пропускает не больше per_second записей, предупреждения проходят всегда"""
+    sampling = SamplingFilter(per_second=3)
+
+    passed = [sampling.filter(_record()) for _ in range(10)]
+
+    assert sum(passed) == 3
+    assert sampling.dropped == 7
+    assert sampling.filter(_record(logging.WARNING))
+
+
+def test_sampling_filter_sample_rate():
+    """Тест что при sample_rate=0 отбрасываются все записи ниже WARNING"""
+    sampling = SamplingFilter(sample_rate=0.0)
+
+    assert not any(sampling.filter(_record()) for _ in range(5))
+    assert sampling.dropped == 5
+
+
+def test_queue_handler_drops_when_full():
+    """Тест что при переполненной очереди запись отбрасывается без ожидания"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+
+    handler.handle(_record())
+    handler.handle(_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
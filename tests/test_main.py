@@ -0,0 +1,174 @@
+import io
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.column_store import open_column_store
+from src.main import main
+
+
+@pytest.fixture
+def statement(tmp_path):
+    """Небольшая выписка в xlsx"""
+    path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["20.10.2021 12:00:00", "05.10.2021 09:30:00", "15.09.2021 18:45:00"],
+            "Дата платежа": ["20.10.2021", "05.10.2021", "15.09.2021"],
+            "Номер карты": ["*7197", "*7197", "*5091"],
+            "Статус": ["OK", "OK", "OK"],
+            "Сумма операции": [-150.0, -320.5, -99.0],
+            "Валюта операции": ["RUB", "RUB", "RUB"],
+            "Сумма платежа": [-150.0, -320.5, -99.0],
+            "Валюта платежа": ["RUB", "RUB", "RUB"],
+            "Кэшбэк": [None, None, None],
+            "Категория": ["Супермаркеты", "Фастфуд", "Супермаркеты"],
+            "MCC": [5411.0, 5814.0, 5411.0],
+            "Описание": ["Магнит", "Burger King", "Пятёрочка"],
+            "Бонусы (включая кэшбэк)": [3, 6, 1],
+            "Округление на инвесткопилку": [0, 0, 0],
+            "Сумма операции с округлением": [150.0, 320.5, 99.0],
+        }
+    ).to_excel(path, index=False)
+    return str(path)
+
+
+def _lines(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+@patch("src.main.get_market_data", return_value={"currency_rates": [], "stock_prices": []})
+def test_dashboard_batch_streams_ndjson(mock_market, statement, tmp_path):
+    """Тест что пакетный режим главной страницы выводит по строке NDJSON на дату"""
+    dates = tmp_path / "dates.txt"
+    dates.write_text("2021-10-30 15:12:30\n\n2021-09-20 10:00:00\n", encoding="utf-8")
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({"user_currencies": [], "user_stocks": []}), encoding="utf-8")
+    output = io.StringIO()
+
+    code = main(
+        ["--data", statement, "--settings", str(settings), "--workers", "2", "dashboard", "--batch", str(dates)],
+        output,
+    )
+
+    lines = _lines(output)
+    assert code == 0
+    assert [line["date"] for line in lines] == ["2021-10-30 15:12:30", "2021-09-20 10:00:00"]
+    assert lines[0]["cards"][0]["total_spent"] == 470.5
+    assert lines[1]["cards"][0]["last_digits"] == "5091"
+    mock_market.assert_called_once()
+
+
+def test_search_batch_reads_stdin(statement, monkeypatch):
+    """Тест что запросы пакетного поиска читаются из стандартного ввода"""
+    monkeypatch.setattr("sys.stdin", io.StringIO("магнит\nфастфуд\n"))
+    output = io.StringIO()
+
+    main(["--data", statement, "search", "--batch", "-"], output)
+
+    lines = _lines(output)
+    assert [line["query"] for line in lines] == ["магнит", "фастфуд"]
+    assert [item["Описание"] for item in lines[1]["transactions"]] == ["Burger King"]
+
+
+@patch("src.reports._write_json")
+def test_report_batch(mock_write_json, statement, tmp_path):
+    """Тест что пакетный отчёт выводит траты по категории для каждой даты"""
+    dates = tmp_path / "dates.txt"
+    dates.write_text("2021-10-30 15:12:30\n2021-09-30 15:12:30\n", encoding="utf-8")
+    output = io.StringIO()
+
+    main(["--data", statement, "report", "Супермаркеты", "--batch", str(dates)], output)
+
+    lines = _lines(output)
+    assert [len(line["transactions"]) for line in lines] == [2, 1]
+
+
+@patch("src.currency.load_rate_table")
+@patch("src.reports._write_json")
+def test_report_converts_to_rub(mock_write_json, mock_rates, statement):
+    """Тест что отчёт по категории, как и остальные команды, пересчитывает суммы в рубли"""
+    frame = pd.read_excel(statement)
+    frame.loc[0, ["Валюта платежа", "Сумма платежа"]] = ["CNY", -10.0]
+    frame.to_excel(statement, index=False)
+    mock_rates.return_value = pd.DataFrame(
+        {"date": pd.to_datetime(["2021-10-01"]), "currency": ["CNY"], "rate": [11.0]}
+    )
+    output = io.StringIO()
+
+    main(["--data", statement, "report", "Супермаркеты", "2021-10-30 15:12:30"], output)
+
+    result = json.loads(output.getvalue())
+    assert [item["Сумма платежа"] for item in result] == [-110.0, -99.0]
+
+
+@patch("src.reports._write_json")
+def test_compare_batch(mock_write_json, statement, tmp_path):
+    """Тест что пакетное сравнение выводит изменения трат по картам для каждой даты и пишет отчёт"""
+    dates = tmp_path / "dates.txt"
+    dates.write_text("2021-10-30 15:12:30\n2021-09-30 15:12:30\n", encoding="utf-8")
+    output = io.StringIO()
+
+    main(["--data", statement, "compare", "--by", "card", "--batch", str(dates)], output)
+
+    lines = _lines(output)
+    assert [line["date"] for line in lines] == ["2021-10-30 15:12:30", "2021-09-30 15:12:30"]
+    assert all(item["month"] == "2021-10" for item in lines[0]["comparison"])
+    mock_write_json.assert_called_once()
+    assert mock_write_json.call_args.args[1]["2021-09-30 15:12:30"] == lines[1]["comparison"]
+
+
+def test_ingest_writes_column_store(statement, tmp_path):
+    """Тест что ingest записывает выписку в колоночное хранилище"""
+    store = tmp_path / "store"
+    output = io.StringIO()
+
+    main(["--data", statement, "ingest", "--output", str(store)], output)
+
+    assert _lines(output)[0]["rows"] == 3
+    assert list(open_column_store(str(store))["Описание"]) == ["Магнит", "Burger King", "Пятёрочка"]
+
+
+def test_profile_writes_stats_to_stderr(statement):
+    """Тест что --profile выводит профиль и пик памяти в поток ошибок"""
+    output, errors = io.StringIO(), io.StringIO()
+
+    main(["--profile", "--data", statement, "search", "магнит"], output, errors)
+
+    assert "Магнит" in output.getvalue()
+    assert "cumulative" in errors.getvalue()
+    assert "peak memory" in errors.getvalue()
+
+
+def test_anomalies_compare_with_earlier_payments(tmp_path):
+    """Тест что траты оцениваются по более ранним, даже если выписка идёт от новых операций к старым"""
+    path = tmp_path / "operations.xlsx"
+    amounts = [-5000.0, -95.0, -105.0, -90.0, -110.0, -100.0]
+    pd.DataFrame(
+        {
+            "Дата операции": [f"{day:02d}.10.2021 12:00:00" for day in (20, 5, 4, 3, 2, 1)],
+            "Дата платежа": [f"{day:02d}.10.2021" for day in (20, 5, 4, 3, 2, 1)],
+            "Номер карты": ["*7197"] * 6,
+            "Статус": ["OK"] * 6,
+            "Сумма операции": amounts,
+            "Валюта операции": ["RUB"] * 6,
+            "Сумма платежа": amounts,
+            "Валюта платежа": ["RUB"] * 6,
+            "Кэшбэк": [None] * 6,
+            "Категория": ["Супермаркеты"] * 6,
+            "MCC": [5411.0] * 6,
+            "Описание": ["Магнит"] * 6,
+            "Бонусы (включая кэшбэк)": [0] * 6,
+            "Округление на инвесткопилку": [0] * 6,
+            "Сумма операции с округлением": [-amount for amount in amounts],
+        }
+    ).to_excel(path, index=False)
+    output = io.StringIO()
+
+    main(["--data", str(path), "anomalies"], output)
+
+    lines = _lines(output)
+    assert [line["Дата платежа"] for line in lines] == ["20.10.2021"]
+    assert lines[0]["Сумма платежа"] == -5000.0
@@ -0,0 +1,105 @@
+import json
+import threading
+from unittest.mock import patch
+from urllib.request import urlopen
+
+import pytest
+import requests
+
+from src import utils
+from src.load_test import drive, latency_report, run_load_test
+from src.market_stub import MarketStubServer
+from src.quota import ProviderScheduler, RateLimited
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Направляет запросы utils на заглушку, повторы без задержки"""
+
+    def use(stub):
+        monkeypatch.setattr(utils, "APILAYER_URL", stub.apilayer_url)
+        monkeypatch.setattr(utils, "ALPHA_VANTAGE_URL", stub.alpha_vantage_url)
+        for name in utils.MARKET_SCHEDULERS:
+            scheduler = ProviderScheduler(
+                name, None, retry_on=(RateLimited, requests.RequestException), sleep=lambda delay: None
+            )
+            monkeypatch.setitem(utils.MARKET_SCHEDULERS, name, scheduler)
+
+    return use
+
+
+def test_stub_mimics_providers(providers):
+    """Тест что курсы и цены акций разбираются из ответов заглушки"""
+    with MarketStubServer() as stub:
+        providers(stub)
+        rates = utils.get_current_exchange_rate(["USD", "EUR"])
+        prices = utils.get_stock(["AAPL"])
+        with urlopen(f"{stub.base_url}/stats") as response:
+            stats = json.loads(response.read())
+
+    assert rates == [{"currency": "USD", "rate": 73.21}, {"currency": "EUR", "rate": 87.08}]
+    assert prices == [{"stock": "AAPL", "price": 150.12}]
+    assert stats["requests"] == 3
+
+
+def test_stub_rate_limit_and_errors(providers):
+    """Тест что ответы о лимите и ошибки сервера повторяются планировщиком, а после повторов возвращаются описанием"""
+    with MarketStubServer(rate_limit_rate=1.0) as stub:
+        providers(stub)
+        rate = utils.get_current_exchange_rate(["USD"])[0]
+        assert rate["currency"] == "USD" and "Information" in rate
+        assert "Note" in utils.get_stock(["AAPL"])[0]
+        assert stub.stats()["rate_limited"] == 6
+
+    with MarketStubServer(error_rate=1.0) as stub:
+        providers(stub)
+        rate = utils.get_current_exchange_rate(["USD"])[0]
+        assert rate["currency"] == "USD" and "Information" in rate
+        assert "Information" in utils.get_stock(["AAPL"])[0]
+        assert stub.stats()["errors"] == 6
+
+
+def test_stub_latency_runs_concurrently():
+    """Тест что задержка ответа не блокирует другие запросы"""
+    with MarketStubServer(latency=0.2) as stub:
+        threads = [
+            threading.Thread(target=lambda: urlopen(f"{stub.alpha_vantage_url}?function=GLOBAL_QUOTE&symbol=AAPL"))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stub.stats()["max_in_flight"] == 4
+
+
+def test_drive_reports_latency_and_errors():
+    """Тест что нагрузочный прогон считает успешные вызовы, ошибки и перцентили"""
+    calls = iter(range(10))
+
+    def render():
+        if next(calls) % 5 == 0:
+            raise ValueError("render failed")
+
+    result = drive(render, renders=10, concurrency=1)
+
+    assert result["ok"] == 8
+    assert result["errors"] == {"ValueError": 2}
+    assert set(result["latency_ms"]) == {"p50", "p90", "p95", "p99", "max"}
+    assert latency_report([0.1, 0.2, 0.3])["p50"] == 200.0
+
+
+@patch("src.load_test.main_page")
+def test_run_load_test_restores_providers(mock_main_page):
+    """Тест что нагрузочный тест ходит в заглушку и восстанавливает адреса и планировщики"""
+    mock_main_page.side_effect = lambda *args: utils.get_current_exchange_rate(["USD"])
+    schedulers = dict(utils.MARKET_SCHEDULERS)
+    url = utils.APILAYER_URL
+
+    result = run_load_test(renders=20, concurrency=4, latency=0.01, jitter=0.0)
+
+    assert result["ok"] == 20
+    assert result["stub"]["requests"] == result["market"]["currency_rates"]["executed"]
+    assert utils.APILAYER_URL == url
+    assert utils.MARKET_SCHEDULERS == schedulers
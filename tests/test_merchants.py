@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from src.merchants import (MERCHANT_COLUMN, MerchantNormalizer, add_merchant_column, merchant_key, merchant_mask,
+                           top_merchants)
+
+TRANSACTIONS = pd.DataFrame(
+    {
+        "Статус": ["OK", "OK", "OK", "OK", "FAILED", "OK"],
+        "Сумма платежа": [-100.0, -250.5, -40.0, -1000.0, -5000.0, 300.0],
+        "Описание": ["Магнит", "MAGNIT MM SANKT-PETERB", "Пятёрочка 1234", 'OOO "Nord-S"', "Nord-S", None],
+    }
+)
+
+
+def test_merchant_key():
+    """Тест ключа описания"""
+    assert merchant_key("IP Yakubovskaya M. V.") == merchant_key("ИП Yakubovskaya M.V.") == "yakubovskaya m v"
+    assert merchant_key("Пятёрочка 1234") == "пятерочка"
+
+
+def test_normalize_maps_variants_to_one_merchant():
+    """Тест: варианты описаний одного продавца получают один номер"""
+    normalizer = MerchantNormalizer()
+
+    result = normalizer.normalize(TRANSACTIONS["Описание"])
+
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert result.tolist()[:5] == ["Магнит", "Магнит", "Пятёрочка", 'OOO "Nord-S"', 'OOO "Nord-S"']
+    assert pd.isna(result.iloc[5])
+    assert result.cat.codes.tolist() == [0, 0, 1, 2, 2, -1]
+
+
+def test_normalize_keeps_ids_between_calls():
+    """Тест: номера продавцов сохраняются между вызовами, известные описания берутся из кэша"""
+    normalizer = MerchantNormalizer()
+    normalizer.normalize(TRANSACTIONS["Описание"])
+
+    ids = normalizer.merchant_ids(pd.Series(["Nord-S", "Новый продавец", "Магнит"]))
+
+    assert ids.tolist() == [2, 3, 0]
+    assert normalizer.names == ["Магнит", "Пятёрочка", 'OOO "Nord-S"', "Новый продавец"]
+
+
+def test_normalize_dictionary_contains_only_present_merchants():
+    """Тест: словарь результата содержит только продавцов переданных описаний"""
+    normalizer = MerchantNormalizer()
+    normalizer.normalize(TRANSACTIONS["Описание"])
+
+    result = normalizer.normalize(pd.Series(["Nord-S", "Новый продавец", "Магнит", None]))
+
+    assert list(result.cat.categories) == ["Магнит", 'OOO "Nord-S"', "Новый продавец"]
+    assert result.cat.codes.tolist() == [1, 2, 0, -1]
+
+
+def test_description_cache_is_bounded():
+    """Тест: кэш описаний не растёт больше max_descriptions, номера вытесненных описаний не меняются"""
+    normalizer = MerchantNormalizer(max_descriptions=2)
+
+    first = normalizer.merchant_ids(pd.Series(["Магнит 1", "Магнит 2", "Лента 3", "Nord-S"]))
+    second = normalizer.merchant_ids(pd.Series(["Магнит 1", "Лента 3"]))
+
+    assert len(normalizer._by_description) == 2
+    assert first.tolist() == [0, 0, 1, 2]
+    assert second.tolist() == [0, 1]
+
+
+def test_custom_rules():
+    """Тест пользовательских правил"""
+    normalizer = MerchantNormalizer({"Кофейня": [r"kofe", r"coffee"]})
+
+    result = normalizer.normalize(pd.Series(["Kofe s sobojj", "Coffeeport", "Магнит"]))
+
+    assert result.tolist() == ["Кофейня", "Кофейня", "Магнит"]
+
+
+def test_add_merchant_column():
+    """Тест добавления столбца продавцов после описания"""
+    result = add_merchant_column(TRANSACTIONS)
+
+    assert list(result.columns) == ["Статус", "Сумма платежа", "Описание", MERCHANT_COLUMN]
+    assert add_merchant_column(result) is result
+    assert MERCHANT_COLUMN not in TRANSACTIONS
+
+
+def test_top_merchants():
+    """Тест топа продавцов по тратам"""
+    assert top_merchants(TRANSACTIONS, k=2) == [
+        {"merchant": 'OOO "Nord-S"', "total_spent": 1000.0, "transactions": 1},
+        {"merchant": "Магнит", "total_spent": 350.5, "transactions": 2},
+    ]
+
+
+def test_merchant_mask():
+    """Тест поиска операций по имени продавца"""
+    np.testing.assert_array_equal(merchant_mask(TRANSACTIONS, "магнит"), [True, True, False, False, False, False])
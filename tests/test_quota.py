@@ -0,0 +1,203 @@
+import threading
+import time
+
+import pytest
+
+from src.quota import BACKGROUND, CircuitOpenError, ProviderScheduler, QuotaExceeded, RateLimited
+
+
+def _scheduler(**kwargs):
+    params = dict(per_minute=600, per_day=None, sleep=lambda delay: None)
+    params.update(kwargs)
+    return ProviderScheduler("test", **params)
+
+
+def test_call_returns_result_and_counts_requests():
+    """Тест успешного вызова через планировщик"""
+    scheduler = _scheduler()
+
+    assert scheduler.call(lambda: 42) == 42
+    assert scheduler.stats()["requests"] == 1
+    assert scheduler.stats()["used_today"] == 1
+
+
+def test_daily_quota_is_enforced():
+    """Тест что после исчерпания суточной квоты запросы не отправляются"""
+    scheduler = _scheduler(per_day=2)
+    calls = []
+
+    scheduler.call(lambda: calls.append(1))
+    scheduler.call(lambda: calls.append(1))
+    with pytest.raises(QuotaExceeded):
+        scheduler.call(lambda: calls.append(1))
+
+    assert len(calls) == 2
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_interactive_call_gives_up_after_max_wait():
+    """Тест что интерактивный запрос не ждёт токен дольше max_wait"""
+    scheduler = _scheduler(per_minute=1, max_wait=0.05)
+
+    scheduler.call(lambda: None)
+    started = time.monotonic()
+    with pytest.raises(QuotaExceeded):
+        scheduler.call(lambda: None)
+
+    assert time.monotonic() - started < 1
+
+
+def test_tokens_refill_over_time():
+    """Тест пополнения токенов с поминутной скоростью"""
+    scheduler = _scheduler(per_minute=1200, background_reserve=0)
+    for _ in range(1200):
+        scheduler.call(lambda: None)
+
+    started = time.monotonic()
+    scheduler.call(lambda: None)
+
+    assert 0.01 <= time.monotonic() - started < 1
+
+
+def test_background_keeps_reserve_for_interactive():
+    """Тест что фоновые запросы не используют резерв интерактивных"""
+    scheduler = _scheduler(per_minute=2, background_reserve=1)
+
+    scheduler.call(lambda: None, priority=BACKGROUND)
+    with pytest.raises(QuotaExceeded):
+        scheduler.call(lambda: None, priority=BACKGROUND, max_wait=0.01)
+
+    assert scheduler.call(lambda: "interactive") == "interactive"
+
+
+def test_background_yields_to_waiting_interactive():
+    """Тест что ожидающий интерактивный запрос получает токен раньше фонового"""
+    scheduler = _scheduler(per_minute=120, background_reserve=0)
+    for _ in range(120):
+        scheduler.call(lambda: None)
+
+    order = []
+    background = threading.Thread(target=lambda: scheduler.call(lambda: order.append("background"), BACKGROUND))
+    background.start()
+    time.sleep(0.05)
+    scheduler.call(lambda: order.append("interactive"))
+    background.join()
+
+    assert order == ["interactive", "background"]
+
+
+def test_retry_with_backoff_then_success():
+    """Тест повтора после ответа о превышении лимита"""
+    delays = []
+    scheduler = _scheduler(max_retries=2, base_delay=1.0, sleep=delays.append)
+    responses = iter([RateLimited({"Note": "limit"}), "ok"])
+
+    def func():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert scheduler.call(func) == "ok"
+    assert len(delays) == 1
+    assert 0 <= delays[0] <= 1.0
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_retries_are_limited():
+    """Тест что после max_retries повторов ошибка пробрасывается"""
+    calls = []
+    scheduler = _scheduler(max_retries=2)
+
+    def func():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        scheduler.call(func)
+
+    assert len(calls) == 3
+
+
+def test_not_retryable_error_is_raised_immediately():
+    """Тест что ошибки вне retry_on не повторяются"""
+    calls = []
+    scheduler = _scheduler()
+
+    def func():
+        calls.append(1)
+        raise KeyError("rates")
+
+    with pytest.raises(KeyError):
+        scheduler.call(func)
+
+    assert len(calls) == 1
+
+
+def test_circuit_opens_and_recovers():
+    """Тест открытия предохранителя после серии ошибок и пробного запроса после таймаута"""
+    scheduler = _scheduler(max_retries=0, failure_threshold=2, reset_timeout=0.05)
+
+    def failing():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            scheduler.call(failing)
+
+    with pytest.raises(CircuitOpenError):
+        scheduler.call(lambda: "skipped")
+    assert scheduler.stats()["circuit_open"] is True
+
+    time.sleep(0.06)
+    assert scheduler.call(lambda: "recovered") == "recovered"
+    assert scheduler.stats()["circuit_open"] is False
+
+
+def test_not_retryable_error_during_trial_closes_trial():
+    """Тест что ошибка вне retry_on в пробном запросе не оставляет предохранитель открытым навсегда"""
+    scheduler = _scheduler(max_retries=0, failure_threshold=1, reset_timeout=0.05)
+
+    def rate_limited():
+        raise RateLimited({"Note": "limit"})
+
+    def broken():
+        raise KeyError("rates")
+
+    with pytest.raises(RateLimited):
+        scheduler.call(rate_limited)
+    time.sleep(0.06)
+    with pytest.raises(KeyError):
+        scheduler.call(broken)
+    with pytest.raises(CircuitOpenError):
+        scheduler.call(lambda: "skipped")
+
+    time.sleep(0.06)
+    assert scheduler.call(lambda: "recovered") == "recovered"
+
+
+def test_not_retryable_errors_open_circuit():
+    """Тест что ошибки вне retry_on учитываются предохранителем"""
+    scheduler = _scheduler(failure_threshold=2, reset_timeout=60)
+
+    def broken():
+        raise KeyError("rates")
+
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            scheduler.call(broken)
+
+    assert scheduler.stats()["circuit_open"] is True
+
+
+def test_daily_rate_limit_response_exhausts_quota():
+    """Тест что ответ о суточном лимите сразу исчерпывает суточную квоту"""
+    scheduler = _scheduler(per_day=25, max_retries=3)
+
+    def func():
+        raise RateLimited({"Information": "25 requests per day"}, daily=True)
+
+    with pytest.raises(QuotaExceeded):
+        scheduler.call(func)
+
+    assert scheduler.stats()["used_today"] == 25
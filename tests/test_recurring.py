@@ -0,0 +1,88 @@
+import pandas as pd
+
+from src.recurring import amount_buckets, find_recurring, normalize_descriptions
+
+
+def _payment(date, description, amount, status="OK"):
+    return {
+        "Дата платежа": date,
+        "Статус": status,
+        "Сумма платежа": amount,
+        "Описание": description,
+        "Категория": "Развлечения",
+        "Номер карты": "*7197",
+    }
+
+
+SUBSCRIPTION = [
+    _payment("05.08.2021", "Яндекс Плюс 08/21", -199.0),
+    _payment("05.09.2021", "ЯНДЕКС ПЛЮС 09/21", -199.0),
+    _payment("06.10.2021", "Яндекс Плюс 10/21", -205.0),
+    _payment("05.11.2021", "Яндекс Плюс 11/21", -199.0),
+]
+
+
+def test_normalize_descriptions():
+    """Тест нормализации описаний"""
+    result = normalize_descriptions(pd.Series(["Яндекс Плюс 12/21", "ЯНДЕКС  ПЛЮС", "123", None]))
+
+    assert result.tolist()[:2] == ["яндекс плюс", "яндекс плюс"]
+    assert result.isna().tolist()[2:] == [True, True]
+
+
+def test_amount_buckets():
+    """Тест: близкие суммы в одной корзине, далёкие - в разных"""
+    buckets = amount_buckets(pd.Series([-199.0, -205.0, -2000.0]))
+
+    assert buckets[0] == buckets[1]
+    assert buckets[0] != buckets[2]
+
+
+def test_find_monthly_subscription():
+    """Тест поиска ежемесячной подписки среди разовых трат"""
+    noise = [
+        _payment("10.09.2021", "Магнит", -1500.0),
+        _payment("12.09.2021", "Магнит", -80.0),
+        _payment("20.10.2021", "Перевод", 5000.0),
+    ]
+
+    result = find_recurring(noise + SUBSCRIPTION)
+
+    assert result == [
+        {
+            "description": "Яндекс Плюс 11/21",
+            "category": "Развлечения",
+            "card": "*7197",
+            "amount": 199.0,
+            "period": "monthly",
+            "interval_days": 31.0,
+            "payments": 4,
+            "first_date": "05.08.2021",
+            "last_date": "05.11.2021",
+            "next_date": "05.12.2021",
+        }
+    ]
+
+
+def test_irregular_and_failed_payments_are_skipped():
+    """Тест: нерегулярные серии и неуспешные операции не считаются подпиской"""
+    irregular = [
+        _payment("01.01.2021", "Кино", -300.0),
+        _payment("03.01.2021", "Кино", -300.0),
+        _payment("20.04.2021", "Кино", -300.0),
+    ]
+    failed = [dict(item, Статус="FAILED") for item in SUBSCRIPTION[:2]] + SUBSCRIPTION[2:]
+
+    assert find_recurring(irregular) == []
+    assert find_recurring(failed) == []
+
+
+def test_find_recurring_accepts_dataframe():
+    """Тест поиска по таблице с датами datetime64"""
+    frame = pd.DataFrame(SUBSCRIPTION)
+    frame["Дата платежа"] = pd.to_datetime(frame["Дата платежа"], format="%d.%m.%Y")
+
+    result = find_recurring(frame, min_payments=4)
+
+    assert [item["payments"] for item in result] == [4]
+    assert find_recurring(pd.DataFrame()) == []
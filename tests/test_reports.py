@@ -1,8 +1,12 @@
+import os
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 
-from src.reports import _write_json, report_writer, spending_by_category
+from src.aggregates import SpendingAggregates
+from src.reports import (REPORTS_PATH, _write_json, batch_spending_by_category, batch_spending_comparison,
+                         report_writer, spending_by_category, spending_by_merchant, spending_comparison)
 
 
 @patch("src.reports._write_json")
@@ -112,6 +116,22 @@ def test_report_writer_decorator(mock_write):
     mock_write.assert_called_once()
 
 
+@patch("src.reports._write_json")
+def test_report_writer_default_name_in_project_reports(mock_write):
+    """Тест что отчёт без имени файла пишется в каталог reports проекта независимо от рабочего каталога"""
+
+    @report_writer()
+    def test_function():
+        return {"data": "test"}
+
+    test_function()
+
+    target = mock_write.call_args.args[0]
+    assert os.path.dirname(target) == str(REPORTS_PATH)
+    assert REPORTS_PATH == Path(__file__).resolve().parent.parent / "reports"
+    assert os.path.basename(target).startswith("report_test_function_")
+
+
 @patch("src.reports._write_json")
 def test_report_writer_with_filename(mock_write):
     """Тест декоратора report_writer с именем файла"""
@@ -124,3 +144,104 @@ def test_report_writer_with_filename(mock_write):
 
     assert isinstance(result, pd.DataFrame)
     mock_write.assert_called_once_with("custom_report.json", result)
+
+
+BATCH_DATA = pd.DataFrame(
+    [
+        {"Дата платежа": "15.10.2021", "Категория": "Еда", "Сумма платежа": -500.0, "Кэшбэк": None},
+        {"Дата платежа": "01.09.2021", "Категория": "Транспорт", "Сумма платежа": -200.0, "Кэшбэк": None},
+        {"Дата платежа": "20.08.2021", "Категория": "Еда", "Сумма платежа": -300.0, "Кэшбэк": 3.0},
+        {"Дата платежа": "01.01.2021", "Категория": "Еда", "Сумма платежа": -100.0, "Кэшбэк": None},
+        {"Дата платежа": None, "Категория": "Еда", "Сумма платежа": -50.0, "Кэшбэк": None},
+    ]
+)
+
+
+@patch("src.reports._write_json")
+def test_batch_spending_by_category_all_categories(mock_write):
+    """Тест пакетного отчёта по всем категориям за несколько периодов"""
+    result = batch_spending_by_category(BATCH_DATA, ["2021-10-30 15:12:30", "2021-03-01 00:00:00"])
+
+    assert list(result) == ["2021-10-30 15:12:30", "2021-03-01 00:00:00"]
+    october = result["2021-10-30 15:12:30"]
+    assert sorted(october) == ["Еда", "Транспорт"]
+    assert [item["Сумма платежа"] for item in october["Еда"]] == [-300.0, -500.0]
+    assert october["Еда"][1]["Кэшбэк"] is None
+    assert result["2021-03-01 00:00:00"] == {"Еда": [BATCH_DATA.iloc[3].to_dict() | {"Кэшбэк": None}]}
+    mock_write.assert_called_once()
+
+
+@patch("src.reports._write_json")
+def test_batch_spending_by_category_matches_single_report(mock_write):
+    """Тест что пакетный отчёт совпадает с отчётом по одной категории"""
+    date = "2021-10-30 15:12:30"
+    single = spending_by_category(BATCH_DATA.dropna(subset=["Дата платежа"]), "Еда", date)
+    batch = batch_spending_by_category(BATCH_DATA, [date], ["Еда", "Связь"])
+
+    assert sorted(item["Сумма платежа"] for item in batch[date]["Еда"]) == sorted(single["Сумма платежа"])
+    assert batch[date]["Связь"] == []
+
+
+@patch("src.reports._write_json")
+def test_batch_spending_by_category_with_workers(mock_write):
+    """Тест пакетного отчёта с распределением по процессам"""
+    dates = ["2021-10-30 15:12:30", "2021-09-30 00:00:00", "2021-03-01 00:00:00"]
+
+    sequential = batch_spending_by_category(BATCH_DATA, dates)
+    parallel = batch_spending_by_category(BATCH_DATA, dates, workers=2)
+
+    assert parallel == sequential
+    assert list(parallel) == dates
+
+
+@patch("src.reports._write_json")
+def test_batch_spending_by_category_empty(mock_write):
+    """Тест пакетного отчёта по пустым данным"""
+    result = batch_spending_by_category(pd.DataFrame(), ["2021-10-30 15:12:30"], ["Еда"])
+
+    assert result == {"2021-10-30 15:12:30": {"Еда": []}}
+
+
+@patch("src.reports._write_json")
+def test_spending_by_merchant(mock_write):
+    """Тест отчёта по продавцу: варианты описаний объединяются"""
+    transactions = BATCH_DATA.assign(Описание=["Магнит", "Метро", "MAGNIT MM", "Магнит 12", "Магнит"])
+
+    result = spending_by_merchant(transactions, "Магнит", "2021-10-30 15:12:30")
+
+    assert result["Сумма платежа"].tolist() == [-300.0, -500.0]
+    assert spending_by_merchant(transactions, "Лента", "2021-10-30 15:12:30").empty
+    assert mock_write.call_count == 2
+
+
+@patch("src.reports._write_json")
+def test_spending_comparison(mock_write):
+    """Тест отчёта сравнения: по операциям и по готовым агрегатам результат одинаковый"""
+    transactions = BATCH_DATA.assign(Статус="OK")
+    aggregates = SpendingAggregates.from_transactions(transactions)
+
+    from_rows = spending_comparison(transactions, "2021-09-30 00:00:00")
+    from_aggregates = spending_comparison(aggregates, "2021-09-30 00:00:00")
+
+    assert from_rows.equals(from_aggregates)
+    assert from_rows[["Категория", "spent", "baseline_spent"]].values.tolist() == [
+        ["Транспорт", 200.0, 0.0],
+        ["Еда", 0.0, 300.0],
+    ]
+    assert mock_write.call_count == 2
+
+
+@patch("src.reports._write_json")
+def test_batch_spending_comparison_matches_single_report(mock_write):
+    """Тест пакетного сравнения: результат по каждой дате совпадает с отчётом за эту дату, отчёт пишется один раз"""
+    aggregates = SpendingAggregates.from_transactions(BATCH_DATA.assign(Статус="OK"))
+    dates = ["2021-09-30 00:00:00", "2021-10-30 00:00:00"]
+
+    result = batch_spending_comparison(aggregates, dates, by="category")
+
+    assert list(result) == dates
+    for date_string in dates:
+        single = spending_comparison(aggregates, date_string)
+        assert result[date_string] == single.astype(object).where(single.notna(), None).to_dict(orient="records")
+    assert mock_write.call_count == 3
+    assert mock_write.call_args_list[0].args[1] == result
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+from urllib.parse import quote
+
+import pytest
+
+from src.server import DashboardServer
+from src.snapshot import DatasetSnapshot
+
+TRANSACTIONS = [
+    {
+        "Дата платежа": "20.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -1000.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Магнит",
+    },
+    {
+        "Дата платежа": "05.10.2021",
+        "Номер карты": "*5091",
+        "Статус": "OK",
+        "Сумма платежа": -250.0,
+        "Категория": "Транспорт",
+        "Описание": "Такси",
+    },
+    {
+        "Дата платежа": "01.08.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -300.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Пятёрочка",
+    },
+    {
+        "Дата платежа": "15.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "FAILED",
+        "Сумма платежа": -5000.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Магнит",
+    },
+]
+
+MARKET_DATA = {
+    "currency_rates": [{"currency": "USD", "rate": 73.21}],
+    "stock_prices": [{"stock": "AAPL", "price": 150.12}],
+}
+
+
+async def _request(port, target, connection="close"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET {quote(target, safe='/?=&')} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def _run_with_server(scenario, settings=None, **kwargs):
+    async def runner():
+        user_settings = settings or {"user_currencies": ["USD"], "user_stocks": ["AAPL"]}
+        server = DashboardServer(TRANSACTIONS, user_settings, **kwargs)
+        asyncio_server = await server.start("127.0.0.1", 0)
+        port = asyncio_server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(server, port)
+        finally:
+            await server.close()
+
+    return asyncio.run(runner())
+
+
+@patch("src.server.get_market_data")
+def test_dashboard(mock_market):
+    """Тест главной страницы через HTTP"""
+    mock_market.return_value = MARKET_DATA
+
+    status, body = _run_with_server(lambda server, port: _request(port, "/dashboard?date=2021-10-30 15:12:30"))
+
+    assert status == 200
+    assert body["cards"] == [
+        {"last_digits": "5091", "total_spent": 250.0, "cashback": 2.5},
+        {"last_digits": "7197", "total_spent": 1000.0, "cashback": 10.0},
+    ]
+    assert [item["amount"] for item in body["top_transactions"]] == [-1000.0, -250.0]
+    assert body["currency_rates"] == MARKET_DATA["currency_rates"]
+    assert body["stock_prices"] == MARKET_DATA["stock_prices"]
+    assert "greeting" in body
+
+
+@patch("src.server.get_market_data")
+def test_dashboard_budgets(mock_market):
+    """Тест статуса бюджетов на главной странице и его обновления новыми операциями"""
+    mock_market.return_value = MARKET_DATA
+    settings = {"budgets": {"Супермаркеты": 1500, "Транспорт": 200}}
+
+    async def scenario(server, port):
+        _, before = await _request(port, "/dashboard?date=2021-10-30 15:12:30")
+        await server.add_transactions([dict(TRANSACTIONS[0], **{"Сумма платежа": -200.0, "Описание": "Лента"})])
+        _, after = await _request(port, "/dashboard?date=2021-10-30 15:12:30")
+        return before, after
+
+    before, after = _run_with_server(scenario, settings=settings)
+
+    assert before["budgets"] == [
+        {"category": "Супермаркеты", "budget": 1500.0, "spent": 1000.0, "remaining": 500.0, "used_percent": 66.7},
+        {"category": "Транспорт", "budget": 200.0, "spent": 250.0, "remaining": -50.0, "used_percent": 125.0},
+    ]
+    assert after["budgets"][0]["spent"] == 1200.0
+    assert after["cards"][1]["total_spent"] == 1200.0
+
+
+@patch("src.server.get_market_data")
+def test_concurrent_dashboards_share_market_data(mock_market):
+    """Тест что одновременные запросы получают курсы одним обновлением"""
+    mock_market.return_value = MARKET_DATA
+
+    async def scenario(server, port):
+        return await asyncio.gather(*(_request(port, "/dashboard?date=2021-10-30 15:12:30") for _ in range(20)))
+
+    responses = _run_with_server(scenario)
+
+    assert all(status == 200 for status, _ in responses)
+    mock_market.assert_called_once()
+
+
+def test_reload_publishes_new_snapshot():
+    """Тест что новая выписка публикуется новым снимком, а сервер отвечает по нему"""
+
+    async def scenario(server, port):
+        _, before = await _request(port, "/health")
+        await server.reload(TRANSACTIONS[:2])
+        _, after = await _request(port, "/health")
+        _, found = await _request(port, "/search?query=пятёрочка")
+        return before, after, found
+
+    before, after, found = _run_with_server(scenario)
+
+    assert before == {"status": "ok", "transactions": 4, "version": 1}
+    assert after == {"status": "ok", "transactions": 2, "version": 2}
+    assert found == []
+
+
+def test_add_transactions_does_not_block_requests():
+    """Тест что добавление операций не блокирует цикл событий, а одновременные добавления не теряются"""
+    started, release = threading.Event(), threading.Event()
+    extend = DatasetSnapshot.extend
+
+    def slow_extend(snapshot, transactions):
+        started.set()
+        release.wait(5)
+        return extend(snapshot, transactions)
+
+    async def scenario(server, port):
+        with patch.object(DatasetSnapshot, "extend", slow_extend):
+            updates = [
+                asyncio.ensure_future(server.add_transactions([dict(TRANSACTIONS[0], **{"Сумма платежа": -1.0})]))
+                for _ in range(3)
+            ]
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            _, during = await _request(port, "/health")
+            release.set()
+            await asyncio.gather(*updates)
+        _, after = await _request(port, "/health")
+        return during, after
+
+    during, after = _run_with_server(scenario)
+
+    assert during == {"status": "ok", "transactions": 4, "version": 1}
+    assert after == {"status": "ok", "transactions": 7, "version": 4}
+
+
+def test_card_history():
+    """Тест истории по картам через HTTP"""
+    status, body = _run_with_server(
+        lambda server, port: _request(port, "/cards/history?date=2021-10-30 15:12:30&months=3")
+    )
+
+    assert status == 200
+    assert [card["last_digits"] for card in body["cards"]] == ["5091", "7197"]
+    assert [(item["month"], item["spent"]) for item in body["cards"][1]["months"]] == [
+        ("2021-08", 300.0),
+        ("2021-09", 0.0),
+        ("2021-10", 1000.0),
+    ]
+
+
+def test_comparison_report():
+    """Тест сравнения трат с прошлым месяцем через HTTP"""
+    status, body = _run_with_server(
+        lambda server, port: _request(port, "/reports/comparison?date=2021-10-30 15:12:30&by=card")
+    )
+
+    assert status == 200
+    assert [(item["Номер карты"], item["spent"], item["baseline_spent"]) for item in body] == [
+        ("*7197", 1000.0, 0.0),
+        ("*5091", 250.0, 0.0),
+    ]
+
+
+def test_category_stats():
+    """Тест статистики трат по категориям через HTTP"""
+
+    async def scenario(server, port):
+        return await asyncio.gather(
+            _request(port, "/reports/category_stats?start=2021-08&end=2021-10"),
+            _request(port, "/reports/category_stats?start=2021-10&category=Транспорт"),
+            _request(port, "/reports/category_stats?start=2021-10&end=2021-08"),
+        )
+
+    (status, body), (_, transport), (bad_status, _) = _run_with_server(scenario)
+
+    assert status == 200
+    assert [(item["category"], item["transactions"], item["distinct_merchants"]) for item in body] == [
+        ("Супермаркеты", 2, 2),
+        ("Транспорт", 1, 1),
+    ]
+    assert transport[0]["median"] == pytest.approx(250.0, rel=0.01)
+    assert bad_status == 400
+
+
+def test_search():
+    """Тест поиска через HTTP"""
+    status, body = _run_with_server(lambda server, port: _request(port, "/search?query=магнит"))
+
+    assert status == 200
+    assert len(body) == 2
+    assert all(item["Описание"] == "Магнит" for item in body)
+
+
+def test_spending_report():
+    """Тест отчёта по категории через HTTP"""
+    target = "/reports/spending_by_category?category=Супермаркеты&date=2021-10-30 15:12:30"
+
+    status, body = _run_with_server(lambda server, port: _request(port, target))
+
+    assert status == 200
+    assert [item["Описание"] for item in body] == ["Пятёрочка", "Магнит", "Магнит"]
+
+
+@pytest.mark.parametrize(
+    "target,expected_status",
+    [
+        ("/unknown", 404),
+        ("/dashboard", 400),
+        ("/dashboard?date=bad", 400),
+        ("/search", 400),
+        ("/reports/spending_by_category?category=Еда&date=bad", 400),
+        ("/cards/history?date=2021-10-30 15:12:30&months=0", 400),
+        ("/reports/comparison?date=2021-10-30 15:12:30&by=merchant", 400),
+    ],
+)
+def test_bad_requests(target, expected_status):
+    """Тест ответов на некорректные запросы"""
+    status, body = _run_with_server(lambda server, port: _request(port, target))
+
+    assert status == expected_status
+    assert "error" in body
+
+
+def test_keep_alive_connection():
+    """Тест нескольких запросов в одном соединении"""
+
+    async def scenario(server, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        statuses = []
+        for _ in range(3):
+            writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            statuses.append(int((await reader.readline()).split()[1]))
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+        writer.close()
+        await writer.wait_closed()
+        return statuses
+
+    assert _run_with_server(scenario) == [200, 200, 200]
+
+
+def test_concurrency_limit():
+    """Тест что при исчерпании лимита сервер отвечает 503"""
+
+    async def scenario(server, port):
+        await server._semaphore.acquire()
+        return await _request(port, "/health")
+
+    status, body = _run_with_server(scenario, max_concurrency=1, queue_timeout=0.01)
+
+    assert status == 503
+    assert body == {"error": "Server is busy"}
+
+
+def test_metrics():
+    """Тест статистики объединения запросов котировок"""
+    status, body = _run_with_server(lambda server, port: _request(port, "/metrics"))
+
+    assert status == 200
+    assert set(body) == {"currency_rates", "stock_prices", "providers", "logging"}
+    assert "deduplicated" in body["stock_prices"]
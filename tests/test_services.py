@@ -1,7 +1,9 @@
 import json
 from unittest.mock import patch
 
-from src.services import simple_search
+import pandas as pd
+
+from src.services import recurring_payments, search_by_merchant, simple_search
 
 
 @patch("src.services.read_transactions_xlsx")
@@ -77,3 +79,30 @@ def test_case_insensitive_search(mock_read_xlsx):
     assert len(parsed1) == 1
     assert len(parsed2) == 1
     assert parsed1[0]["Описание"] == "Покупка в Магазине"
+
+
+@patch("src.services.read_transactions_xlsx")
+def test_recurring_payments(mock_read_xlsx):
+    """Тест поиска регулярных платежей"""
+    mock_read_xlsx.return_value = [
+        {"Дата платежа": date, "Описание": "Spotify", "Сумма платежа": -169.0}
+        for date in ["01.09.2021", "01.10.2021", "01.11.2021"]
+    ]
+
+    result = json.loads(recurring_payments("test.xlsx"))
+
+    assert [(item["description"], item["period"], item["next_date"]) for item in result] == [
+        ("Spotify", "monthly", "01.12.2021")
+    ]
+
+
+def test_search_by_merchant():
+    """Тест поиска по каноническому имени продавца"""
+    transactions = pd.DataFrame(
+        {"Описание": ["Магнит", "MAGNIT MM", "Пятёрочка"], "Сумма платежа": [-100.0, -50.0, -30.0]}
+    )
+
+    result = search_by_merchant("магнит", transactions)
+
+    assert [item["Описание"] for item in result] == ["Магнит", "MAGNIT MM"]
+    assert {item["Продавец"] for item in result} == {"Магнит"}
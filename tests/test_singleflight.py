@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from src.singleflight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as error:
+            errors[index] = error
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    """Тест что одновременные вызовы с одним ключом выполняются один раз"""
+    group = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"stock": "AAPL", "price": 150.12}
+
+    results, errors = _run_concurrently(10, lambda: group.do("AAPL", fetch))
+
+    assert len(calls) == 1
+    assert all(result == {"stock": "AAPL", "price": 150.12} for result in results)
+    assert errors == [None] * 10
+    assert group.stats() == {"calls": 10, "executed": 1, "deduplicated": 9, "in_flight": 0}
+
+
+def test_different_keys_are_not_merged():
+    """Тест что разные ключи выполняются независимо"""
+    group = SingleFlight()
+
+    assert group.do("USD", lambda: 73.21) == 73.21
+    assert group.do("EUR", lambda: 87.08) == 87.08
+    assert group.stats()["executed"] == 2
+    assert group.stats()["deduplicated"] == 0
+
+
+def test_sequential_calls_are_executed_again():
+    """Тест что после завершения вызова следующий выполняется заново"""
+    group = SingleFlight()
+    values = iter([1, 2])
+
+    assert group.do("USD", lambda: next(values)) == 1
+    assert group.do("USD", lambda: next(values)) == 2
+
+
+def test_error_is_shared_with_waiters():
+    """Тест что исключение получают все ожидающие вызовы"""
+    group = SingleFlight()
+
+    def fetch():
+        time.sleep(0.05)
+        raise ValueError("rate limit")
+
+    results, errors = _run_concurrently(5, lambda: group.do("AAPL", fetch))
+
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert group.stats()["in_flight"] == 0
+    with pytest.raises(KeyError):
+        group.do("AAPL", lambda: {}["missing"])
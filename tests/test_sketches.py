@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sketches import CategorySketches, HyperLogLog, QuantileSketch, hash_values
+
+TRANSACTIONS = [
+    {"Дата платежа": "20.10.2021", "Статус": "OK", "Сумма платежа": -100.0, "Категория": "Фастфуд", "Описание": "KFC"},
+    {
+        "Дата платежа": "21.10.2021",
+        "Статус": "OK",
+        "Сумма платежа": -300.0,
+        "Категория": "Фастфуд",
+        "Описание": "Бургер Кинг",
+    },
+    {"Дата платежа": "22.10.2021", "Статус": "OK", "Сумма платежа": -200.0, "Категория": "Фастфуд", "Описание": "KFC"},
+    {
+        "Дата платежа": "23.10.2021",
+        "Статус": "FAILED",
+        "Сумма платежа": -9000.0,
+        "Категория": "Фастфуд",
+        "Описание": "KFC",
+    },
+    {
+        "Дата платежа": "05.09.2021",
+        "Статус": "OK",
+        "Сумма платежа": -1000.0,
+        "Категория": "Фастфуд",
+        "Описание": "McDonald's",
+    },
+    {
+        "Дата платежа": "06.09.2021",
+        "Статус": "OK",
+        "Сумма платежа": 500.0,
+        "Категория": "Пополнения",
+        "Описание": "Перевод",
+    },
+]
+
+
+def test_quantile_sketch_relative_error():
+    """Тест что квантили скетча отличаются от точных не больше заданной относительной погрешности"""
+    values = np.random.default_rng(1).lognormal(6, 1.5, 20000)
+    sketch = QuantileSketch(0.01)
+    sketch.add(values)
+
+    for q in (0.1, 0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert sketch.count == len(values)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_quantile_sketch_merge():
+    """Тест что объединение скетчей совпадает со скетчем всех значений"""
+    values = np.random.default_rng(2).uniform(1, 1000, 1000)
+    left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    left.add(values[:400])
+    right.add(values[400:])
+    whole.add(values)
+
+    assert left.merge(right).buckets == whole.buckets
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(0.05))
+
+
+def test_hyperloglog_count_and_merge():
+    """Тест оценки числа различных значений и объединения скетчей"""
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add(f"merchant {i}" for i in range(6000))
+    right.add(f"merchant {i}" for i in range(4000, 10000))
+
+    assert left.count() == pytest.approx(6000, rel=0.05)
+    assert left.merge(right).count() == pytest.approx(10000, rel=0.05)
+
+    small = HyperLogLog()
+    small.add(["KFC", "KFC", "Магнит"])
+    assert small.count() == 2
+    with pytest.raises(ValueError):
+        small.merge(HyperLogLog(14))
+
+
+def test_category_stats_for_period():
+    """Тест статистики по категориям за период объединением месячных скетчей"""
+    sketches = CategorySketches.from_transactions(TRANSACTIONS)
+
+    october = sketches.stats("2021-10", "2021-10")
+    autumn = sketches.stats("2021-09", "2021-10")
+
+    assert [item["category"] for item in october] == ["Фастфуд"]
+    assert october[0]["transactions"] == 3
+    assert october[0]["median"] == pytest.approx(200.0, rel=0.01)
+    assert october[0]["p95"] == pytest.approx(200.0, rel=0.01)
+    assert october[0]["distinct_merchants"] == 2
+    assert autumn[0]["transactions"] == 4
+    assert autumn[0]["distinct_merchants"] == 3
+    assert sketches.stats("2021-01", "2021-08") == []
+
+
+def test_category_sketches_incremental_add():
+    """Тест что дополнение скетчей новыми операциями совпадает с построением по всем операциям"""
+    whole = CategorySketches.from_transactions(TRANSACTIONS)
+    partial = CategorySketches.from_transactions(TRANSACTIONS[:2])
+
+    extended = partial.copy()
+    extended.add(TRANSACTIONS[2:])
+
+    assert extended.stats("2021-01", "2021-12") == whole.stats("2021-01", "2021-12")
+    assert partial.stats("2021-01", "2021-12")[0]["transactions"] == 2
+
+
+def test_category_sketches_hash_only_used_merchants():
+    """Тест что хэшируются только продавцы учитываемых трат, а не весь словарь столбца продавцов"""
+    frame = pd.DataFrame(TRANSACTIONS)
+    merchants = [f"Продавец {i}" for i in range(1000)] + ["KFC", "Бургер Кинг", "McDonald's", "Перевод"]
+    frame["Продавец"] = pd.Categorical(frame["Описание"], categories=merchants)
+    hashed = []
+
+    def record(values):
+        values = list(values)
+        hashed.extend(values)
+        return hash_values(values)
+
+    with patch("src.sketches.hash_values", side_effect=record):
+        sketches = CategorySketches.from_transactions(frame)
+
+    assert hashed == ["KFC", "Бургер Кинг", "McDonald's"]
+    assert sketches.stats("2021-09", "2021-10")[0]["distinct_merchants"] == 3
@@ -0,0 +1,142 @@
+import threading
+import weakref
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.snapshot import DatasetSnapshot, SnapshotStore
+
+TRANSACTIONS = [
+    {
+        "Дата платежа": "20.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -1000.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Магнит",
+    },
+    {
+        "Дата платежа": "05.10.2021",
+        "Номер карты": "*5091",
+        "Статус": "OK",
+        "Сумма платежа": -250.0,
+        "Категория": "Транспорт",
+        "Описание": "Такси",
+    },
+    {
+        "Дата платежа": "01.09.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -300.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Пятёрочка",
+    },
+]
+
+
+def test_snapshot_is_immutable():
+    """Тест что поля снимка нельзя изменить"""
+    snapshot = DatasetSnapshot(TRANSACTIONS)
+
+    with pytest.raises(AttributeError):
+        snapshot.transactions = []
+
+    assert len(snapshot.sorted_transactions) == 3
+    assert snapshot.budgets.spent("2021-10", "Супермаркеты") == 1000.0
+
+
+def test_extend_builds_new_snapshot():
+    """Тест что новые операции дают новый снимок, а прежний не меняется"""
+    snapshot = DatasetSnapshot(TRANSACTIONS)
+    before = snapshot.summary(date(2021, 10, 1), date(2021, 10, 31))
+
+    extended = snapshot.extend([dict(TRANSACTIONS[0], **{"Сумма платежа": -200.0})])
+
+    assert (snapshot.version, extended.version) == (1, 2)
+    assert snapshot.budgets.spent("2021-10", "Супермаркеты") == 1000.0
+    assert extended.budgets.spent("2021-10", "Супермаркеты") == 1200.0
+    assert snapshot.summary(date(2021, 10, 1), date(2021, 10, 31)) == before
+    assert extended.summary(date(2021, 10, 1), date(2021, 10, 31))["cards"][1]["total_spent"] == 1200.0
+    assert len(extended.card_history.cards) == 2
+    assert snapshot.sketches.stats("2021-10", "2021-10")[0]["transactions"] == 1
+    assert extended.sketches.stats("2021-10", "2021-10")[0]["transactions"] == 2
+    assert snapshot.replace(TRANSACTIONS[:1]).budgets.applied == 1
+
+
+def test_extend_matches_full_rebuild():
+    """Тест что дополненные индексы снимка совпадают с построенными по всем операциям заново"""
+    rules = [{"percent": 10, "categories": ["Супермаркеты"], "monthly_cap": 60}]
+    added = [
+        dict(TRANSACTIONS[2], **{"Дата платежа": "15.09.2021", "Сумма платежа": -500.0}),
+        dict(TRANSACTIONS[1], **{"Дата платежа": "03.11.2021", "Номер карты": "*4556", "Категория": "Аптеки"}),
+        dict(TRANSACTIONS[0], **{"Статус": "FAILED"}),
+    ]
+    snapshot = DatasetSnapshot(TRANSACTIONS, rules)
+
+    extended = snapshot.extend(added)
+    rebuilt = DatasetSnapshot(TRANSACTIONS + added, rules)
+
+    pd.testing.assert_frame_equal(extended.sorted_transactions, rebuilt.sorted_transactions)
+    np.testing.assert_array_equal(extended.payment_dates, rebuilt.payment_dates)
+    assert extended.card_history.history("2021-11", 3) == rebuilt.card_history.history("2021-11", 3)
+    assert extended.card_history.card("*7197", "2021-09", 1)[0]["cashback"] == 60.0
+    for by in ("category", "card"):
+        for month in ("2021-09", "2021-10", "2021-11"):
+            pd.testing.assert_frame_equal(
+                extended.aggregates.compare(by, month), rebuilt.aggregates.compare(by, month)
+            )
+
+
+def test_extend_copies_added_records():
+    """Тест что снимок хранит копии добавленных операций"""
+    record = dict(TRANSACTIONS[0])
+    extended = DatasetSnapshot(TRANSACTIONS).extend([record])
+
+    record["Сумма платежа"] = -5000.0
+
+    assert extended.transactions[-1]["Сумма платежа"] == -1000.0
+    assert extended.transactions[:3] == TRANSACTIONS
+
+
+def test_old_snapshot_is_freed_after_swap():
+    """Тест что прежний снимок освобождается, когда его не держит ни один читатель"""
+    store = SnapshotStore(DatasetSnapshot(TRANSACTIONS))
+    reader = store.current
+    reader.summary(date(2021, 10, 1), date(2021, 10, 31))
+    old = weakref.ref(reader)
+
+    store.update(lambda snapshot: snapshot.replace(TRANSACTIONS[:2]))
+
+    assert old() is reader
+    del reader
+    assert old() is None
+    assert store.current.version == 2
+
+
+def test_readers_see_complete_snapshots():
+    """Тест что во время публикаций читатели видят только целиком собранные снимки"""
+    store = SnapshotStore(DatasetSnapshot(TRANSACTIONS))
+    stop = threading.Event()
+    inconsistent = []
+
+    def read():
+        while not stop.is_set():
+            snapshot = store.current
+            sizes = {len(snapshot.transactions), len(snapshot.sorted_transactions), snapshot.budgets.applied}
+            if len(sizes) != 1:
+                inconsistent.append(snapshot.version)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for _ in range(5):
+        store.update(lambda snapshot: snapshot.extend(TRANSACTIONS[:1]))
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert inconsistent == []
+    assert store.current.version == 6
+    assert len(store.current.transactions) == 8
@@ -0,0 +1,221 @@
+from datetime import date, datetime, timezone
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from src.quota import RateLimited
+from src.stock_history import (_fetch_daily, append_price_history, last_session_day, load_price_history,
+                               missing_trading_days, price_path, read_price_range, save_price_history,
+                               update_price_history)
+
+TRADING_DAYS = pd.bdate_range("2021-01-04", "2021-10-29")
+
+
+def _daily_response(*args, **kwargs):
+    """Ответ TIME_SERIES_DAILY: compact - последние 100 торговых дней, full - вся история"""
+    params = kwargs["params"]
+    days = TRADING_DAYS[-100:] if params["outputsize"] == "compact" else TRADING_DAYS
+    response = Mock()
+    response.json.return_value = {
+        "Meta Data": {"2. Symbol": params["symbol"]},
+        "Time Series (Daily)": {
+            day.strftime("%Y-%m-%d"): {
+                "1. open": "10.0",
+                "2. high": "12.0",
+                "3. low": "9.0",
+                "4. close": f"{10 + day.dayofyear / 100:.2f}",
+                "5. volume": "1000",
+            }
+            for day in days
+        },
+    }
+    return response
+
+
+def test_missing_trading_days():
+    """Тест подсчёта рабочих дней после последней известной даты"""
+    assert missing_trading_days(None, date(2021, 10, 29)) is None
+    assert missing_trading_days(date(2021, 10, 29), date(2021, 10, 31)) == 0
+    assert missing_trading_days(date(2021, 10, 22), date(2021, 10, 29)) == 5
+
+
+def test_missing_trading_days_skips_exchange_holidays():
+    """Тест что праздники биржи не считаются торговыми днями"""
+    assert missing_trading_days(date(2021, 7, 2), date(2021, 7, 5)) == 0
+    assert missing_trading_days(date(2021, 7, 1), date(2021, 7, 6)) == 2
+    assert missing_trading_days(date(2021, 11, 24), date(2021, 11, 25)) == 0
+    assert missing_trading_days(date(2021, 12, 23), date(2021, 12, 27)) == 1
+    assert missing_trading_days(date(2022, 4, 14), date(2022, 4, 15)) == 0
+
+
+def test_last_session_day():
+    """Тест что текущий день считается завершённым только после закрытия биржи"""
+    assert last_session_day(datetime(2021, 10, 29, 15, 59)) == date(2021, 10, 28)
+    assert last_session_day(datetime(2021, 10, 29, 16, 0)) == date(2021, 10, 29)
+    assert last_session_day(datetime(2021, 10, 29, 18, 0, tzinfo=timezone.utc)) == date(2021, 10, 28)
+    assert last_session_day(datetime(2021, 10, 30, 1, 0, tzinfo=timezone.utc)) == date(2021, 10, 29)
+
+
+@patch("src.stock_history.last_session_day", return_value=date(2021, 10, 28))
+@patch("src.stock_history.requests.get")
+def test_update_price_history_no_request_before_close(mock_get, mock_session_day, tmp_path):
+    """Тест что до закрытия биржи сегодняшний день не запрашивается"""
+    directory = str(tmp_path)
+    save_price_history(
+        "AAPL",
+        pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2021-10-28"]),
+                "open": [1.0],
+                "high": [1.0],
+                "low": [1.0],
+                "close": [1.0],
+                "volume": [1],
+            }
+        ),
+        directory,
+    )
+
+    assert update_price_history(["AAPL"], directory=directory) == {"AAPL": 0}
+    mock_get.assert_not_called()
+
+
+@patch("src.stock_history.requests.get")
+def test_update_price_history_no_request_on_holiday(mock_get, tmp_path):
+    """Тест что в праздник биржи после последнего торгового дня провайдер не запрашивается"""
+    directory = str(tmp_path)
+    save_price_history(
+        "AAPL",
+        pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2021-07-02"]),
+                "open": [1.0],
+                "high": [1.0],
+                "low": [1.0],
+                "close": [1.0],
+                "volume": [1],
+            }
+        ),
+        directory,
+    )
+
+    assert update_price_history(["AAPL"], date(2021, 7, 5), directory) == {"AAPL": 0}
+    mock_get.assert_not_called()
+
+
+def test_append_price_history_replaces_file_atomically(tmp_path):
+    """Тест что при ошибке дописывания файл цен остаётся прежним"""
+    directory = str(tmp_path)
+    table = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2021-10-28"]),
+            "open": [1.0],
+            "high": [1.0],
+            "low": [1.0],
+            "close": [1.0],
+            "volume": [1],
+        }
+    )
+    save_price_history("AAPL", table, directory)
+    rows = table.assign(date=pd.to_datetime(["2021-10-29"]))
+
+    def write_partially(self, path, **kwargs):
+        with open(path, "a", encoding="utf-8") as file:
+            file.write("2021-10-29,1.0")
+        raise OSError("disk full")
+
+    with patch("pandas.DataFrame.to_csv", write_partially):
+        with pytest.raises(OSError):
+            append_price_history("AAPL", rows, directory)
+    pd.testing.assert_frame_equal(load_price_history("AAPL", directory), table)
+
+    append_price_history("AAPL", rows, directory)
+    assert load_price_history("AAPL", directory)["date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2021-10-28",
+        "2021-10-29",
+    ]
+
+
+@patch("src.stock_history.requests.get")
+def test_update_price_history_backfills_then_fetches_tail(mock_get, tmp_path):
+    """Тест что история загружается целиком один раз, дальше - только недостающий хвост запросом compact"""
+    directory = str(tmp_path)
+    mock_get.side_effect = _daily_response
+
+    added = update_price_history(["aapl"], date(2021, 10, 29), directory)
+
+    assert added == {"AAPL": len(TRADING_DAYS)}
+    assert mock_get.call_args[1]["params"]["outputsize"] == "full"
+    table = load_price_history("AAPL", directory)
+    save_price_history("AAPL", table[table["date"] <= "2021-10-22"], directory)
+
+    mock_get.reset_mock()
+    added = update_price_history(["AAPL"], date(2021, 10, 31), directory)
+
+    assert added == {"AAPL": 5}
+    assert mock_get.call_args[1]["params"]["outputsize"] == "compact"
+    pd.testing.assert_frame_equal(load_price_history("AAPL", directory), table)
+
+    mock_get.reset_mock()
+    assert update_price_history(["AAPL"], date(2021, 10, 31), directory) == {"AAPL": 0}
+    mock_get.assert_not_called()
+
+
+@patch("src.stock_history.requests.get")
+def test_update_price_history_long_gap_uses_full(mock_get, tmp_path):
+    """Тест что при пропуске длиннее ответа compact запрашивается вся история"""
+    directory = str(tmp_path)
+    mock_get.side_effect = _daily_response
+    update_price_history(["TSLA"], date(2021, 10, 29), directory)
+    table = load_price_history("TSLA", directory)
+    save_price_history("TSLA", table.iloc[:10], directory)
+
+    added = update_price_history(["TSLA"], date(2021, 10, 29), directory)
+
+    assert added == {"TSLA": len(TRADING_DAYS) - 10}
+    assert mock_get.call_args[1]["params"]["outputsize"] == "full"
+    assert len(load_price_history("TSLA", directory)) == len(TRADING_DAYS)
+
+
+@patch("src.stock_history.requests.get")
+def test_read_price_range_reads_from_disk(mock_get, tmp_path):
+    """Тест что цены за период читаются из хранилища без запросов к провайдеру"""
+    directory = str(tmp_path)
+    mock_get.side_effect = _daily_response
+    update_price_history(["GOOGL"], date(2021, 10, 29), directory)
+    mock_get.reset_mock()
+
+    prices = read_price_range("GOOGL", date(2021, 10, 23), date(2021, 10, 27), directory)
+
+    mock_get.assert_not_called()
+    assert list(prices["date"].dt.strftime("%Y-%m-%d")) == ["2021-10-25", "2021-10-26", "2021-10-27"]
+    assert read_price_range("AMZN", directory=directory).empty
+
+
+@patch("src.stock_history.requests.get")
+def test_update_price_history_skips_failed_symbol(mock_get, tmp_path):
+    """Тест что ошибка провайдера по одной акции не прерывает обновление остальных"""
+    directory = str(tmp_path)
+    broken = Mock()
+    broken.json.return_value = {"Error Message": "Invalid API call"}
+    mock_get.side_effect = lambda *args, **kwargs: (
+        broken if kwargs["params"]["symbol"] == "XXXX" else _daily_response(*args, **kwargs)
+    )
+
+    added = update_price_history(["XXXX", "AAPL"], date(2021, 10, 29), directory)
+
+    assert added == {"AAPL": len(TRADING_DAYS)}
+    assert not (tmp_path / "XXXX.csv").exists()
+    assert price_path("aapl", directory).endswith("AAPL.csv")
+
+
+@patch("src.stock_history.requests.get")
+def test_fetch_daily_rate_limit(mock_get):
+    """Тест что ответ о превышении лимита приводит к RateLimited"""
+    mock_get.return_value.json.return_value = {"Information": "Our standard API rate limit is 25 requests per day."}
+
+    with pytest.raises(RateLimited) as error:
+        _fetch_daily("AAPL", "compact")
+
+    assert error.value.daily
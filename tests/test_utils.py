@@ -1,12 +1,16 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 
 import pandas as pd
 import pytest
+import requests
 
+from src.quota import ProviderScheduler
 from src.utils import (filter_by_date, filter_by_state, get_card_infos, get_cashback, get_current_exchange_rate,
-                       get_date, get_greeting, get_last_four, get_stock, get_top_transactions, load_json_data,
-                       read_transactions_xlsx)
+                       get_date, get_greeting, get_last_four, get_market_data_metrics, get_stock, get_top_transactions,
+                       load_json_data, parse_payment_dates, read_transactions_xlsx)
 
 
 @pytest.mark.parametrize(
@@ -606,3 +610,141 @@ def test_boundary_dates():
     result = filter_by_date(data, "02.01.2023", "30.01.2023")
     assert len(result) == 1
     assert result[0]["Сумма"] == 200
+
+
+def test_filter_by_date_skips_missing_dates():
+    """Тест что операции без даты платежа пропускаются"""
+    data = [
+        {"Дата платежа": float("nan"), "Сумма": 100},
+        {"Дата платежа": "", "Сумма": 200},
+        {"Дата платежа": "15.01.2023", "Сумма": 300},
+    ]
+
+    assert filter_by_date(data, "01.01.2023", "31.01.2023") == [{"Дата платежа": "15.01.2023", "Сумма": 300}]
+
+
+@patch("src.utils.pd.read_excel")
+def test_read_transactions_xlsx_validate(mock_read_excel, tmp_path):
+    """Тест что при validate=True строки с ошибками схемы отбрасываются"""
+    test_file = tmp_path / "test.xlsx"
+    test_file.write_text("dummy")
+    mock_read_excel.return_value = pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Дата платежа": ["31.12.2021", None],
+            "Номер карты": ["*7197", "*7197"],
+            "Статус": ["OK", "OK"],
+            "Сумма платежа": [-160.89, -10.0],
+            "Валюта платежа": ["RUB", "RUB"],
+            "Категория": ["Супермаркеты", "Супермаркеты"],
+            "Описание": ["Колхоз", "Колхоз"],
+        }
+    )
+
+    result = read_transactions_xlsx(str(test_file), validate=True)
+
+    assert len(result) == 1
+    assert result[0]["Дата платежа"] == "31.12.2021"
+
+
+def test_parse_payment_dates():
+    """Тест векторного разбора дат платежа"""
+    dates = pd.Series(["01.01.2023", " 31.12.2021 ", None, "bad"])
+
+    result = parse_payment_dates(dates)
+
+    assert result.iloc[0] == pd.Timestamp(2023, 1, 1)
+    assert result.iloc[1] == pd.Timestamp(2021, 12, 31)
+    assert result.iloc[2:].isna().all()
+
+
+@patch("src.utils.requests.get")
+def test_get_stock_concurrent_requests_are_coalesced(mock_get):
+    """Тест что одновременные запросы одной акции объединяются в один вызов API"""
+
+    def slow_response(*args, **kwargs):
+        time.sleep(0.05)
+        mock_response = Mock()
+        mock_response.json.return_value = {"Global Quote": {"05. price": "150.1200"}}
+        return mock_response
+
+    mock_get.side_effect = slow_response
+    before = get_market_data_metrics()["stock_prices"]["deduplicated"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: get_stock(["AAPL"]), range(8)))
+
+    assert all(result == [{"stock": "AAPL", "price": 150.12}] for result in results)
+    assert mock_get.call_count == 1
+    assert get_market_data_metrics()["stock_prices"]["deduplicated"] - before == 7
+
+
+@patch("src.utils.requests.get")
+def test_get_stock_rate_limited_returns_raw_error(mock_get):
+    """Тест что при превышении лимита возвращается исходный ответ Alpha Vantage после повторов"""
+    mock_response = Mock()
+    mock_response.json.return_value = {"Note": "API call frequency is 5 calls per minute"}
+    mock_get.return_value = mock_response
+    scheduler = ProviderScheduler("alpha_vantage", per_minute=600, max_retries=2, sleep=lambda delay: None)
+
+    with patch.dict("src.utils.MARKET_SCHEDULERS", {"alpha_vantage": scheduler}):
+        result = get_stock(["AAPL"])
+
+    assert result == [{"Note": "API call frequency is 5 calls per minute"}]
+    assert mock_get.call_count == 3
+
+
+@patch("src.utils.requests.get")
+def test_get_stock_daily_quota_exhausted(mock_get):
+    """Тест что при исчерпанной суточной квоте запрос к API не отправляется"""
+    scheduler = ProviderScheduler("alpha_vantage", per_minute=5, per_day=0)
+
+    with patch.dict("src.utils.MARKET_SCHEDULERS", {"alpha_vantage": scheduler}):
+        result = get_stock(["AAPL"])
+
+    assert "daily quota" in result[0]["Information"]
+    mock_get.assert_not_called()
+
+
+def test_get_card_infos_with_cashback_rules():
+    """Тест расчёта кешбэка по правилам"""
+    transactions = [
+        {"Номер карты": "*7197", "Сумма платежа": -1000.0, "Категория": "Супермаркеты", "MCC": 5411.0},
+        {"Номер карты": "*7197", "Сумма платежа": -500.0, "Категория": "Аптеки", "MCC": 5912.0},
+        {"Номер карты": "*5091", "Сумма платежа": 300.0, "Категория": "Пополнения", "MCC": None},
+    ]
+    rules = [{"percent": 5, "mcc": [5411]}]
+
+    result = get_card_infos(transactions, rules)
+
+    assert result == [{"last_digits": "7197", "total_spent": 1500.0, "cashback": 55.0}]
+
+
+@patch("src.utils.requests.get")
+def test_get_current_exchange_rate_quota_exceeded(mock_get):
+    """Тест что исчерпанная квота apilayer не прерывает получение курсов"""
+    scheduler = ProviderScheduler("apilayer", per_minute=60, per_day=0)
+
+    with patch.dict("src.utils.MARKET_SCHEDULERS", {"apilayer": scheduler}):
+        result = get_current_exchange_rate(["USD"])
+
+    mock_get.assert_not_called()
+    assert result[0]["currency"] == "USD"
+    assert "quota" in result[0]["Information"]
+
+
+@pytest.mark.parametrize("status", [429, 503])
+@patch("src.utils.requests.get")
+def test_get_current_exchange_rate_degrades_after_retries(mock_get, status):
+    """Тест что лимит запросов и ошибка сервера apilayer после повторов дают описание ошибки вместо исключения"""
+    response = Mock(status_code=status)
+    response.json.return_value = {"message": "error"}
+    response.raise_for_status.side_effect = requests.HTTPError(f"{status} Server Error")
+    mock_get.return_value = response
+    scheduler = ProviderScheduler("apilayer", None, sleep=lambda delay: None)
+
+    with patch.dict("src.utils.MARKET_SCHEDULERS", {"apilayer": scheduler}):
+        result = get_current_exchange_rate(["USD", "EUR"])
+
+    assert [item["currency"] for item in result] == ["USD", "EUR"]
+    assert all("Information" in item for item in result)
@@ -1,9 +1,20 @@
 import json
+import os
+import threading
+import time
 from unittest.mock import Mock, patch
 
-from src.views import main_page
+import pandas as pd
+import pytest
+import requests
 
+from src.budgets import BudgetLedger
+from src.dashboard_cache import DashboardCache
+from src.singleflight import SingleFlight
+from src.views import budget_ledger, card_history_page, main_page, main_page_batch, spending_aggregates
 
+
+@patch("src.views.DASHBOARD_CACHE", DashboardCache())
 @patch("src.views.datetime")
 @patch("src.views.get_date")
 @patch("src.views.read_transactions_xlsx")
@@ -74,6 +85,7 @@ def test_main_page_returns_json_string(
     assert "stock_prices" in parsed_result
 
 
+@patch("src.views.DASHBOARD_CACHE", DashboardCache())
 @patch("src.views.datetime")
 @patch("src.views.get_date")
 @patch("src.views.read_transactions_xlsx")
@@ -132,3 +144,255 @@ def test_json_structure_and_content(
     assert parsed_result["cards"][0]["last_digits"] == "5678"
     assert parsed_result["currency_rates"][0]["currency"] == "USD"
     assert parsed_result["stock_prices"][0]["stock"] == "AAPL"
+
+
+USER_TRANSACTIONS = [
+    {
+        "Дата платежа": "20.10.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -1000.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Магнит",
+        "MCC": 5411.0,
+    },
+    {
+        "Дата платежа": "20.09.2021",
+        "Номер карты": "*7197",
+        "Статус": "OK",
+        "Сумма платежа": -300.0,
+        "Категория": "Супермаркеты",
+        "Описание": "Магнит",
+        "MCC": 5411.0,
+    },
+]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@patch("src.views.get_stock")
+@patch("src.views.get_current_exchange_rate")
+def test_main_page_batch_fetches_each_symbol_once(mock_get_exchange_rate, mock_get_stock, workers):
+    """Тест что курсы и цены загружаются один раз на символ для всех пользователей"""
+    mock_get_exchange_rate.side_effect = lambda codes: [{"currency": codes[0], "rate": 70.0}]
+    mock_get_stock.side_effect = lambda stocks: [{"stock": stocks[0], "price": 100.0}]
+    users = [
+        ({"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL"]}, USER_TRANSACTIONS),
+        ({"user_currencies": ["USD"], "user_stocks": ["AAPL", "TSLA"], "cashback_rules": [{"percent": 5}]}, []),
+        ({"user_currencies": ["EUR"], "user_stocks": []}, USER_TRANSACTIONS[1:]),
+    ]
+
+    result = [json.loads(page) for page in main_page_batch("2021-10-30 15:12:30", users, workers=workers)]
+
+    assert sorted(call.args[0][0] for call in mock_get_exchange_rate.call_args_list) == ["EUR", "USD"]
+    assert sorted(call.args[0][0] for call in mock_get_stock.call_args_list) == ["AAPL", "TSLA"]
+    assert [rate["currency"] for rate in result[0]["currency_rates"]] == ["USD", "EUR"]
+    assert [stock["stock"] for stock in result[1]["stock_prices"]] == ["AAPL", "TSLA"]
+    assert result[0]["cards"] == [{"last_digits": "7197", "total_spent": 1000.0, "cashback": 10.0}]
+    assert result[1]["cards"] == []
+    assert result[2]["top_transactions"] == []
+    assert result[2]["stock_prices"] == []
+
+
+def test_main_page_batch_empty():
+    """Тест пакетного режима без пользователей"""
+    assert main_page_batch("2021-10-30 15:12:30", []) == []
+
+
+@patch("src.views.get_stock", return_value=[])
+@patch("src.views.get_current_exchange_rate", return_value=[])
+@patch("src.views.load_rate_table")
+def test_main_page_batch_converts_to_rub(mock_rates, mock_get_exchange_rate, mock_get_stock):
+    """Тест что пакетный режим пересчитывает суммы в рубли, как главная страница"""
+    mock_rates.return_value = pd.DataFrame(
+        {"date": pd.to_datetime(["2021-10-01"]), "currency": ["CNY"], "rate": [11.0]}
+    )
+    transactions = [dict(USER_TRANSACTIONS[0], **{"Сумма платежа": -100.0, "Валюта платежа": "CNY"})]
+
+    result = json.loads(main_page_batch("2021-10-30 15:12:30", [({}, transactions)], workers=1)[0])
+
+    assert result["cards"] == [{"last_digits": "7197", "total_spent": 1100.0, "cashback": 11.0}]
+
+
+@patch("src.views.get_stock")
+@patch("src.views.get_current_exchange_rate")
+def test_main_page_batch_degrades_per_symbol(mock_get_exchange_rate, mock_get_stock):
+    """Тест что ошибка загрузки одного символа не прерывает пакет"""
+
+    def get_exchange_rate(codes):
+        if codes[0] == "EUR":
+            raise requests.ConnectionError("connection refused")
+        return [{"currency": codes[0], "rate": 70.0}]
+
+    mock_get_exchange_rate.side_effect = get_exchange_rate
+    mock_get_stock.side_effect = lambda stocks: [{"stock": stocks[0], "price": 100.0}]
+    users = [({"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL"]}, USER_TRANSACTIONS)]
+
+    result = json.loads(main_page_batch("2021-10-30 15:12:30", users, workers=1)[0])
+
+    assert result["currency_rates"] == [
+        {"currency": "USD", "rate": 70.0},
+        {"currency": "EUR", "Information": "connection refused"},
+    ]
+    assert result["stock_prices"] == [{"stock": "AAPL", "price": 100.0}]
+
+
+@patch("src.views.DASHBOARD_CACHE", DashboardCache())
+@patch("src.views.get_stock", return_value=[])
+@patch("src.views.get_current_exchange_rate", return_value=[])
+@patch("src.views.read_transactions_xlsx")
+def test_main_page_caches_summary_until_statement_changes(mock_read, mock_rates, mock_stock, tmp_path):
+    """Тест что сводка берётся из кэша, пока не изменился файл выписки"""
+    statement = tmp_path / "operations.xlsx"
+    statement.write_bytes(b"statement")
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({"user_currencies": [], "user_stocks": []}), encoding="utf-8")
+    mock_read.return_value = []
+
+    first = main_page("2021-01-20 15:25:13", str(statement), str(settings))
+    second = main_page("2021-01-20 15:25:13", str(statement), str(settings))
+
+    assert mock_read.call_count == 1
+    assert json.loads(first)["cards"] == json.loads(second)["cards"] == []
+
+    statement.write_bytes(b"new statement")
+    main_page("2021-01-20 15:25:13", str(statement), str(settings))
+
+    assert mock_read.call_count == 2
+
+
+@patch("src.views.DASHBOARD_CACHE", DashboardCache())
+@patch("src.views.BUDGET_LEDGERS", {})
+@patch("src.views.get_stock", return_value=[])
+@patch("src.views.get_current_exchange_rate", return_value=[])
+@patch("src.views.read_transactions_xlsx")
+def test_main_page_budgets(mock_read, mock_rates, mock_stock, tmp_path):
+    """Тест статуса бюджетов на главной странице после дополнения выписки"""
+    statement = tmp_path / "operations.xlsx"
+    statement.write_bytes(b"statement")
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({"budgets": {"Супермаркеты": 1500}}), encoding="utf-8")
+    mock_read.return_value = USER_TRANSACTIONS
+
+    first = json.loads(main_page("2021-10-30 15:12:30", str(statement), str(settings)))
+
+    statement.write_bytes(b"new statement")
+    mock_read.return_value = USER_TRANSACTIONS + [dict(USER_TRANSACTIONS[0], **{"Сумма платежа": -600.0})]
+    with patch("src.views.BudgetLedger.append", autospec=True, side_effect=BudgetLedger.append) as mock_append:
+        second = json.loads(main_page("2021-10-30 15:12:30", str(statement), str(settings)))
+
+    assert mock_read.call_count == 2
+    assert [len(call.args[1]) for call in mock_append.call_args_list] == [1]
+    assert [(item["spent"], item["remaining"]) for item in first["budgets"]] == [(1000.0, 500.0)]
+    assert [(item["spent"], item["remaining"]) for item in second["budgets"]] == [(1600.0, -100.0)]
+
+
+@patch("src.views.DASHBOARD_CACHE", DashboardCache())
+@patch("src.views.BUDGET_LEDGERS", {})
+@patch("src.views.get_stock", return_value=[])
+@patch("src.views.get_current_exchange_rate", return_value=[])
+@patch("src.views.read_transactions_xlsx", return_value=USER_TRANSACTIONS)
+def test_main_page_budgets_without_rereading_statement(mock_read, mock_rates, mock_stock, tmp_path):
+    """Тест что статус бюджетов для неизменной выписки считается по журналу без чтения файла"""
+    statement = tmp_path / "operations.xlsx"
+    statement.write_bytes(b"statement")
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({"budgets": {"Супермаркеты": 1500}}), encoding="utf-8")
+
+    main_page("2021-10-30 15:12:30", str(statement), str(settings))
+    settings.write_text(json.dumps({"budgets": {"Супермаркеты": 2000}}), encoding="utf-8")
+    result = json.loads(main_page("2021-10-30 15:12:30", str(statement), str(settings)))
+    september = json.loads(main_page("2021-09-30 15:12:30", str(statement), str(settings)))
+
+    assert mock_read.call_count == 2
+    assert [(item["spent"], item["remaining"]) for item in result["budgets"]] == [(1000.0, 1000.0)]
+    assert [item["spent"] for item in september["budgets"]] == [300.0]
+
+
+@patch("src.views.BUDGET_LEDGER_FLIGHTS", new_callable=SingleFlight)
+@patch("src.views.BUDGET_LEDGERS", {})
+def test_budget_ledger_concurrent_builds_read_statement_once(mock_flights, tmp_path):
+    """Тест что одновременные сборки журнала бюджетов читают выписку один раз"""
+    release = threading.Event()
+    reads = []
+
+    def read_statement():
+        reads.append(1)
+        release.wait(5)
+        return USER_TRANSACTIONS
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(budget_ledger(str(tmp_path / "operations.xlsx"), "v1", read_statement))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    while mock_flights.calls < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(reads) == 1
+    assert mock_flights.deduplicated == 3
+    assert len({id(ledger) for ledger in results}) == 1
+    assert results[0].spent("2021-10", "Супермаркеты") == 1000.0
+
+
+@patch("src.views.CARD_HISTORY_CACHE", DashboardCache())
+@patch("src.views.read_transactions_xlsx", return_value=USER_TRANSACTIONS)
+def test_card_history_page_reads_statement_once(mock_read, tmp_path):
+    """Тест что матрица по картам строится один раз для версии выписки"""
+    statement = tmp_path / "operations.xlsx"
+    statement.write_bytes(b"statement")
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({}), encoding="utf-8")
+
+    first = json.loads(card_history_page("2021-10-30 15:12:30", 2, str(statement), str(settings)))
+    second = json.loads(card_history_page("2021-10-30 15:12:30", 1, str(statement), str(settings)))
+
+    assert mock_read.call_count == 1
+    assert [item["spent"] for item in first["cards"][0]["months"]] == [300.0, 1000.0]
+    assert second["cards"][0]["months"] == first["cards"][0]["months"][1:]
+
+
+@patch("src.views.CARD_HISTORY_CACHE", DashboardCache())
+@patch("src.views.read_transactions_xlsx")
+def test_card_history_page_keeps_statements_apart(mock_read, tmp_path):
+    """Тест что матрицы разных выписок с одинаковой версией не совпадают и не вытесняют друг друга"""
+    first, second = tmp_path / "first.xlsx", tmp_path / "second.xlsx"
+    for statement in (first, second):
+        statement.write_bytes(b"statement")
+        os.utime(statement, ns=(1, 1))
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({}), encoding="utf-8")
+    mock_read.side_effect = lambda path, **kwargs: USER_TRANSACTIONS if path == str(first) else USER_TRANSACTIONS[1:]
+
+    pages = [
+        json.loads(card_history_page("2021-10-30 15:12:30", 2, str(path), str(settings)))
+        for path in (first, second, first, second)
+    ]
+
+    assert mock_read.call_count == 2
+    assert [item["spent"] for item in pages[0]["cards"][0]["months"]] == [300.0, 1000.0]
+    assert [item["spent"] for item in pages[1]["cards"][0]["months"]] == [300.0, 0.0]
+    assert pages[2:] == pages[:2]
+
+
+@patch("src.views.AGGREGATES_CACHE", DashboardCache())
+@patch("src.views.read_transactions_xlsx")
+def test_spending_aggregates_keeps_statements_apart(mock_read, tmp_path):
+    """Тест что траты по месяцам разных выписок с одинаковой версией считаются и хранятся отдельно"""
+    first, second = tmp_path / "first.xlsx", tmp_path / "second.xlsx"
+    for statement in (first, second):
+        statement.write_bytes(b"statement")
+        os.utime(statement, ns=(1, 1))
+    mock_read.side_effect = lambda path, **kwargs: USER_TRANSACTIONS if path == str(first) else USER_TRANSACTIONS[1:]
+
+    results = [spending_aggregates(str(path)) for path in (first, second, first, second)]
+
+    assert mock_read.call_count == 2
+    assert results[0] is not results[1]
+    assert results[2:] == results[:2]